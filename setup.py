@@ -83,7 +83,10 @@ setup(
             'modlunky2=modlunky2.cli:main',
             'modlunky2-asset-extract=modlunky2.assets.extractor:main',
             'modlunky2-asset-pack=modlunky2.assets.packer:main',
+            'modlunky2-entity-sheets=modlunky2.assets.entity_sheets:main',
             'modlunky2-soundbank-extract=modlunky2.assets.soundbank:main',
+            'modlunky2-level-query=modlunky2.levels.level_index:main',
+            'modlunky2-level-validate=modlunky2.levels.validation:main',
         ],
     },
     include_package_data = True,
@@ -1,27 +1,24 @@
 import hashlib
 import logging
+import mmap
 import os
-import sys
-import traceback
-import json
 from collections import defaultdict
 from concurrent.futures import wait
-from concurrent.futures.thread import ThreadPoolExecutor
+from threading import Condition
 from dataclasses import dataclass
 from enum import Enum
 from pathlib import Path
-from struct import pack, unpack
+from struct import pack, unpack, unpack_from
 
 import zstandard as zstd
 from PIL import Image
 
 from modlunky2.assets.constants import KNOWN_TEXTURES_V1
 from modlunky2.assets.exc import NonSiblingAsset
-from modlunky2.sprites.sprite_loaders import get_all_sprite_loaders
-from modlunky2.sprites.sprite_mergers import get_all_sprite_mergers
-from modlunky2.constants import BASE_DIR
 
-from .chacha import Key, chacha, hash_filepath
+from . import entity_sheets
+from .chacha import Key, chacha
+from .compression import compress_data, compressor_for_size
 from .constants import (
     BANK_ALIGNMENT,
     DDS_PNGS,
@@ -33,12 +30,51 @@ from .constants import (
 from .soundbank import extract_soundbank
 from .converters import dds_to_png, png_to_dds, rgba_to_png
 from .exc import FileConflict, MissingAsset, MultipleMatchingAssets
+from .executors import DEFAULT_MAX_WORKERS, ExecutorType, make_executor
+from .encrypted_cache import EncryptedCache
+from .filepath_hashes import FilepathHashes
+from .manifest import PackedAsset
+from .staleness import StalenessIndex
 from .string_hashing import StringHashes
 from .hashing import md5sum_path
 
 
 logger = logging.getLogger("modlunky2")
 
+# Number of leading filepath hash bytes used to index assets. Every
+# known filepath is longer than this.
+HASH_INDEX_LEN = 8
+
+# Upper bound on the size of asset data read from the exe but not yet extracted.
+DEFAULT_MAX_PENDING_BYTES = 256 * 1024 * 1024
+
+
+class ByteBudget:
+    """Blocks producers until enough in-flight bytes have been released.
+
+    A single request larger than the whole budget is allowed through once
+    nothing else is in flight so oversized assets can't deadlock.
+    """
+
+    def __init__(self, max_bytes=None):
+        self.max_bytes = max_bytes
+        self.in_flight = 0
+        self._condition = Condition()
+
+    def acquire(self, size):
+        with self._condition:
+            if self.max_bytes is not None:
+                self._condition.wait_for(
+                    lambda: self.in_flight == 0
+                    or self.in_flight + size <= self.max_bytes
+                )
+            self.in_flight += size
+
+    def release(self, size):
+        with self._condition:
+            self.in_flight -= size
+            self._condition.notify_all()
+
 
 @dataclass
 class ExeAssetBlock:
@@ -111,10 +147,40 @@ class ExeAssetBlock:
             asset_len=asset_len,
         )
 
+    @classmethod
+    def from_buffer(cls, buffer, offset):
+        """Construct an ExeAssetBlock from a buffer (e.g. a memoryview over an mmap).
+
+        Returns None if there is no more assets as the offset.
+        """
+        data_len, filepath_len = unpack_from(b"<II", buffer, offset)
+
+        if (data_len, filepath_len) == (0, 0):
+            return None
+
+        if data_len <= 0:
+            raise RuntimeError(f"Expected data length > 0, found {data_len}")
+
+        hash_offset = offset + 8
+        asset_offset = hash_offset + filepath_len + 1
+
+        return ExeAssetBlock(
+            offset=offset,
+            filepath_len=filepath_len,
+            filepath_hash=bytes(buffer[hash_offset : hash_offset + filepath_len]),
+            is_encrypted=buffer[hash_offset + filepath_len] == 1,
+            asset_offset=asset_offset,
+            asset_len=data_len - 1,
+        )
+
     def read_data(self, exe_handle):
         exe_handle.seek(self.asset_offset)
         return exe_handle.read(self.asset_len)
 
+    def view_data(self, buffer):
+        """ Returns a slice of the buffer without copying."""
+        return buffer[self.asset_offset : self.asset_offset + self.asset_len]
+
     def write_data(self, exe_handle, data):
         if self.asset_len != len(data):
             raise RuntimeError(
@@ -143,6 +209,10 @@ class ExeAsset:
         handle.seek(self.asset_block.asset_offset)
         self.data = handle.read(self.asset_block.asset_len)
 
+    def view_data(self, buffer):
+        """ Like `load_data` but references the data in a buffer, e.g. an mmap."""
+        self.data = self.asset_block.view_data(buffer)
+
     def extract(
         self,
         extract_dir: Path,
@@ -150,6 +220,7 @@ class ExeAsset:
         key: Key,
         compression_level=DEFAULT_COMPRESSION_LEVEL,
         recompress=True,
+        compression_threads=0,
     ):
         if not self.filepath:
             raise RuntimeError("Asset doesn't have filepath.")
@@ -176,9 +247,15 @@ class ExeAsset:
                     # better chance of assets fitting in binary
                     logger.info("Storing compressed asset %s...", compressed_filepath)
                     with compressed_filepath.open("wb") as compressed_file:
-                        cctx = zstd.ZstdCompressor(level=compression_level)
-                        compressed_data = cctx.compress(self.data)
-                        compressed_file.write(compressed_data)
+                        cctx = compressor_for_size(
+                            len(self.data), compression_level, compression_threads
+                        )
+                        # Stream to the file rather than holding a compressed copy.
+                        writer = cctx.stream_writer(
+                            compressed_file, size=len(self.data)
+                        )
+                        writer.write(self.data)
+                        writer.flush(zstd.FLUSH_FRAME)
 
             except Exception:  # pylint: disable=broad-except
                 logger.exception("Failed compression")
@@ -209,11 +286,19 @@ class AssetStore:
 
     BUNDLE_OFFSET = 0x400
 
-    def __init__(self, exe_handle):
+    def __init__(self, exe_handle, filepath_hashes=None):
         self.assets = []
         self.exe_handle = exe_handle
         self.total_size = 0
         self._key = Key()
+        if filepath_hashes is None:
+            filepath_hashes = FilepathHashes()
+        self.filepath_hashes = filepath_hashes
+        self._hash_index = {}
+        self._short_hash_assets = []
+        # Set when loaded with `load_from_mmap`
+        self._mmap = None
+        self.exe_buffer = None
 
     @property
     def key(self):
@@ -223,8 +308,10 @@ class AssetStore:
         self._key.update(size)
 
     @classmethod
-    def load_from_file(cls, exe_handle):
-        asset_store = cls(exe_handle)
+    def load_from_file(cls, exe_handle, filepath_hashes=None):
+        if filepath_hashes is None:
+            filepath_hashes = FilepathHashes.default()
+        asset_store = cls(exe_handle, filepath_hashes)
         asset_store.exe_handle.seek(cls.BUNDLE_OFFSET)
 
         while True:
@@ -234,18 +321,97 @@ class AssetStore:
                 # We've reached the end of the asset blocks.
                 break
 
-            asset_store.update_key(asset_block.data_len)
-            asset_store.total_size += asset_block.total_size
-            asset_store.assets.append(ExeAsset(asset_block, None))
+            asset_store.add_asset_block(asset_block)
 
+        asset_store.index_assets()
         asset_store.populate_asset_filepaths()
         return asset_store
 
+    @classmethod
+    def load_from_mmap(cls, exe_handle, filepath_hashes=None):
+        """Load the asset blocks from a read-only mmap of the exe.
+
+        Asset data is handed out as slices of the mapping so nothing is
+        copied until it's decrypted or decompressed. Call `close` when done.
+        """
+        if filepath_hashes is None:
+            filepath_hashes = FilepathHashes.default()
+        asset_store = cls(exe_handle, filepath_hashes)
+        asset_store._mmap = mmap.mmap(exe_handle.fileno(), 0, access=mmap.ACCESS_READ)
+        asset_store.exe_buffer = memoryview(asset_store._mmap)
+
+        offset = cls.BUNDLE_OFFSET
+        while True:
+            asset_block = ExeAssetBlock.from_buffer(asset_store.exe_buffer, offset)
+
+            if asset_block is None:
+                # We've reached the end of the asset blocks.
+                break
+
+            offset += asset_block.total_size
+            asset_store.add_asset_block(asset_block)
+
+        asset_store.index_assets()
+        asset_store.populate_asset_filepaths()
+        return asset_store
+
+    def close(self):
+        """Release the mmap, if any. Asset data viewing it must not be used after.
+
+        If workers still hold views of it, the mapping is left to be freed
+        once they're done rather than raising.
+        """
+        for asset in self.assets:
+            if isinstance(asset.data, memoryview):
+                asset.data = None
+
+        if self.exe_buffer is not None:
+            self.exe_buffer.release()
+            self.exe_buffer = None
+
+        if self._mmap is not None:
+            try:
+                self._mmap.close()
+            except BufferError:
+                # A worker that outlived its wait still views the mapping.
+                # Dropping our reference unmaps it once the worker is done.
+                logger.warning("Asset data still in use, leaving the exe mapped")
+            self._mmap = None
+
+    def add_asset_block(self, asset_block):
+        self.update_key(asset_block.data_len)
+        self.total_size += asset_block.total_size
+        self.assets.append(ExeAsset(asset_block, None))
+
+    def load_asset_data(self, asset):
+        if self.exe_buffer is not None:
+            asset.view_data(self.exe_buffer)
+        else:
+            asset.load_data(self.exe_handle)
+
+    def index_assets(self):
+        """ Index assets by the leading bytes of their filepath hash."""
+        self._hash_index = defaultdict(list)
+        self._short_hash_assets = []
+        for asset in self.assets:
+            if asset.asset_block.filepath_len < HASH_INDEX_LEN:
+                self._short_hash_assets.append(asset)
+                continue
+            prefix = asset.asset_block.filepath_hash[:HASH_INDEX_LEN]
+            self._hash_index[prefix].append(asset)
+
     def find_asset(self, filepath):
         if filepath is None:
             return None
         filepath_hash = self.hash_filepath(filepath)
-        for asset in self.assets:
+
+        if len(filepath_hash) >= HASH_INDEX_LEN:
+            candidates = self._hash_index.get(filepath_hash[:HASH_INDEX_LEN], [])
+            candidates = candidates + self._short_hash_assets
+        else:
+            candidates = self.assets
+
+        for asset in candidates:
             if asset.match_hash(filepath_hash):
                 return asset
         return None
@@ -254,10 +420,10 @@ class AssetStore:
         if filepath is None:
             return None
 
-        if not isinstance(filepath, bytes):
-            filepath = filepath.encode()
+        if isinstance(filepath, bytes):
+            filepath = filepath.decode()
 
-        return hash_filepath(filepath, self.key)
+        return self.filepath_hashes.get(self.key, filepath)
 
     def populate_asset_filepaths(self):
         for filepath in KNOWN_FILEPATHS:
@@ -265,6 +431,7 @@ class AssetStore:
             if asset is None:
                 continue
             asset.filepath = filepath
+        self.filepath_hashes.save()
 
     @staticmethod
     def _extract_single(asset, *args, **kwargs):
@@ -273,88 +440,105 @@ class AssetStore:
             asset.extract(*args, **kwargs)
         except Exception:  # pylint: disable=broad-except
             logger.exception("Failed Extraction")
+        finally:
+            # Everything needed later is on disk now.
+            asset.data = None
+
+    def _extract_streaming(
+        self, pool, executor_type, assets, max_pending_bytes, *args
+    ):
+        """Read assets one at a time, only as fast as the workers free up memory."""
+        exe_path = None
+        if executor_type == ExecutorType.PROCESS:
+            # Worker processes read their own data from the exe instead of
+            # having it pickled over to them.
+            exe_path = getattr(self.exe_handle, "name", None)
+            if not isinstance(exe_path, (str, Path)):
+                raise ValueError("Process extraction requires a named exe file.")
+
+        budget = ByteBudget(max_pending_bytes)
+        futures = []
+        for asset in assets:
+            size = asset.asset_block.asset_len
+            budget.acquire(size)
+            try:
+                if exe_path is None:
+                    self.load_asset_data(asset)
+                    future = pool.submit(self._extract_single, asset, *args)
+                else:
+                    future = pool.submit(_extract_from_exe_path, exe_path, asset, *args)
+            except BaseException:
+                budget.release(size)
+                raise
+            future.add_done_callback(lambda _, size=size: budget.release(size))
+            futures.append(future)
+        return futures
 
     @staticmethod
-    def _merge_single_entity(sprite_merger, sprite_loaders):
-        try:
-            sprite_merger.do_merge(sprite_loaders)
-            sprite_merger.save()
-        except Exception:  # pylint: disable=broad-except
-            logger.critical(
-                "Failed to merge sprite for %s: %s",
-                sprite_merger.stem,
-                "".join(traceback.format_exception(*sys.exc_info())).strip(),
-            )
+    def create_entity_sheets(
+        extract_dir,
+        max_workers=DEFAULT_MAX_WORKERS,
+        executor_type=ExecutorType.PROCESS,
+        force=False,
+    ):
+        entity_sheets.create_entity_sheets(
+            extract_dir, max_workers, executor_type, force=force
+        )
 
     def extract(
         self,
         extract_dir,
         compressed_dir,
         compression_level=DEFAULT_COMPRESSION_LEVEL,
-        max_workers=max(os.cpu_count() - 2, 1),
+        max_workers=DEFAULT_MAX_WORKERS,
         recompress=True,
         generate_string_hashes=True,
         create_entity_sheets=True,
         extract_sound_extensions=None,
         reuse_extracted=False,
+        max_pending_bytes=DEFAULT_MAX_PENDING_BYTES,
+        executor_type=ExecutorType.THREAD,
+        compression_threads=0,
+        entity_sheets_executor_type=ExecutorType.PROCESS,
+        force_entity_sheets=False,
     ):
+        executor_type = ExecutorType(executor_type)
         unextracted = []
 
         if not reuse_extracted:
+            to_extract = []
             for asset in self.assets:
                 if asset.filepath is None:
                     # No known filepaths matched this asset.
                     unextracted.append(asset)
                     continue
-
-                asset.load_data(self.exe_handle)
-
-            with ThreadPoolExecutor(max_workers=max_workers) as pool:
-                futures = [
-                    pool.submit(
-                        self._extract_single,
-                        asset,
-                        extract_dir,
-                        compressed_dir,
-                        self.key,
-                        compression_level,
-                        recompress,
-                    )
-                    for asset in self.assets
-                    if asset.filepath
-                ]
+                to_extract.append(asset)
+
+            with make_executor(executor_type, max_workers) as pool:
+                futures = self._extract_streaming(
+                    pool,
+                    executor_type,
+                    to_extract,
+                    max_pending_bytes,
+                    extract_dir,
+                    compressed_dir,
+                    self.key,
+                    compression_level,
+                    recompress,
+                    compression_threads,
+                )
                 wait(futures, timeout=300)
 
         if generate_string_hashes:
             self.hash_strings(extract_dir)
 
         if create_entity_sheets:
-            logger.info("Creating entity sprite sheets...")
-
-            with open(BASE_DIR / "static/game_data/entities.json") as entities_file:
-                entities_json = json.loads(entities_file.read())
-            with open(BASE_DIR / "static/game_data/textures.json") as textures_file:
-                textures_json = json.loads(textures_file.read())
-
-            sprite_loaders = get_all_sprite_loaders(
-                entities_json, textures_json, extract_dir
+            self.create_entity_sheets(
+                extract_dir,
+                max_workers,
+                entity_sheets_executor_type,
+                force=force_entity_sheets,
             )
-            sprite_mergers = get_all_sprite_mergers(
-                entities_json, textures_json, extract_dir
-            )
-
-            with ThreadPoolExecutor(max_workers=max_workers) as pool:
-                futures = [
-                    pool.submit(
-                        self._merge_single_entity,
-                        sprite_merger,
-                        sprite_loaders,
-                    )
-                    for sprite_merger in sprite_mergers
-                ]
-                wait(futures, timeout=300)
-
-            logger.info("Done creating entity sprite sheets...")
 
         if extract_sound_extensions:
             extract_soundbank(
@@ -365,27 +549,75 @@ class AssetStore:
 
         return unextracted
 
+    @staticmethod
+    def _get_extracted_data(asset, extract_dir):
+        if asset.data is not None:
+            return asset.data
+
+        # Extracted data isn't kept in memory so read it back from disk.
+        path = extract_dir / asset.filepath
+        if not path.exists():
+            return None
+
+        with path.open("rb") as extracted_file:
+            return extracted_file.read()
+
     def hash_strings(self, extract_dir):
         # Use the english strings as the source for generating hash values.
         english_strings = self.find_asset("strings00.str")
-        if english_strings is None or english_strings.data is None:
+        english_data = None
+        if english_strings is not None:
+            english_data = self._get_extracted_data(english_strings, extract_dir)
+        if english_data is None:
             logging.warning("Didn't find data for english strings in strings00.str")
             return
 
-        string_hashes = StringHashes.from_data(english_strings.data)
+        string_hashes = StringHashes.from_data(english_data)
 
         # Create the hashed string files separately since they all depend on strings00.str
         for asset in self.assets:
             if asset.filepath and asset.filepath.endswith(".str"):
+                data = self._get_extracted_data(asset, extract_dir)
+                if data is None:
+                    continue
                 asset_file_path = Path(asset.filepath)
                 hashed_strings_file = (
                     extract_dir
                     / asset_file_path.parent
                     / f"{asset_file_path.stem}_hashed{asset_file_path.suffix}"
                 )
-                string_hashes.write_string_hashes(asset.data, hashed_strings_file)
+                string_hashes.write_string_hashes(data, hashed_strings_file)
+
+    def _write_asset(self, asset, data, md5sum, encrypted_cache=None):
+        if asset.asset_block.is_encrypted:
+            data = self._encrypt(asset, data, md5sum, encrypted_cache)
 
-    def pack_assets(self):
+        logger.info("Packing file %s", asset.disk_asset.asset_path)
+        self.exe_handle.write(
+            pack("<II", asset.asset_block.data_len, asset.asset_block.filepath_len)
+        )
+        self.exe_handle.write(asset.asset_block.filepath_hash)
+        self.exe_handle.write(pack("<b", asset.asset_block.is_encrypted))
+        self.exe_handle.write(data)
+
+    def _encrypt(self, asset, data, md5sum, encrypted_cache=None):
+        if encrypted_cache is not None:
+            encrypted = encrypted_cache.get(asset.filepath, self.key, md5sum)
+            if encrypted is not None:
+                return encrypted
+
+        logger.info("Encrypting file %s", asset.disk_asset.asset_path)
+        encrypted = chacha(asset.filepath.encode(), data, self.key)
+        if encrypted_cache is not None:
+            encrypted_cache.put(asset.filepath, self.key, md5sum, encrypted)
+        return encrypted
+
+    def pack_assets(self, encrypted_cache=None):
+        """Write every asset from the bundle offset onwards.
+
+        Returns the PackedAsset for each filepath that was written.
+        """
+        packed_assets = {}
         self.exe_handle.seek(self.BUNDLE_OFFSET)
 
         for asset in self.assets:
@@ -394,20 +626,58 @@ class AssetStore:
 
             assert asset.asset_block.asset_len == asset.disk_asset.get_asset_len()
             data = asset.disk_asset.get_asset_data()
+            packed_asset = self._packed_asset(asset, data)
+            packed_assets[asset.filepath] = packed_asset
+            self._write_asset(asset, data, packed_asset.md5sum, encrypted_cache)
 
-            if asset.asset_block.is_encrypted:
-                logger.info("Encrypting file %s", asset.disk_asset.asset_path)
-                data = chacha(asset.filepath.encode(), data, self.key)
+        self.exe_handle.write(pack("<II", 0, 0))
+        return packed_assets
 
-            logger.info("Packing file %s", asset.disk_asset.asset_path)
-            self.exe_handle.write(
-                pack("<II", asset.asset_block.data_len, asset.asset_block.filepath_len)
-            )
-            self.exe_handle.write(asset.asset_block.filepath_hash)
-            self.exe_handle.write(pack("<b", asset.asset_block.is_encrypted))
-            self.exe_handle.write(data)
+    def pack_changed_assets(self, manifest, encrypted_cache=None):
+        """Only rewrite assets whose data changed since the pack in `manifest`.
 
-        self.exe_handle.write(pack("<II", 0, 0))
+        The layout and key must match the manifest so every block stays in place.
+        """
+        packed_assets = {}
+
+        for asset in self.assets:
+            if asset.filepath is None:
+                continue
+
+            data = asset.disk_asset.get_asset_data()
+            packed_asset = self._packed_asset(asset, data)
+            packed_assets[asset.filepath] = packed_asset
+
+            if manifest.assets[asset.filepath] == packed_asset:
+                if encrypted_cache is not None and asset.asset_block.is_encrypted:
+                    encrypted_cache.keep(asset.filepath, self.key, packed_asset.md5sum)
+                continue
+
+            self.exe_handle.seek(asset.asset_block.offset)
+            self._write_asset(asset, data, packed_asset.md5sum, encrypted_cache)
+
+        return packed_assets
+
+    @staticmethod
+    def _packed_asset(asset, data):
+        return PackedAsset(
+            offset=asset.asset_block.offset,
+            asset_len=asset.asset_block.asset_len,
+            filepath_len=asset.asset_block.filepath_len,
+            md5sum=hashlib.md5(data).hexdigest(),
+        )
+
+    def layout(self):
+        """ The position and sizes of each asset with a known filepath."""
+        return {
+            asset.filepath: (
+                asset.asset_block.offset,
+                asset.asset_block.asset_len,
+                asset.asset_block.filepath_len,
+            )
+            for asset in self.assets
+            if asset.filepath is not None
+        }
 
     def recalculate_key(self):
         """ Recalculate the key from the current assets."""
@@ -425,6 +695,8 @@ class AssetStore:
             asset.asset_block.filepath_hash = self.hash_filepath(asset.filepath).ljust(
                 asset.asset_block.filepath_len, b"\x00"
             )
+        self.filepath_hashes.save()
+        self.index_assets()
 
     def repackage(
         self,
@@ -432,14 +704,38 @@ class AssetStore:
         fallback_dir,
         compressed_dir,
         compression_level=DEFAULT_COMPRESSION_LEVEL,
+        max_workers=DEFAULT_MAX_WORKERS,
+        executor_type=ExecutorType.THREAD,
+        manifest=None,
+        compression_threads=0,
     ):
+        """Pack assets from disk into the exe.
+
+        If a `PackManifest` is passed and the exe, as well as the new layout,
+        still match it only the assets that changed are rewritten. The manifest
+        is updated with what was packed but it's up to the caller to save it.
+
+        Encrypted payloads are cached in `compressed_dir` so unchanged assets
+        don't need to be encrypted again on the next pack.
+        """
+        exe_layout = self.layout()
+        exe_key = self.key
+
         disk_bundle = DiskBundle.from_dirs(
             self.assets,
             search_dirs,
             fallback_dir,
             compressed_dir,
         )
-        disk_bundle.compress_if_needed(compression_level=compression_level)
+        staleness_index = StalenessIndex.from_compressed_dir(Path(compressed_dir))
+        disk_bundle.compress_if_needed(
+            compression_level=compression_level,
+            max_workers=max_workers,
+            executor_type=executor_type,
+            staleness_index=staleness_index,
+            compression_threads=compression_threads,
+        )
+        staleness_index.save()
 
         offset = self.BUNDLE_OFFSET
         for asset in self.assets:
@@ -453,6 +749,9 @@ class AssetStore:
 
             asset.asset_block.offset = offset
             asset.asset_block.asset_len = disk_asset.get_asset_len()
+            if disk_asset.asset_path.suffix == ".bank":
+                # Drop the padding added when the exe was last packed
+                asset.asset_block.filepath_len = len(asset.filepath.encode())
             asset.asset_block.asset_offset = (
                 asset.asset_block.offset + 8 + asset.asset_block.filepath_len + 1
             )
@@ -472,7 +771,29 @@ class AssetStore:
 
         self.recalculate_key()
         self.update_filepath_hashes()
-        self.pack_assets()
+
+        encrypted_cache = EncryptedCache.from_compressed_dir(Path(compressed_dir))
+        if (
+            manifest is not None
+            and manifest.key == exe_key == self.key
+            and manifest.layout() == exe_layout == self.layout()
+        ):
+            logger.info("Layout unchanged, only packing modified assets")
+            packed_assets = self.pack_changed_assets(manifest, encrypted_cache)
+        else:
+            packed_assets = self.pack_assets(encrypted_cache)
+        encrypted_cache.prune()
+
+        if manifest is not None:
+            manifest.key = self.key
+            manifest.assets = packed_assets
+
+
+def _extract_from_exe_path(exe_path, asset, *args):
+    """ Process pool entry point that reads the asset's data from the exe itself."""
+    with open(exe_path, "rb") as exe_handle:
+        asset.load_data(exe_handle)
+    AssetStore._extract_single(asset, *args)  # pylint: disable=protected-access
 
 
 class ResolutionPolicy(Enum):
@@ -579,13 +900,50 @@ class DiskBundle:
     def compress_if_needed(
         self,
         compression_level=DEFAULT_COMPRESSION_LEVEL,
-        max_workers=max(os.cpu_count() - 2, 1),
+        max_workers=DEFAULT_MAX_WORKERS,
+        executor_type=ExecutorType.THREAD,
+        staleness_index=None,
+        compression_threads=0,
     ):
-        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        """Compress the assets whose contents changed since they were last compressed.
+
+        Compression runs on `executor_type`. Finding the stale assets always
+        runs on threads, or inline with `ExecutorType.INLINE`, since it shares
+        `staleness_index` between workers and that can't be sent to other
+        processes.
+        """
+        if staleness_index is None:
+            staleness_index = StalenessIndex()
+
+        # Checking is mostly stat calls and hashing which releases the GIL
+        # so threads are enough, unless everything should run inline.
+        scan_type = (
+            ExecutorType.INLINE
+            if ExecutorType(executor_type) == ExecutorType.INLINE
+            else ExecutorType.THREAD
+        )
+
+        def stale_md5sum(disk_asset):
+            # Hash here, assets without an .md5sum yet weren't hashed by the check
+            if not disk_asset.needs_compression(staleness_index):
+                return None
+            return disk_asset.md5sum_of_asset(staleness_index)
+
+        disk_assets = list(self.disk_assets.values())
+        with make_executor(scan_type, max_workers) as pool:
+            md5sums = list(pool.map(stale_md5sum, disk_assets))
+
+        # DiskAssets only carry paths so they're cheap to send to other processes.
+        with make_executor(executor_type, max_workers) as pool:
             futures = [
-                pool.submit(disk_asset.compress, compression_level)
-                for disk_asset in self.disk_assets.values()
-                if disk_asset.needs_compression()
+                pool.submit(
+                    disk_asset.compress,
+                    compression_level,
+                    md5sum,
+                    compression_threads,
+                )
+                for disk_asset, md5sum in zip(disk_assets, md5sums)
+                if md5sum is not None
             ]
             wait(futures, timeout=300)
 
@@ -616,7 +974,9 @@ class DiskAsset:
                 f"Disk Asset ({self.asset_path}) not sibling of ({self.compressed_dir})."
             ) from err
 
-    def md5sum_of_asset(self):
+    def md5sum_of_asset(self, staleness_index=None):
+        if staleness_index is not None:
+            return staleness_index.md5sum(self.asset_path)
         return md5sum_path(self.asset_path)
 
     @property
@@ -639,7 +999,7 @@ class DiskAsset:
             / f"{self.rel_asset_path.with_suffix(self.real_suffix)}.md5sum"
         )
 
-    def needs_compression(self):
+    def needs_compression(self, staleness_index=None):
         if not self.exe_asset.asset_block.is_encrypted:
             return False
 
@@ -649,7 +1009,7 @@ class DiskAsset:
         if not self.compressed_path.exists():
             return True
 
-        md5sum = self.md5sum_of_asset()
+        md5sum = self.md5sum_of_asset(staleness_index)
         with self.md5sum_path.open("rb") as md5sum_file:
             stored_md5sum = md5sum_file.read().strip()
         if md5sum != stored_md5sum:
@@ -657,7 +1017,12 @@ class DiskAsset:
 
         return False
 
-    def compress(self, compression_level=DEFAULT_COMPRESSION_LEVEL):
+    def compress(
+        self,
+        compression_level=DEFAULT_COMPRESSION_LEVEL,
+        md5sum=None,
+        compression_threads=0,
+    ):
         if not self.exe_asset.asset_block.is_encrypted:
             return
 
@@ -672,13 +1037,13 @@ class DiskAsset:
             with open(self.asset_path, "rb") as asset_file:
                 data = asset_file.read()
 
-        md5sum = self.md5sum_of_asset()
+        if md5sum is None:
+            md5sum = self.md5sum_of_asset()
         with self.md5sum_path.open("wb") as md5sum_file:
             md5sum_file.write(md5sum)
 
         logger.info("Compressing %s...", self.asset_path)
-        cctx = zstd.ZstdCompressor(level=compression_level)
-        data = cctx.compress(data)
+        data = compress_data(data, compression_level, compression_threads)
         with open(self.compressed_path, "wb") as compressed_file:
             compressed_file.write(data)
 
@@ -2,6 +2,11 @@
 
 from struct import pack, unpack
 
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
 DEFAULT_COMPRESSION_LEVEL = 20
 
 
@@ -57,7 +62,10 @@ def quad_rounds(s):
 
 
 def sxor(x, y):
-    return bytes(a ^ b for a, b in zip(x, y))
+    size = min(len(x), len(y))
+    return (
+        int.from_bytes(x[:size], "little") ^ int.from_bytes(y[:size], "little")
+    ).to_bytes(size, "little")
 
 
 def s_to_w(s):
@@ -173,21 +181,52 @@ def mix_in_filepath(filepath, h):
     return h
 
 
-def chacha_rest(data, key):
-    # NOTE: This appears to be an implementation mistake on the Spelunky 2 dev's part
-    # They generate a quad_round advanced version of (nonce'd key), but then they
-    # xor with the untweaked key instead of the tweaked key...
+def xor_keystream_py(data, key):
+    """Reference implementation XORing a byte at a time."""
     out = b""
     if len(data) >= 0x40:
         blocks = len(data) // 0x40
-        out += sxor(data, key[::-1] * blocks)
+        out += bytes(a ^ b for a, b in zip(data, key[::-1] * blocks))
         data = data[blocks * 0x40 :]
     if len(data) > 0:
-        out += sxor(data, key[: len(data)][::-1])
+        out += bytes(a ^ b for a, b in zip(data, key[: len(data)][::-1]))
 
     return out
 
 
+def xor_keystream_int(data, key):
+    """XOR the whole payload at once as a single wide integer."""
+    blocks = len(data) // 0x40
+    body_len = blocks * 0x40
+    out = sxor(data[:body_len], key[::-1] * blocks)
+    if len(data) > body_len:
+        out += sxor(data[body_len:], key[: len(data) - body_len][::-1])
+    return out
+
+
+def xor_keystream_numpy(data, key):
+    """XOR full blocks as rows of qwords against the reversed key."""
+    blocks = len(data) // 0x40
+    body_len = blocks * 0x40
+    body = np.frombuffer(data, dtype="<u8", count=body_len // 8).reshape(blocks, 8)
+    out = (body ^ np.frombuffer(key[::-1], dtype="<u8")).tobytes()
+    if len(data) > body_len:
+        out += sxor(data[body_len:], key[: len(data) - body_len][::-1])
+    return out
+
+
+# NumPy is optional, the wide integer path is still far quicker than
+# XORing byte by byte.
+xor_keystream = xor_keystream_int if np is None else xor_keystream_numpy
+
+
+def chacha_rest(data, key):
+    # NOTE: This appears to be an implementation mistake on the Spelunky 2 dev's part
+    # They generate a quad_round advanced version of (nonce'd key), but then they
+    # xor with the untweaked key instead of the tweaked key...
+    return xor_keystream(data, key)
+
+
 def chacha_v1(filepath, data):
     # Untweaked key begins as half-advanced "0xBABE"
     h = two_rounds(pack(b"<QQQQQQQQ", 0xBABE, 0, 0, 0, 0, 0, 0, 0))
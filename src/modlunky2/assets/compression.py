@@ -0,0 +1,41 @@
+import threading
+
+import zstandard as zstd
+
+from .constants import DEFAULT_COMPRESSION_LEVEL
+
+# Below this size the cost of handing work to zstd's worker threads isn't
+# worth it. Most large assets are texture sheets and sound banks.
+THREADED_MIN_SIZE = 4 * 1024 * 1024
+
+_LOCAL = threading.local()
+
+
+def get_compressor(level=DEFAULT_COMPRESSION_LEVEL, threads=0):
+    """A `ZstdCompressor` owned by the calling thread.
+
+    Contexts hold sizable tables at high levels so each worker reuses one
+    per (level, threads) instead of building a new one per asset. They
+    aren't thread-safe, hence one per thread.
+    """
+    compressors = getattr(_LOCAL, "compressors", None)
+    if compressors is None:
+        compressors = _LOCAL.compressors = {}
+
+    cctx = compressors.get((level, threads))
+    if cctx is None:
+        cctx = compressors[(level, threads)] = zstd.ZstdCompressor(
+            level=level, threads=threads
+        )
+    return cctx
+
+
+def compressor_for_size(size, level=DEFAULT_COMPRESSION_LEVEL, threads=0):
+    """ Like `get_compressor` but only uses threads for large data."""
+    if size < THREADED_MIN_SIZE:
+        threads = 0
+    return get_compressor(level, threads)
+
+
+def compress_data(data, level=DEFAULT_COMPRESSION_LEVEL, threads=0):
+    return compressor_for_size(len(data), level, threads).compress(data)
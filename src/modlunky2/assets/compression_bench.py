@@ -0,0 +1,104 @@
+"""
+
+Compares zstd settings against the defaults used when packing.
+
+Run against an extracted directory, e.g.
+
+    python -m modlunky2.assets.compression_bench Mods/Extracted --levels 20 19 15 --threads 0 4
+
+Each asset is prepared the same way `DiskAsset.compress` does it before being
+compressed with every combination of level and threads.
+"""
+
+import argparse
+import time
+from collections import defaultdict
+from pathlib import Path
+
+import zstandard as zstd
+from PIL import Image
+
+from .compression import compress_data
+from .constants import DEFAULT_COMPRESSION_LEVEL
+from .converters import png_to_dds
+
+ASSET_CLASSES = {
+    ".png": "textures",
+    ".lvl": "levels",
+    ".str": "strings",
+    ".bank": "sounds",
+}
+
+
+def asset_class(path):
+    return ASSET_CLASSES.get(path.suffix, "other")
+
+
+def load_asset(path):
+    if path.suffix == ".png":
+        with Image.open(path) as img:
+            return png_to_dds(img)
+    return path.read_bytes()
+
+
+def compress_default(data):
+    """ What packing did before compressor contexts were shared."""
+    return zstd.ZstdCompressor(level=DEFAULT_COMPRESSION_LEVEL).compress(data)
+
+
+def bench(assets, compress, *args):
+    """ Returns (size, seconds) per asset class."""
+    results = defaultdict(lambda: [0, 0.0])
+    for class_, data in assets:
+        start = time.perf_counter()
+        compressed = compress(data, *args)
+        results[class_][1] += time.perf_counter() - start
+        results[class_][0] += len(compressed)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark zstd settings for Spelunky 2 assets."
+    )
+    parser.add_argument("extracted_dir", type=Path, help="Path to extracted assets.")
+    parser.add_argument(
+        "--levels",
+        type=int,
+        nargs="+",
+        default=[DEFAULT_COMPRESSION_LEVEL, 19, 15],
+        help="Compression levels to compare. Default: %(default)s",
+    )
+    parser.add_argument(
+        "--threads",
+        type=int,
+        nargs="+",
+        default=[0, 4],
+        help="zstd thread counts to compare. Default: %(default)s",
+    )
+    args = parser.parse_args()
+
+    assets = [
+        (asset_class(path), load_asset(path))
+        for path in sorted(args.extracted_dir.rglob("*"))
+        if path.is_file() and path.suffix in ASSET_CLASSES
+    ]
+    classes = sorted({class_ for class_, _ in assets})
+
+    baseline = bench(assets, compress_default)
+    print(f"{'level':>5} {'threads':>7} {'class':>10} {'size':>12} {'secs':>8}")
+    for level in args.levels:
+        for threads in args.threads:
+            results = bench(assets, compress_data, level, threads)
+            for class_ in classes:
+                size, secs = results[class_]
+                base_size, base_secs = baseline[class_]
+                print(
+                    f"{level:>5} {threads:>7} {class_:>10} {size:>12} {secs:>8.2f}"
+                    f" ({size / max(base_size, 1):.1%} size,"
+                    f" {secs / max(base_secs, 1e-9):.1%} time)"
+                )
+
+
+if __name__ == "__main__":
+    main()
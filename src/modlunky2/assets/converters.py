@@ -62,13 +62,12 @@ def png_to_dds(img):
     data += pack("<4I", caps, caps2, caps3, caps4)
     data += pack("<I", 0)  # reserved
 
-    data += bytes(
-        (
-            byte if rgba[3] != 0 else 0
-        )  # Hack to force all transparent pixels to be (0, 0, 0, 0)
-        # instead of (255, 255, 255, 0)
-        for rgba in img.getdata()
-        for byte in rgba
-    )
+    # Force all transparent pixels to be (0, 0, 0, 0) instead of
+    # (255, 255, 255, 0). Done with the alpha band as a mask so it
+    # happens in PIL rather than per byte in python.
+    opaque_mask = img.getchannel("A").point(lambda alpha: 255 if alpha else 0)
+    body = Image.new("RGBA", img.size, (0, 0, 0, 0))
+    body.paste(img, mask=opaque_mask)
+    data += body.tobytes()
 
     return data
@@ -0,0 +1,71 @@
+import hashlib
+import logging
+from pathlib import Path
+from threading import Lock
+from typing import Optional
+
+logger = logging.getLogger("modlunky2")
+
+ENCRYPTED_CACHE_DIR = ".encrypted"
+
+
+class EncryptedCache:
+    """Content addressed store of encrypted asset payloads.
+
+    The keystream only depends on the filepath, the bundle key and the data
+    so a payload is reusable as long as all three are the same.
+    """
+
+    def __init__(self, root: Path):
+        self.root = root
+        self._used = set()
+        self._lock = Lock()
+
+    @classmethod
+    def from_compressed_dir(cls, compressed_dir: Path) -> "EncryptedCache":
+        return cls(compressed_dir / ENCRYPTED_CACHE_DIR)
+
+    @staticmethod
+    def cache_name(filepath: str, key: int, md5sum: str) -> str:
+        return hashlib.sha1(f"{filepath}:{key:016x}:{md5sum}".encode()).hexdigest()
+
+    def _path(self, name: str) -> Path:
+        with self._lock:
+            self._used.add(name)
+        return self.root / name
+
+    def keep(self, filepath: str, key: int, md5sum: str):
+        """ Mark a payload as still in use without reading it."""
+        self._path(self.cache_name(filepath, key, md5sum))
+
+    def get(self, filepath: str, key: int, md5sum: str) -> Optional[bytes]:
+        path = self._path(self.cache_name(filepath, key, md5sum))
+        try:
+            with path.open("rb") as cached_file:
+                return cached_file.read()
+        except OSError:
+            return None
+
+    def put(self, filepath: str, key: int, md5sum: str, data: bytes):
+        path = self._path(self.cache_name(filepath, key, md5sum))
+        try:
+            self.root.mkdir(parents=True, exist_ok=True)
+            tmp_path = path.with_suffix(".tmp")
+            with tmp_path.open("wb") as tmp_file:
+                tmp_file.write(data)
+            tmp_path.replace(path)
+        except OSError:
+            logger.warning("Failed to cache encrypted data for %s", filepath)
+
+    def prune(self):
+        """ Remove every payload that wasn't used since this cache was created."""
+        if not self.root.exists():
+            return
+
+        for path in self.root.iterdir():
+            if path.name in self._used:
+                continue
+            try:
+                path.unlink()
+            except OSError:
+                logger.warning("Failed to remove stale cached data %s", path)
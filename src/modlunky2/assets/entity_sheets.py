@@ -0,0 +1,373 @@
+"""
+
+Builds the merged entity sprite sheets from an existing extract, e.g.
+
+    python -m modlunky2.assets.entity_sheets Mods/Extracted
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import os
+import sys
+import traceback
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, wait
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from modlunky2.config import CACHE_DIR
+from modlunky2.constants import BASE_DIR
+from modlunky2.sprites.base_classes import LoaderIndex
+from modlunky2.sprites.sprite_loaders import get_all_sprite_loaders
+from modlunky2.sprites.sprite_mergers import get_all_sprite_mergers
+from modlunky2.utils import atomic_write
+
+from .executors import DEFAULT_MAX_WORKERS, ExecutorType, make_executor
+from .staleness import StalenessIndex
+
+logger = logging.getLogger("modlunky2")
+
+# Threads saving merged sheets while the next one is merged. PNG encoding
+# releases the GIL so one is enough to keep up.
+ENCODE_THREADS = 1
+
+ENTITY_SHEETS_TIMEOUT = 300
+
+ENTITY_SHEETS_CACHE_DIR = CACHE_DIR / "entity-sheets"
+MANIFEST_VERSION = 2
+
+
+def load_entity_sheets(extract_dir: Path):
+    with open(BASE_DIR / "static/game_data/entities.json") as entities_file:
+        entities_json = json.loads(entities_file.read())
+    with open(BASE_DIR / "static/game_data/textures.json") as textures_file:
+        textures_json = json.loads(textures_file.read())
+
+    sprite_loaders = get_all_sprite_loaders(entities_json, textures_json, extract_dir)
+    sprite_mergers = get_all_sprite_mergers(entities_json, textures_json, extract_dir)
+    return sprite_loaders, sprite_mergers
+
+
+def _primary_source(sprite_merger):
+    """ The loader most of a merged sheet's sprites come from."""
+
+    def num_sprites(loader_type):
+        # pylint: disable=protected-access
+        chunk_maps = sprite_merger._origin_map[loader_type]
+        return sum(len(chunk_map) for chunk_map in chunk_maps)
+
+    return max(sprite_merger.source_types, key=num_sprites, default=None)
+
+
+class EntitySheetManifest:
+    """The inputs each merged sheet of an extract was last built from.
+
+    Targets are keyed by their path in the extract and map to the md5 of
+    every source sheet along with a hash of the merger's layout. A target
+    whose inputs are unchanged and whose outputs are still on disk doesn't
+    need merging again.
+    """
+
+    def __init__(self, path: Optional[Path] = None):
+        self.path = path
+        self.targets: Dict[str, Dict] = {}
+
+    @staticmethod
+    def default_path(extract_dir: Path) -> Path:
+        key = hashlib.sha1(str(Path(extract_dir).resolve()).encode()).hexdigest()
+        return ENTITY_SHEETS_CACHE_DIR / f"{key}.json"
+
+    @property
+    def staleness_path(self) -> Optional[Path]:
+        """ Where the md5s of the source sheets are kept between runs."""
+        if self.path is None:
+            return None
+        return self.path.with_name(f"{self.path.stem}-staleness.json")
+
+    @classmethod
+    def from_path(cls, path: Path) -> "EntitySheetManifest":
+        obj = cls(path)
+        if not path.exists():
+            return obj
+
+        try:
+            with path.open("r", encoding="utf-8") as manifest_file:
+                data = json.load(manifest_file)
+        except (OSError, json.JSONDecodeError):
+            logger.warning("Failed to read entity sheet manifest from %s", path)
+            return obj
+
+        if data.get("version") == MANIFEST_VERSION:
+            obj.targets = data["targets"]
+        return obj
+
+    def is_current(self, target: str, inputs: Optional[Dict]) -> bool:
+        return inputs is not None and self.targets.get(target) == inputs
+
+    def record(self, target: str, inputs: Dict):
+        self.targets[target] = inputs
+
+    def save(self):
+        if self.path is None:
+            return
+
+        try:
+            with atomic_write(self.path, encoding="utf-8") as out_file:
+                json.dump(
+                    {"version": MANIFEST_VERSION, "targets": self.targets}, out_file
+                )
+        except OSError:
+            logger.warning("Failed to save entity sheet manifest to %s", self.path)
+
+
+def _target_key(sprite_merger) -> str:
+    # pylint: disable=protected-access
+    return sprite_merger._target_sprite_sheet_path.as_posix()
+
+
+def merger_inputs(
+    sprite_merger,
+    loader_index: LoaderIndex,
+    staleness_index: StalenessIndex,
+) -> Optional[Dict]:
+    """What the sheet merged by `sprite_merger` depends on.
+
+    That is the contents of each source sheet, where each sprite is cropped
+    from in it and where it goes on the merged sheet. None if a source sheet
+    is missing, the merge can't be skipped then.
+    """
+    # pylint: disable=protected-access
+    layout = json.dumps(sprite_merger.layout(), sort_keys=True)
+    sources = {}
+    crops = []
+    for loader_type in sprite_merger.source_types:
+        sprite_loader = loader_index.find(loader_type)
+        if sprite_loader is None:
+            return None
+        try:
+            md5sum = staleness_index.md5sum(sprite_loader.sprite_sheet_path)
+        except OSError:
+            return None
+        sources[sprite_loader._sprite_sheet_path.as_posix()] = md5sum.decode()
+
+        # The loaders' chunk maps come from the game data shipped with
+        # modlunky2, so they can change without the sheet changing
+        names = sorted(
+            {
+                name
+                for chunk_map in sprite_merger._origin_map[loader_type]
+                for name in chunk_map
+            }
+        )
+        crops.append(
+            [
+                sprite_loader._sprite_sheet_path.as_posix(),
+                sprite_loader._chunk_size,
+                [[name, sprite_loader._chunk_map.get(name)] for name in names],
+            ]
+        )
+
+    return {
+        "layout": hashlib.sha1(layout.encode()).hexdigest(),
+        "crops": hashlib.sha1(json.dumps(crops).encode()).hexdigest(),
+        "sources": sources,
+    }
+
+
+def stale_mergers(
+    sprite_loaders,
+    sprite_mergers,
+    manifest: EntitySheetManifest,
+    staleness_index: StalenessIndex,
+):
+    """Indexes of the sheets that have to be merged again, with their inputs.
+
+    Inputs are None for sheets that can't be recorded in the manifest.
+    """
+    loader_index = LoaderIndex(sprite_loaders)
+    stale = []
+    inputs = []
+    for idx, sprite_merger in enumerate(sprite_mergers):
+        merger_input = merger_inputs(sprite_merger, loader_index, staleness_index)
+        inputs.append(merger_input)
+        current = manifest.is_current(_target_key(sprite_merger), merger_input)
+        if not current or not all(map(os.path.exists, sprite_merger.output_paths)):
+            stale.append(idx)
+    return stale, inputs
+
+
+def plan_workers(
+    sprite_mergers, num_workers: int, indexes: Optional[List[int]] = None
+) -> List[List[int]]:
+    """Split the mergers at `indexes`, all of them by default, between workers.
+
+    Mergers reading mostly from the same sheet go to the same worker, so each
+    source sheet is decoded in as few workers as possible.
+    """
+    if indexes is None:
+        indexes = range(len(sprite_mergers))
+    groups = defaultdict(list)
+    for idx in indexes:
+        groups[_primary_source(sprite_mergers[idx])].append(idx)
+
+    workers = [[] for _ in range(max(min(num_workers, len(groups)), 1))]
+    for group in sorted(groups.values(), key=len, reverse=True):
+        min(workers, key=len).extend(group)
+    return [sorted(indexes) for indexes in workers if indexes]
+
+
+def _save(sprite_merger) -> bool:
+    try:
+        sprite_merger.save()
+        return True
+    except Exception:  # pylint: disable=broad-except
+        logger.critical(
+            "Failed to save sprite sheet for %s: %s",
+            sprite_merger.stem,
+            "".join(traceback.format_exception(*sys.exc_info())).strip(),
+        )
+        return False
+    finally:
+        sprite_merger.release_images()
+
+
+def merge_entity_sheets(
+    sprite_loaders, sprite_mergers, indexes: List[int]
+) -> List[int]:
+    """Merge and save the sheets at `indexes`.
+
+    Each sheet is saved on another thread while the next one is merged.
+    Returns the indexes of the sheets that were saved.
+    """
+    loader_index = LoaderIndex(sprite_loaders)
+    saves = {}
+    with ThreadPoolExecutor(max_workers=ENCODE_THREADS) as encoder:
+        for idx in indexes:
+            sprite_merger = sprite_mergers[idx]
+            try:
+                sprite_merger.do_merge(loader_index)
+            except Exception:  # pylint: disable=broad-except
+                logger.critical(
+                    "Failed to merge sprite for %s: %s",
+                    sprite_merger.stem,
+                    "".join(traceback.format_exception(*sys.exc_info())).strip(),
+                )
+                sprite_merger.release_images()
+                continue
+            saves[idx] = encoder.submit(_save, sprite_merger)
+
+    return [idx for idx, saved in saves.items() if saved.result()]
+
+
+def _merge_in_process(extract_dir: Path, indexes: List[int]) -> List[int]:
+    """ Process pool entry point, the worker loads the sheets it needs itself."""
+    sprite_loaders, sprite_mergers = load_entity_sheets(extract_dir)
+    return merge_entity_sheets(sprite_loaders, sprite_mergers, indexes)
+
+
+def create_entity_sheets(
+    extract_dir: Path,
+    max_workers: int = DEFAULT_MAX_WORKERS,
+    executor_type: ExecutorType = ExecutorType.PROCESS,
+    force: bool = False,
+    manifest: Optional[EntitySheetManifest] = None,
+):
+    """Merge the entity sheets of `extract_dir`.
+
+    Sheets whose source sheets and layout match what they were last built
+    from are skipped, unless `force` is set.
+    """
+    logger.info("Creating entity sprite sheets...")
+
+    executor_type = ExecutorType(executor_type)
+    if manifest is None:
+        manifest = EntitySheetManifest.from_path(
+            EntitySheetManifest.default_path(extract_dir)
+        )
+    staleness_index = StalenessIndex()
+    if manifest.staleness_path is not None:
+        staleness_index = StalenessIndex.from_path(manifest.staleness_path)
+
+    sprite_loaders, sprite_mergers = load_entity_sheets(extract_dir)
+    stale, inputs = stale_mergers(
+        sprite_loaders, sprite_mergers, manifest, staleness_index
+    )
+    staleness_index.save()
+    if force:
+        stale = list(range(len(sprite_mergers)))
+    logger.info(
+        "%s of %s entity sprite sheets need merging", len(stale), len(sprite_mergers)
+    )
+    if not stale:
+        logger.info("Done creating entity sprite sheets...")
+        return
+
+    plan = plan_workers(sprite_mergers, max_workers, stale)
+
+    with make_executor(executor_type, max_workers) as pool:
+        if executor_type == ExecutorType.PROCESS:
+            # Only indexes are sent, images never cross between processes
+            futures = [
+                pool.submit(_merge_in_process, extract_dir, indexes)
+                for indexes in plan
+            ]
+        else:
+            futures = [
+                pool.submit(
+                    merge_entity_sheets, sprite_loaders, sprite_mergers, indexes
+                )
+                for indexes in plan
+            ]
+        wait(futures, timeout=ENTITY_SHEETS_TIMEOUT)
+
+    for future in futures:
+        if not future.done():
+            continue
+        if future.exception() is not None:
+            logger.critical("Failed to create entity sheets: %s", future.exception())
+            continue
+        for idx in future.result():
+            if inputs[idx] is not None:
+                manifest.record(_target_key(sprite_mergers[idx]), inputs[idx])
+    manifest.save()
+
+    logger.info("Done creating entity sprite sheets...")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Create merged entity sprite sheets from extracted assets."
+    )
+    parser.add_argument(
+        "extract_dir", type=Path, help="Path to the extracted assets, Mods/Extracted"
+    )
+    parser.add_argument(
+        "--executor",
+        type=ExecutorType,
+        choices=list(ExecutorType),
+        default=ExecutorType.PROCESS,
+        help="How to run work in parallel. Choices: %(choices)s. Default: %(default)s",
+    )
+    parser.add_argument(
+        "--max-workers",
+        type=int,
+        default=DEFAULT_MAX_WORKERS,
+        help="Number of workers to run in parallel. Default: %(default)s",
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Merge every sheet, even those whose sources haven't changed.",
+    )
+    args = parser.parse_args()
+
+    logging.basicConfig(format="%(levelname)s - %(message)s", level=logging.INFO)
+    create_entity_sheets(
+        args.extract_dir, args.max_workers, args.executor, force=args.force
+    )
+
+
+if __name__ == "__main__":
+    main()
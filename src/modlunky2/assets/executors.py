@@ -0,0 +1,45 @@
+import os
+from concurrent.futures import Executor, Future
+from concurrent.futures.process import ProcessPoolExecutor
+from concurrent.futures.thread import ThreadPoolExecutor
+from enum import Enum
+
+DEFAULT_MAX_WORKERS = max(os.cpu_count() - 2, 1)
+
+
+class ExecutorType(Enum):
+    THREAD = "thread"
+    PROCESS = "process"
+    INLINE = "inline"
+
+    def __str__(self):
+        return self.value
+
+
+class InlineExecutor(Executor):
+    """ Runs submitted work immediately in the calling thread."""
+
+    def submit(self, fn, *args, **kwargs):  # pylint: disable=arguments-differ
+        future = Future()
+        try:
+            result = fn(*args, **kwargs)
+        except BaseException as err:  # pylint: disable=broad-except
+            future.set_exception(err)
+        else:
+            future.set_result(result)
+        return future
+
+
+def make_executor(
+    executor_type: ExecutorType = ExecutorType.THREAD,
+    max_workers: int = DEFAULT_MAX_WORKERS,
+) -> Executor:
+    executor_type = ExecutorType(executor_type)
+
+    if executor_type == ExecutorType.THREAD:
+        return ThreadPoolExecutor(max_workers=max_workers)
+
+    if executor_type == ExecutorType.PROCESS:
+        return ProcessPoolExecutor(max_workers=max_workers)
+
+    return InlineExecutor()
@@ -3,6 +3,7 @@ import logging
 from pathlib import Path
 
 from .assets import AssetStore
+from .executors import DEFAULT_MAX_WORKERS, ExecutorType
 from .constants import (
     DEFAULT_COMPRESSION_LEVEL,
     EXTRACTED_DIR,
@@ -57,6 +58,37 @@ def main():
         action="store_true",
         help=("Create extended entity assets merged from multiple sheets."),
     )
+    parser.add_argument(
+        "--force-entity-sheets",
+        default=False,
+        action="store_true",
+        help="Merge every entity sheet, even those whose sources haven't changed.",
+    )
+    parser.add_argument(
+        "--compression-threads",
+        type=int,
+        default=0,
+        help=(
+            "Worker threads zstd uses for each large asset, 0 disables them."
+            " Default: %(default)s"
+        ),
+    )
+    parser.add_argument(
+        "--executor",
+        type=ExecutorType,
+        choices=list(ExecutorType),
+        default=ExecutorType.THREAD,
+        help=(
+            "How to run work in parallel, processes avoid contention on the GIL."
+            " Choices: %(choices)s. Default: %(default)s"
+        ),
+    )
+    parser.add_argument(
+        "--max-workers",
+        type=int,
+        default=DEFAULT_MAX_WORKERS,
+        help="Number of workers to run in parallel. Default: %(default)s",
+    )
     parser.add_argument(
         "--no-mkdirs",
         dest="mkdirs",
@@ -83,14 +115,21 @@ def main():
                 parents=True, exist_ok=True
             )
 
-    asset_store = AssetStore.load_from_file(args.exe)
-    unextracted = asset_store.extract(
-        mods_dir / extracted_dir,
-        mods_dir / ".compressed" / extracted_dir,
-        args.compression_level,
-        recompress=args.recompress,
-        create_entity_sheets=args.create_entity_sheets,
-    )
+    asset_store = AssetStore.load_from_mmap(args.exe)
+    try:
+        unextracted = asset_store.extract(
+            mods_dir / extracted_dir,
+            mods_dir / ".compressed" / extracted_dir,
+            args.compression_level,
+            max_workers=args.max_workers,
+            recompress=args.recompress,
+            create_entity_sheets=args.create_entity_sheets,
+            executor_type=args.executor,
+            force_entity_sheets=args.force_entity_sheets,
+            compression_threads=args.compression_threads,
+        )
+    finally:
+        asset_store.close()
 
     for asset in unextracted:
         logging.warning("Un-extracted Asset %s", asset)
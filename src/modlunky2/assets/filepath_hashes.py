@@ -0,0 +1,88 @@
+import json
+import logging
+from collections import OrderedDict
+from pathlib import Path
+from threading import Lock
+from typing import Optional
+
+from modlunky2.config import CACHE_DIR
+from modlunky2.utils import atomic_write
+
+from .chacha import hash_filepath
+
+logger = logging.getLogger("modlunky2")
+
+FILEPATH_HASHES_PATH = CACHE_DIR / "filepath-hashes.json"
+
+# Every pack produces a new bundle key so only keep the most recent ones.
+MAX_CACHED_KEYS = 8
+
+
+class FilepathHashes:
+    """ Memoizes `hash_filepath` results for each bundle key, optionally on disk."""
+
+    def __init__(self, path: Optional[Path] = None):
+        self.path = path
+        self.dirty = False
+        self._hashes = OrderedDict()
+        self._lock = Lock()
+
+    @classmethod
+    def from_path(cls, path: Path) -> "FilepathHashes":
+        obj = cls(path)
+
+        if not path.exists():
+            return obj
+
+        with path.open("r", encoding="utf-8") as hashes_file:
+            try:
+                hashes = json.load(hashes_file)
+            except json.JSONDecodeError:
+                logger.warning("Failed to read cached filepath hashes from %s", path)
+                return obj
+
+        for key, filepaths in hashes.items():
+            obj._hashes[key] = {
+                filepath: bytes.fromhex(hash_) for filepath, hash_ in filepaths.items()
+            }
+
+        return obj
+
+    @classmethod
+    def default(cls) -> "FilepathHashes":
+        return cls.from_path(FILEPATH_HASHES_PATH)
+
+    def get(self, key: int, filepath: str) -> bytes:
+        key_str = f"{key:016x}"
+        with self._lock:
+            filepaths = self._hashes.get(key_str)
+            if filepaths is None:
+                filepaths = self._hashes[key_str] = {}
+            self._hashes.move_to_end(key_str)
+
+            hash_ = filepaths.get(filepath)
+            if hash_ is None:
+                hash_ = filepaths[filepath] = hash_filepath(filepath.encode(), key)
+                self.dirty = True
+
+            return hash_
+
+    def save(self):
+        if self.path is None or not self.dirty:
+            return
+
+        with self._lock:
+            while len(self._hashes) > MAX_CACHED_KEYS:
+                self._hashes.popitem(last=False)
+
+            out = {
+                key: {filepath: hash_.hex() for filepath, hash_ in filepaths.items()}
+                for key, filepaths in self._hashes.items()
+            }
+            self.dirty = False
+
+        try:
+            with atomic_write(self.path, encoding="utf-8") as out_file:
+                json.dump(out, out_file)
+        except OSError:
+            logger.warning("Failed to cache filepath hashes to %s", self.path)
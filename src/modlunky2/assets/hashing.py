@@ -1,7 +1,11 @@
 import hashlib
 
+# Large reads keep the time spent in python per byte hashed low. hashlib
+# also releases the GIL for updates this big so threads hash in parallel.
+MD5_CHUNK_SIZE = 1024 * 1024
 
-def md5sum_path(path, chunk_size=8192):
+
+def md5sum_path(path, chunk_size=MD5_CHUNK_SIZE):
     """ Streaming md5 digest from a path."""
 
     with path.open("rb") as file_:
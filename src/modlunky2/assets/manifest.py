@@ -0,0 +1,116 @@
+import json
+import logging
+import os
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+from modlunky2.utils import atomic_write
+
+logger = logging.getLogger("modlunky2")
+
+PACK_MANIFEST_NAME = "pack-manifest.json"
+
+
+@dataclass
+class PackedAsset:
+    """ Where and what was written for a single asset in the last pack."""
+
+    offset: int
+    asset_len: int
+    filepath_len: int
+
+    # md5 of the data before encryption
+    md5sum: str
+
+    @property
+    def layout(self) -> Tuple[int, int, int]:
+        return (self.offset, self.asset_len, self.filepath_len)
+
+
+def stat_path(path: Path) -> Optional[Tuple[int, int]]:
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return (stat.st_size, stat.st_mtime_ns)
+
+
+class PackManifest:
+    """Records the layout of the last packed exe so unchanged blocks can be skipped.
+
+    The manifest is only trusted for an exe whose size and mtime haven't changed
+    since the manifest was saved.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.key = None
+        self.source_stat = None
+        self.dest_stat = None
+        self.assets: Dict[str, PackedAsset] = {}
+
+    @classmethod
+    def from_compressed_dir(cls, compressed_dir: Path) -> "PackManifest":
+        return cls.from_path(compressed_dir / PACK_MANIFEST_NAME)
+
+    @classmethod
+    def from_path(cls, path: Path) -> "PackManifest":
+        obj = cls(path)
+
+        if not path.exists():
+            return obj
+
+        with path.open("r", encoding="utf-8") as manifest_file:
+            try:
+                manifest = json.load(manifest_file)
+                obj.key = manifest["key"]
+                obj.source_stat = tuple(manifest["source-stat"])
+                obj.dest_stat = tuple(manifest["dest-stat"])
+                obj.assets = {
+                    filepath: PackedAsset(**packed_asset)
+                    for filepath, packed_asset in manifest["assets"].items()
+                }
+            except (json.JSONDecodeError, KeyError, TypeError):
+                logger.warning("Ignoring unreadable pack manifest %s", path)
+                return cls(path)
+
+        return obj
+
+    def matches_exes(self, source_exe: Path, dest_exe: Path) -> bool:
+        """ Whether dest_exe is still what we packed from source_exe."""
+        if self.key is None:
+            return False
+        return (
+            stat_path(source_exe) == self.source_stat
+            and stat_path(dest_exe) == self.dest_stat
+        )
+
+    def layout(self) -> Dict[str, Tuple[int, int, int]]:
+        return {
+            filepath: packed_asset.layout
+            for filepath, packed_asset in self.assets.items()
+        }
+
+    def to_dict(self):
+        return {
+            "key": self.key,
+            "source-stat": self.source_stat,
+            "dest-stat": self.dest_stat,
+            "assets": {
+                filepath: asdict(packed_asset)
+                for filepath, packed_asset in self.assets.items()
+            },
+        }
+
+    def save(self, source_exe: Path, dest_exe: Path):
+        """ Save after the dest exe is fully written and closed."""
+        self.source_stat = stat_path(source_exe)
+        self.dest_stat = stat_path(dest_exe)
+
+        with atomic_write(self.path, encoding="utf-8") as out_file:
+            json.dump(self.to_dict(), out_file)
+
+    def delete(self):
+        if self.path.exists():
+            self.path.unlink()
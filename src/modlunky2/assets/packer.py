@@ -5,8 +5,10 @@ import sys
 from pathlib import Path
 
 from .assets import AssetStore
+from .executors import DEFAULT_MAX_WORKERS, ExecutorType
 from .constants import DEFAULT_COMPRESSION_LEVEL, EXTRACTED_DIR, OVERRIDES_DIR
 from .exc import MissingAsset
+from .manifest import PackManifest
 from .patcher import Patcher
 
 DEFAULT_MODS_DIR = "Mods"
@@ -36,6 +38,31 @@ def main():
             " - if modified assets are too large, increase compression"
         ),
     )
+    parser.add_argument(
+        "--compression-threads",
+        type=int,
+        default=0,
+        help=(
+            "Worker threads zstd uses for each large asset, 0 disables them."
+            " Default: %(default)s"
+        ),
+    )
+    parser.add_argument(
+        "--executor",
+        type=ExecutorType,
+        choices=list(ExecutorType),
+        default=ExecutorType.THREAD,
+        help=(
+            "How to run work in parallel, processes avoid contention on the GIL."
+            " Choices: %(choices)s. Default: %(default)s"
+        ),
+    )
+    parser.add_argument(
+        "--max-workers",
+        type=int,
+        default=DEFAULT_MAX_WORKERS,
+        help="Number of workers to run in parallel. Default: %(default)s",
+    )
     parser.add_argument(
         "source",
         type=argparse.FileType("rb"),
@@ -61,8 +88,16 @@ def main():
             print("Exiting...")
             sys.exit(0)
 
-    print(f"Making copy of {args.source.name} to {dest}")
-    shutil.copy2(args.source.name, dest)
+    source = Path(args.source.name)
+    compressed_dir = mods_dir / ".compressed"
+    manifest = PackManifest.from_compressed_dir(compressed_dir)
+    reuse_dest = manifest.matches_exes(source, dest)
+    if reuse_dest:
+        print(f"Reusing previously packed {dest}")
+    else:
+        manifest = PackManifest(manifest.path)
+        print(f"Making copy of {source} to {dest}")
+        shutil.copy2(source, dest)
 
     search_dirs = []
     for search_dir in args.pack_dir:
@@ -75,8 +110,12 @@ def main():
             asset_store.repackage(
                 search_dirs,
                 mods_dir / EXTRACTED_DIR,
-                mods_dir / ".compressed",
+                compressed_dir,
                 args.compression_level,
+                max_workers=args.max_workers,
+                executor_type=args.executor,
+                manifest=manifest,
+                compression_threads=args.compression_threads,
             )
         except MissingAsset as err:
             print("")
@@ -85,9 +124,12 @@ def main():
             print("")
             sys.exit(1)
 
-        patcher = Patcher(dest_file)
-        patcher.patch_checksum()
-        patcher.patch_release()
+        if not reuse_dest:
+            patcher = Patcher(dest_file)
+            patcher.patch_checksum()
+            patcher.patch_release()
+
+    manifest.save(source, dest)
 
 
 if __name__ == "__main__":
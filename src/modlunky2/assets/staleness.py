@@ -0,0 +1,84 @@
+import json
+import logging
+import os
+from pathlib import Path
+from threading import Lock
+
+from modlunky2.utils import atomic_write
+
+from .hashing import md5sum_path
+
+logger = logging.getLogger("modlunky2")
+
+STALENESS_INDEX_NAME = "staleness-index.json"
+
+
+class StalenessIndex:
+    """Remembers the md5 of source files along with their size and mtime.
+
+    A file is only hashed again once its stat no longer matches, so checking
+    a mostly unchanged mod tree is a walk of `os.stat` calls.
+    """
+
+    def __init__(self, path=None):
+        self.path = path
+        self.dirty = False
+        self._entries = {}
+        self._lock = Lock()
+
+    @classmethod
+    def from_compressed_dir(cls, compressed_dir: Path) -> "StalenessIndex":
+        return cls.from_path(compressed_dir / STALENESS_INDEX_NAME)
+
+    @classmethod
+    def from_path(cls, path: Path) -> "StalenessIndex":
+        obj = cls(path)
+
+        if not path.exists():
+            return obj
+
+        with path.open("r", encoding="utf-8") as index_file:
+            try:
+                entries = json.load(index_file)
+            except json.JSONDecodeError:
+                logger.warning("Failed to read staleness index from %s", path)
+                return obj
+
+        for asset_path, (size, mtime_ns, md5sum) in entries.items():
+            obj._entries[asset_path] = (size, mtime_ns, md5sum.encode())
+
+        return obj
+
+    def md5sum(self, path: Path) -> bytes:
+        """ md5 of the file at `path`, only read from disk if it changed."""
+        stat = os.stat(path)
+        key = str(path)
+
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is not None and entry[:2] == (stat.st_size, stat.st_mtime_ns):
+            return entry[2]
+
+        md5sum = md5sum_path(path)
+        with self._lock:
+            self._entries[key] = (stat.st_size, stat.st_mtime_ns, md5sum)
+            self.dirty = True
+        return md5sum
+
+    def save(self):
+        if self.path is None or not self.dirty:
+            return
+
+        with self._lock:
+            out = {
+                asset_path: [size, mtime_ns, md5sum.decode()]
+                for asset_path, (size, mtime_ns, md5sum) in self._entries.items()
+                if os.path.exists(asset_path)
+            }
+            self.dirty = False
+
+        try:
+            with atomic_write(self.path, encoding="utf-8") as out_file:
+                json.dump(out, out_file)
+        except OSError:
+            logger.warning("Failed to save staleness index to %s", self.path)
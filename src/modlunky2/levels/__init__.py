@@ -1,4 +1,5 @@
 from .level_file import LevelFile
+from .level_set import LevelSet
 from .level_chances import LevelChance
 from .level_templates import LevelTemplate
 from .monster_chances import MonsterChance
@@ -0,0 +1,126 @@
+"""
+
+Finds rooms that are repeated across level files, e.g.
+
+    python -m modlunky2.levels.chunk_store Mods/Extracted/Data/Levels
+"""
+
+import argparse
+from collections import defaultdict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+from .level_file import LevelFile
+from .level_templates import Chunk
+
+
+@dataclass(frozen=True)
+class ChunkLocation:
+    file: str
+    template: str
+    chunk: int
+
+
+class ChunkStore:
+    """Shares a single instance between chunks with the same content.
+
+    Chunks are keyed by `Chunk.content_hash` and their comment, so writing a
+    deduplicated level file gives back the same text. Chunks handed out by
+    the store can be shared by many templates and must be treated as read
+    only, copy one before editing it.
+    """
+
+    def __init__(self):
+        self._chunks: Dict[Tuple[str, str], Chunk] = {}
+        self._locations: Dict[str, List[ChunkLocation]] = defaultdict(list)
+        # Keys of the chunks interned with a location in each file, a key is
+        # listed once per location
+        self._file_keys: Dict[str, List[Tuple[str, str]]] = defaultdict(list)
+        self._uses: Dict[Tuple[str, str], int] = defaultdict(int)
+
+    def intern(self, chunk: Chunk, location: ChunkLocation = None) -> Chunk:
+        content_hash = chunk.content_hash()
+        key = (content_hash, chunk.comment)
+        if location is not None:
+            self._locations[content_hash].append(location)
+            self._file_keys[location.file].append(key)
+            self._uses[key] += 1
+        return self._chunks.setdefault(key, chunk)
+
+    def forget(self, name: str):
+        """Drop the locations in file `name`.
+
+        Chunks that were only used there are dropped as well.
+        """
+        for key in self._file_keys.pop(name, ()):
+            content_hash, _ = key
+            locations = [
+                location
+                for location in self._locations.get(content_hash, ())
+                if location.file != name
+            ]
+            if locations:
+                self._locations[content_hash] = locations
+            else:
+                self._locations.pop(content_hash, None)
+
+            self._uses[key] -= 1
+            if not self._uses[key]:
+                del self._uses[key]
+                self._chunks.pop(key, None)
+
+    def dedupe_level_file(self, name: str, level_file: LevelFile):
+        """Replace the chunks of every template with the stored instances.
+
+        Whatever was stored for an earlier version of the file is forgotten.
+        """
+        self.forget(name)
+        for template in level_file.level_templates.all():
+            template.chunks = [
+                self.intern(chunk, ChunkLocation(name, template.name, idx))
+                for idx, chunk in enumerate(template.chunks)
+            ]
+
+    def duplicates(self) -> Dict[str, List[ChunkLocation]]:
+        """ Rooms found in more than one place, by content hash."""
+        return {
+            content_hash: locations
+            for content_hash, locations in self._locations.items()
+            if len(locations) > 1
+        }
+
+    def num_seen(self) -> int:
+        """ How many chunks were interned with a location."""
+        return sum(len(locations) for locations in self._locations.values())
+
+    def __len__(self):
+        return len(self._chunks)
+
+
+def main():
+    # pylint: disable=import-outside-toplevel
+    from .level_set import LevelSet
+
+    parser = argparse.ArgumentParser(description="Report duplicate rooms.")
+    parser.add_argument("levels_dir", type=Path, help="Directory of .lvl files.")
+    args = parser.parse_args()
+
+    levels = LevelSet.load_dir(args.levels_dir, cache_dir=None)
+    store = levels.chunk_store
+
+    duplicates = store.duplicates()
+    for content_hash, locations in sorted(
+        duplicates.items(), key=lambda item: -len(item[1])
+    ):
+        print(f"{content_hash[:12]}: {len(locations)} copies")
+        for location in locations:
+            print(f"    {location.file} {location.template} chunk {location.chunk}")
+    print(
+        f"{store.num_seen()} rooms, {len(store)} unique,"
+        f" {len(duplicates)} duplicated"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,382 @@
+"""
+
+A binary form of `LevelFile` that loads much faster than parsing the text.
+
+    python -m modlunky2.levels.compiled compile Data/Levels compiled/
+    python -m modlunky2.levels.compiled decompile compiled/ Data/Levels
+
+Layout, all integers little endian:
+
+    header          magic, version, number of sections
+    offset table    (offset, length) of each section in `SECTIONS` order
+    strings         count, offset of each string, utf-8 data
+    comment         string index of the file comment
+    directives      for each of the 4 directive sections: string index of the
+                    section comment, count, then (name, value, comment) string
+                    indexes for every directive
+    level_templates string index of the section comment, count, offset of each
+                    template, then the templates with their chunks
+
+Every name, value and comment is stored once in the string table and referred
+to by index. Rooms are stored as the row lengths followed by the tiles as
+cp1252 bytes, which is what `RoomGrid` holds in memory.
+"""
+
+import argparse
+import mmap
+import struct
+from functools import partial
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from modlunky2.utils import atomic_write
+
+from .level_chances import LevelChance
+from .level_file import LevelFile
+from .level_settings import LevelSetting
+from .level_templates import Chunk, LevelTemplate, TemplateSetting
+from .monster_chances import MonsterChance
+from .room_grid import RoomGrid
+from .tile_codes import TileCode
+
+MAGIC = b"MLVC"
+COMPILED_LEVEL_VERSION = 1
+COMPILED_SUFFIX = ".lvlc"
+
+SECTIONS = [
+    "strings",
+    "comment",
+    "level_settings",
+    "tile_codes",
+    "level_chances",
+    "monster_chances",
+    "level_templates",
+]
+
+DIRECTIVE_CLASSES = {
+    "level_settings": LevelSetting,
+    "tile_codes": TileCode,
+    "level_chances": LevelChance,
+    "monster_chances": MonsterChance,
+}
+
+TEMPLATE_SETTINGS = list(TemplateSetting)
+
+HEADER = struct.Struct("<4sHH")
+SECTION_ENTRY = struct.Struct("<II")
+U16 = struct.Struct("<H")
+U32 = struct.Struct("<I")
+PAIR = struct.Struct("<II")
+TEMPLATE_HEADER = struct.Struct("<III")
+CHUNK_HEADER = struct.Struct("<IB")
+
+# String index used for comments that are None rather than empty
+NO_STRING = 0xFFFFFFFF
+
+
+class _StringTable:
+    def __init__(self):
+        self._indexes: Dict[str, int] = {}
+
+    def index(self, value: Optional[str]) -> int:
+        if value is None:
+            return NO_STRING
+        return self._indexes.setdefault(value, len(self._indexes))
+
+    def pack(self) -> bytes:
+        encoded = [value.encode("utf-8") for value in self._indexes]
+        offsets = [0]
+        for data in encoded:
+            offsets.append(offsets[-1] + len(data))
+        return b"".join(
+            [
+                U32.pack(len(encoded)),
+                struct.pack(f"<{len(offsets)}I", *offsets),
+                *encoded,
+            ]
+        )
+
+
+def _value_to_str(directive) -> str:
+    # Tile code values are already the character from the file
+    if isinstance(directive, TileCode):
+        return directive.value
+    return directive.value_to_str()
+
+
+def _pack_grid(grid: RoomGrid) -> bytes:
+    lengths = grid.row_lengths()
+    return b"".join(
+        [
+            U16.pack(len(lengths)),
+            struct.pack(f"<{len(lengths)}H", *lengths),
+            grid.tobytes(),
+        ]
+    )
+
+
+def _pack_template(template: LevelTemplate, strings: _StringTable) -> bytes:
+    parts = [
+        TEMPLATE_HEADER.pack(
+            strings.index(template.name),
+            strings.index(template.comment),
+            len(template.chunks),
+        )
+    ]
+    for chunk in template.chunks:
+        parts.append(
+            CHUNK_HEADER.pack(strings.index(chunk.comment), len(chunk.settings))
+        )
+        parts.append(
+            bytes(TEMPLATE_SETTINGS.index(setting) for setting in chunk.settings)
+        )
+        parts.append(_pack_grid(chunk.foreground))
+        parts.append(_pack_grid(chunk.background))
+    return b"".join(parts)
+
+
+def compile_level_file(level_file: LevelFile) -> bytes:
+    strings = _StringTable()
+    sections = {"comment": U32.pack(strings.index(level_file.comment))}
+
+    for attr in DIRECTIVE_CLASSES:
+        container = getattr(level_file, attr)
+        directives = container.all()
+        indexes = []
+        for directive in directives:
+            indexes.extend(
+                [
+                    strings.index(directive.name),
+                    strings.index(_value_to_str(directive)),
+                    strings.index(directive.comment),
+                ]
+            )
+        sections[attr] = b"".join(
+            [
+                PAIR.pack(strings.index(container.comment), len(directives)),
+                struct.pack(f"<{len(indexes)}I", *indexes),
+            ]
+        )
+
+    level_templates = level_file.level_templates
+    packed = [
+        _pack_template(template, strings) for template in level_templates.all()
+    ]
+    offsets = []
+    offset = PAIR.size + U32.size * len(packed)
+    for data in packed:
+        offsets.append(offset)
+        offset += len(data)
+    sections["level_templates"] = b"".join(
+        [
+            PAIR.pack(strings.index(level_templates.comment), len(packed)),
+            struct.pack(f"<{len(offsets)}I", *offsets),
+            *packed,
+        ]
+    )
+
+    sections["strings"] = strings.pack()
+
+    offset = HEADER.size + SECTION_ENTRY.size * len(SECTIONS)
+    table = []
+    for name in SECTIONS:
+        table.append(SECTION_ENTRY.pack(offset, len(sections[name])))
+        offset += len(sections[name])
+
+    return b"".join(
+        [
+            HEADER.pack(MAGIC, COMPILED_LEVEL_VERSION, len(SECTIONS)),
+            *table,
+            *(sections[name] for name in SECTIONS),
+        ]
+    )
+
+
+def _string(strings: List[str], index: int) -> Optional[str]:
+    return None if index == NO_STRING else strings[index]
+
+
+def _read_strings(data, offset: int) -> List[str]:
+    (count,) = U32.unpack_from(data, offset)
+    offset += U32.size
+    offsets = struct.unpack_from(f"<{count + 1}I", data, offset)
+    start = offset + U32.size * (count + 1)
+    blob = bytes(data[start : start + offsets[-1]])
+    text = blob.decode("utf-8")
+    if len(text) != len(blob):
+        # Not all ascii so byte offsets don't line up with the decoded text
+        return [
+            blob[begin:end].decode("utf-8") for begin, end in zip(offsets, offsets[1:])
+        ]
+    return [text[begin:end] for begin, end in zip(offsets, offsets[1:])]
+
+
+def _read_grid(data, offset: int):
+    (height,) = U16.unpack_from(data, offset)
+    offset += U16.size
+    lengths = struct.unpack_from(f"<{height}H", data, offset)
+    offset += U16.size * height
+    end = offset + sum(lengths)
+    return RoomGrid.from_packed(data[offset:end], lengths), end
+
+
+def _read_template(data, strings: List[str], offset: int) -> LevelTemplate:
+    name, comment, num_chunks = TEMPLATE_HEADER.unpack_from(data, offset)
+    offset += TEMPLATE_HEADER.size
+
+    chunks = []
+    for _ in range(num_chunks):
+        chunk_comment, num_settings = CHUNK_HEADER.unpack_from(data, offset)
+        offset += CHUNK_HEADER.size
+        settings = [
+            TEMPLATE_SETTINGS[index] for index in data[offset : offset + num_settings]
+        ]
+        offset += num_settings
+        foreground, offset = _read_grid(data, offset)
+        background, offset = _read_grid(data, offset)
+        chunks.append(
+            Chunk(_string(strings, chunk_comment), settings, foreground, background)
+        )
+
+    return LevelTemplate(strings[name], _string(strings, comment), chunks)
+
+
+def decompile_level_file(data, lazy: bool = False) -> LevelFile:
+    """Load a level file from compiled data, any bytes-like object.
+
+    With `lazy`, templates are only read the first time they're accessed, so
+    `data` has to stay open until then.
+    """
+    if len(data) < HEADER.size:
+        raise ValueError("Truncated compiled level file")
+    magic, version, num_sections = HEADER.unpack_from(data, 0)
+    if magic != MAGIC:
+        raise ValueError("Not a compiled level file")
+    if version != COMPILED_LEVEL_VERSION or num_sections != len(SECTIONS):
+        raise ValueError(f"Unsupported compiled level version {version}")
+
+    offsets = {}
+    end = HEADER.size + SECTION_ENTRY.size * len(SECTIONS)
+    if len(data) < end:
+        raise ValueError("Truncated compiled level file")
+    for idx, name in enumerate(SECTIONS):
+        offset, length = SECTION_ENTRY.unpack_from(
+            data, HEADER.size + SECTION_ENTRY.size * idx
+        )
+        if offset != end:
+            raise ValueError("Corrupt compiled level file")
+        offsets[name] = offset
+        end = offset + length
+    # Sections are written back to back, anything else was cut short
+    if end != len(data):
+        raise ValueError("Truncated compiled level file")
+
+    strings = _read_strings(data, offsets["strings"])
+
+    level_file = LevelFile.empty()
+    (comment,) = U32.unpack_from(data, offsets["comment"])
+    level_file.comment = _string(strings, comment)
+
+    for attr, directive_cls in DIRECTIVE_CLASSES.items():
+        container = getattr(level_file, attr)
+        section_comment, count = PAIR.unpack_from(data, offsets[attr])
+        container.comment = _string(strings, section_comment)
+        indexes = struct.unpack_from(
+            f"<{3 * count}I", data, offsets[attr] + PAIR.size
+        )
+        for idx in range(0, len(indexes), 3):
+            name, value, directive_comment = indexes[idx : idx + 3]
+            directive = directive_cls(
+                strings[name], strings[value], _string(strings, directive_comment)
+            )
+            container.set_obj(directive, validate=False)
+
+    level_templates = level_file.level_templates
+    start = offsets["level_templates"]
+    section_comment, count = PAIR.unpack_from(data, start)
+    level_templates.comment = _string(strings, section_comment)
+    template_offsets = struct.unpack_from(f"<{count}I", data, start + PAIR.size)
+    for template_offset in template_offsets:
+        offset = start + template_offset
+        if lazy:
+            (name,) = U32.unpack_from(data, offset)
+            level_templates.set_unparsed(
+                strings[name], partial(_read_template, data, strings, offset)
+            )
+        else:
+            level_templates.set_obj(
+                _read_template(data, strings, offset), validate=False
+            )
+
+    return level_file
+
+
+def write_compiled(level_file: LevelFile, path: Path):
+    with atomic_write(path, "wb") as compiled_file:
+        compiled_file.write(compile_level_file(level_file))
+
+
+def load_compiled(path: Path) -> LevelFile:
+    """ Load a compiled level file, see `MappedLevelFile` to read it lazily."""
+    with path.open("rb") as compiled_file:
+        mapped = mmap.mmap(compiled_file.fileno(), 0, access=mmap.ACCESS_READ)
+    try:
+        return decompile_level_file(mapped)
+    finally:
+        mapped.close()
+
+
+class MappedLevelFile:
+    """A compiled level file read lazily from an mmap.
+
+    This owns the mapping, templates are read from it the first time they're
+    accessed through `level_file`. Call `close`, or use it as a context
+    manager, once done. Templates that weren't read before then can't be
+    read afterwards.
+    """
+
+    def __init__(self, path: Path):
+        with path.open("rb") as compiled_file:
+            self._mmap = mmap.mmap(compiled_file.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            self.level_file = decompile_level_file(self._mmap, lazy=True)
+        except BaseException:
+            self._mmap.close()
+            raise
+
+    def close(self):
+        self._mmap.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Convert level files to and from the compiled format."
+    )
+    parser.add_argument("command", choices=["compile", "decompile"])
+    parser.add_argument("source_dir", type=Path)
+    parser.add_argument("dest_dir", type=Path)
+    args = parser.parse_args()
+
+    if args.command == "compile":
+        for path in sorted(args.source_dir.rglob("*.lvl")):
+            dest = args.dest_dir / path.relative_to(args.source_dir)
+            dest.parent.mkdir(parents=True, exist_ok=True)
+            write_compiled(
+                LevelFile.from_path(path, validate=False),
+                dest.with_suffix(COMPILED_SUFFIX),
+            )
+    else:
+        for path in sorted(args.source_dir.rglob(f"*{COMPILED_SUFFIX}")):
+            dest = args.dest_dir / path.relative_to(args.source_dir)
+            dest.parent.mkdir(parents=True, exist_ok=True)
+            load_compiled(path).write_path(dest.with_suffix(".lvl"))
+
+
+if __name__ == "__main__":
+    main()
@@ -42,9 +42,10 @@ class LevelChances:
         LevelChance.validate_name(name)
         return self._inner.get(name)
 
-    def set_obj(self, obj: "LevelChance"):
+    def set_obj(self, obj: "LevelChance", validate: bool = True):
         obj.clean()
-        obj.validate()
+        if validate:
+            obj.validate()
         self._inner[obj.name] = obj
 
     def write(self, handle: TextIO):
@@ -63,7 +64,7 @@ class LevelChance:
     comment: Optional[str]
 
     @classmethod
-    def parse(cls, line: str) -> "LevelChance":
+    def parse(cls, line: str, validate: bool = True) -> "LevelChance":
         rest, comment = split_comment(line)
         directive, value = rest.split(None, 1)
         name = directive[2:]
@@ -73,7 +74,8 @@ class LevelChance:
 
         obj = cls(name, value, comment)
         obj.clean()
-        obj.validate()
+        if validate:
+            obj.validate()
 
         return obj
 
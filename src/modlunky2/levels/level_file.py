@@ -1,18 +1,41 @@
-from io import BytesIO
+from io import BytesIO, StringIO
 import sys
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Optional
+from typing import List, Optional
 from typing import TextIO
 
+from modlunky2.utils import atomic_write
+
 from .level_chances import LevelChances, LevelChance
 from .level_settings import LevelSettings, LevelSetting
 from .level_templates import LevelTemplates, LevelTemplate
 from .monster_chances import MonsterChances, MonsterChance
 from .tile_codes import TileCodes, TileCode
+from .tokenizer import SECTION_COMMENT, tokenize_level_file
 from .utils import DirectivePrefixes, Peekable
 
-SECTION_COMMENT = "// ------------------------------"
+# Sections compared as a whole by `LevelFile.diff`, templates are compared
+# one at a time.
+DIFF_SECTIONS = ["level_settings", "tile_codes", "level_chances", "monster_chances"]
+
+
+def _section_key(section):
+    return section.comment, section.all()
+
+
+@dataclass
+class LevelFileDiff:
+    # Names of the changed `LevelFile` fields other than templates,
+    # "level_templates" is included when templates were added, removed,
+    # reordered or the section comment changed.
+    sections: List[str]
+
+    # Names of templates that were added, removed or changed
+    templates: List[str]
+
+    def __bool__(self):
+        return bool(self.sections or self.templates)
 
 
 def parse_section_comment(line, file_handle):
@@ -39,7 +62,34 @@ class LevelFile:
     level_templates: LevelTemplates
 
     @classmethod
-    def from_handle(cls, level_fh: BytesIO) -> "LevelFile":
+    def empty(cls) -> "LevelFile":
+        return cls(
+            comment=None,
+            level_settings=LevelSettings(),
+            tile_codes=TileCodes(),
+            level_chances=LevelChances(),
+            monster_chances=MonsterChances(),
+            level_templates=LevelTemplates(),
+        )
+
+    @classmethod
+    def from_handle(
+        cls, level_fh: TextIO, validate: bool = True, lazy: bool = False
+    ) -> "LevelFile":
+        """Parse a level file from a text handle.
+
+        With `lazy` only the names and positions of templates are read up
+        front, their chunks are parsed by `LevelTemplates.get`.
+        """
+        level_file = cls.empty()
+        tokenize_level_file(level_file, level_fh.readlines(), lazy)
+        if validate:
+            level_file.validate()
+        return level_file
+
+    @classmethod
+    def from_handle_legacy(cls, level_fh: BytesIO) -> "LevelFile":
+        """ The original line by line parser, kept as a reference for `from_handle`."""
         level_file = LevelFile(
             comment=None,
             level_settings=LevelSettings(),
@@ -113,21 +163,80 @@ class LevelFile:
         return level_file
 
     @classmethod
-    def from_path(cls, level_path: Path) -> "LevelFile":
+    def from_path(
+        cls, level_path: Path, validate: bool = True, lazy: bool = False
+    ) -> "LevelFile":
         with level_path.open("r", encoding="cp1252") as level_fh:
-            return cls.from_handle(level_fh)
+            return cls.from_handle(level_fh, validate, lazy)
+
+    def validate(self):
+        """ Raises a ValueError for the first invalid directive or template."""
+        for section in (
+            self.level_settings,
+            self.tile_codes,
+            self.level_chances,
+            self.monster_chances,
+        ):
+            for obj in section.all():
+                obj.validate()
+
+        # Only names are validated so unparsed templates can stay that way
+        for name in self.level_templates.names():
+            LevelTemplate.validate_name(name)
+
+    def to_string(self) -> str:
+        """ Render the whole file into a single string."""
+        buffer = StringIO()
+        buffer.write(f"{self.comment}\n")
+        self.level_settings.write(buffer)
+        self.tile_codes.write(buffer)
+        self.level_chances.write(buffer)
+        self.monster_chances.write(buffer)
+        self.level_templates.write(buffer)
+        return buffer.getvalue()
 
     def write(self, handle: TextIO):
-        handle.write(f"{self.comment}\n")
-        self.level_settings.write(handle)
-        self.tile_codes.write(handle)
-        self.level_chances.write(handle)
-        self.monster_chances.write(handle)
-        self.level_templates.write(handle)
-
-    def write_path(self, level_path: Path):
-        with level_path.open("w") as level_fh:
-            self.write(level_fh)
+        handle.write(self.to_string())
+
+    def write_path(self, level_path: Path, skip_unchanged: bool = True) -> bool:
+        """Atomically write the level file to `level_path`.
+
+        If the file on disk already has the same contents it's left untouched,
+        keeping its mtime. Returns whether the file was written.
+        """
+        contents = self.to_string()
+
+        if skip_unchanged and level_path.exists():
+            with level_path.open("r", encoding="cp1252") as level_fh:
+                if level_fh.read() == contents:
+                    return False
+
+        with atomic_write(level_path, encoding="cp1252") as level_fh:
+            level_fh.write(contents)
+        return True
+
+    def diff(self, other: "LevelFile") -> "LevelFileDiff":
+        """ The sections and templates that differ between two level files."""
+        sections = [
+            name
+            for name in DIFF_SECTIONS
+            if _section_key(getattr(self, name)) != _section_key(getattr(other, name))
+        ]
+        if self.comment != other.comment:
+            sections.insert(0, "comment")
+
+        ours = dict(zip(self.level_templates.names(), self.level_templates.all()))
+        theirs = dict(zip(other.level_templates.names(), other.level_templates.all()))
+        templates = [name for name in ours if ours[name] != theirs.get(name)]
+        templates.extend(name for name in theirs if name not in ours)
+
+        if (
+            self.level_templates.comment != other.level_templates.comment
+            or list(ours) != list(theirs)
+        ):
+            sections.append("level_templates")
+
+        return LevelFileDiff(sections=sections, templates=templates)
 
     def print(self):
         self.write(sys.stdout)
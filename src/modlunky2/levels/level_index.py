@@ -0,0 +1,261 @@
+import argparse
+import hashlib
+import json
+import logging
+from collections import defaultdict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from modlunky2.config import CACHE_DIR
+from modlunky2.utils import atomic_write
+
+from .level_file import LevelFile
+from .level_set import stat_key
+from .tile_codes import NO_TILE_ID, TILE_CODE_REGISTRY, TileCodes, tile_id_table
+
+logger = logging.getLogger("modlunky2")
+
+LEVEL_INDEX_DIR = CACHE_DIR / "level-index"
+LEVEL_INDEX_VERSION = 1
+
+# Most levels use tile codes that are only defined in here.
+FALLBACK_LEVEL = "generic.lvl"
+
+LAYERS = ["foreground", "background"]
+
+
+@dataclass(frozen=True)
+class TileLocation:
+    file: str
+    template: str
+    chunk: int
+    layer: str
+    row: int
+    col: int
+
+
+def index_level_file(level_file: LevelFile, fallback: Optional[LevelFile] = None):
+    """Everything the index keeps about a single level file.
+
+    Tiles are resolved with the file's own tile codes, falling back to the
+    tile codes of `fallback`.
+    """
+    tile_codes = TileCodes()
+    if fallback is not None:
+        for tile_code in fallback.tile_codes.all():
+            tile_codes.set_obj(tile_code, validate=False)
+    for tile_code in level_file.tile_codes.all():
+        tile_codes.set_obj(tile_code, validate=False)
+    table = tile_id_table(tile_codes)
+
+    tiles = defaultdict(list)
+    templates = {}
+    for template in level_file.level_templates.all():
+        templates[template.name] = len(template.chunks)
+        for chunk_idx, chunk in enumerate(template.chunks):
+            for layer in LAYERS:
+                grid = getattr(chunk, layer)
+                tile_ids = grid.to_ids(table)
+                offset = 0
+                for row, line in enumerate(grid.rows()):
+                    for col in range(len(line)):
+                        tile_id = tile_ids[offset + col]
+                        if tile_id != NO_TILE_ID:
+                            tiles[TILE_CODE_REGISTRY.name(tile_id)].append(
+                                [template.name, chunk_idx, layer, row, col]
+                            )
+                    offset += len(line)
+
+    return {
+        "tile-codes": {
+            tile_code.name: tile_code.value
+            for tile_code in level_file.tile_codes.all()
+        },
+        "templates": templates,
+        "settings": {
+            setting.name: setting.value_to_str()
+            for setting in level_file.level_settings.all()
+        },
+        "tiles": dict(tiles),
+    }
+
+
+class LevelIndex:
+    """Inverted index over the level files in a directory.
+
+    Answers which files define a tile code, where a tile is used, which files
+    have a template and what each file sets a level setting to. Files are only
+    re-indexed when their size or mtime changed, see `update`.
+    """
+
+    def __init__(self, root: Path, path: Optional[Path] = None):
+        self.root = root
+        self.path = path
+        self._files: Dict[str, dict] = {}
+        self._fallback_stat = None
+
+    @staticmethod
+    def default_path(root: Path) -> Path:
+        name = hashlib.sha1(str(root.resolve()).encode()).hexdigest()
+        return LEVEL_INDEX_DIR / f"{name}.json"
+
+    @classmethod
+    def load(cls, root: Path, path: Optional[Path] = None) -> "LevelIndex":
+        """ Load the saved index for `root` and bring it up to date."""
+        root = Path(root)
+        if path is None:
+            path = cls.default_path(root)
+        index = cls(root, path)
+
+        if path.exists():
+            try:
+                with path.open("r", encoding="utf-8") as index_file:
+                    saved = json.load(index_file)
+                if saved["version"] == LEVEL_INDEX_VERSION:
+                    index._files = saved["files"]
+                    index._fallback_stat = saved["fallback-stat"]
+            except (json.JSONDecodeError, KeyError, TypeError):
+                logger.warning("Ignoring unreadable level index %s", path)
+
+        if index.update():
+            index.save()
+        return index
+
+    def update(self) -> List[str]:
+        """Re-index files that changed on disk. Returns their names."""
+        fallback_path = self.root / FALLBACK_LEVEL
+        fallback_stat = (
+            list(stat_key(fallback_path)) if fallback_path.exists() else None
+        )
+        if fallback_stat != self._fallback_stat:
+            # Tiles of every file may resolve differently now
+            self._files = {}
+            self._fallback_stat = fallback_stat
+        fallback = None
+
+        seen = set()
+        updated = []
+        for level_path in sorted(self.root.rglob("*.lvl")):
+            name = level_path.relative_to(self.root).as_posix()
+            seen.add(name)
+            stat = list(stat_key(level_path))
+            entry = self._files.get(name)
+            if entry is not None and entry["stat"] == stat:
+                continue
+
+            if fallback is None and fallback_stat is not None:
+                fallback = LevelFile.from_path(fallback_path, validate=False)
+            try:
+                level_file = LevelFile.from_path(level_path, validate=False)
+            except Exception:  # pylint: disable=broad-except
+                logger.warning("Failed to index %s", name)
+                continue
+
+            entry = index_level_file(level_file, fallback)
+            entry["stat"] = stat
+            self._files[name] = entry
+            updated.append(name)
+
+        removed = set(self._files) - seen
+        for name in removed:
+            del self._files[name]
+
+        return updated + sorted(removed)
+
+    def save(self):
+        out = {
+            "version": LEVEL_INDEX_VERSION,
+            "fallback-stat": self._fallback_stat,
+            "files": self._files,
+        }
+        try:
+            with atomic_write(self.path, encoding="utf-8") as out_file:
+                json.dump(out, out_file, separators=(",", ":"))
+        except OSError:
+            logger.warning("Failed to save level index to %s", self.path)
+
+    def files(self) -> List[str]:
+        return list(self._files)
+
+    def tile_code_definitions(self, name: str) -> Dict[str, str]:
+        """ The value each file assigns to a tile code."""
+        return {
+            file: entry["tile-codes"][name]
+            for file, entry in self._files.items()
+            if name in entry["tile-codes"]
+        }
+
+    def tile_uses(self, name: str) -> List[TileLocation]:
+        return [
+            TileLocation(file, *location)
+            for file, entry in self._files.items()
+            for location in entry["tiles"].get(name, [])
+        ]
+
+    def template_files(self, name: str) -> Dict[str, int]:
+        """ The number of chunks for a template in each file that has it."""
+        return {
+            file: entry["templates"][name]
+            for file, entry in self._files.items()
+            if name in entry["templates"]
+        }
+
+    def setting_values(self, name: str) -> Dict[str, str]:
+        return {
+            file: entry["settings"][name]
+            for file, entry in self._files.items()
+            if name in entry["settings"]
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Query tile codes, templates and settings across level files."
+    )
+    parser.add_argument("levels_dir", type=Path, help="Path to a Data/Levels dir.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    tile_parser = subparsers.add_parser(
+        "tile", help="Where a tile code is defined and used."
+    )
+    tile_parser.add_argument("name")
+    tile_parser.add_argument(
+        "--template", default=None, help="Only show uses in this template."
+    )
+
+    template_parser = subparsers.add_parser(
+        "template", help="Which files have a template."
+    )
+    template_parser.add_argument("name")
+
+    setting_parser = subparsers.add_parser(
+        "setting", help="What each file sets a level setting to."
+    )
+    setting_parser.add_argument("name")
+
+    args = parser.parse_args()
+    logging.basicConfig(format="%(levelname)s - %(message)s", level=logging.INFO)
+
+    index = LevelIndex.load(args.levels_dir)
+
+    if args.command == "tile":
+        for file, value in index.tile_code_definitions(args.name).items():
+            print(f"{file}: defined as {value!r}")
+        for location in index.tile_uses(args.name):
+            if args.template and location.template != args.template:
+                continue
+            print(
+                f"{location.file}: {location.template} chunk {location.chunk}"
+                f" {location.layer} row {location.row} col {location.col}"
+            )
+    elif args.command == "template":
+        for file, num_chunks in index.template_files(args.name).items():
+            print(f"{file}: {num_chunks} chunks")
+    elif args.command == "setting":
+        for file, value in index.setting_values(args.name).items():
+            print(f"{file}: {value}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,239 @@
+import hashlib
+import logging
+import os
+import pickle
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import fields, is_dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from modlunky2.config import CACHE_DIR
+from modlunky2.utils import atomic_write
+
+from .chunk_store import ChunkStore
+from .level_chances import LevelChance, LevelChances
+from .level_file import LevelFile
+from .level_settings import LevelSetting, LevelSettings
+from .level_templates import Chunk, LevelTemplate, LevelTemplates
+from .monster_chances import MonsterChance, MonsterChances
+from .room_grid import RoomGrid
+from .tile_codes import TileCode, TileCodes
+
+logger = logging.getLogger("modlunky2")
+
+LEVEL_CACHE_DIR = CACHE_DIR / "levels"
+
+# Bump when the parsed classes change in a way their attributes don't show,
+# changes to the attributes are caught by `cache_schema`.
+LEVEL_CACHE_VERSION = 2
+
+# Every class that ends up in the pickled cache
+CACHED_CLASSES = [
+    LevelFile,
+    LevelSettings,
+    LevelSetting,
+    TileCodes,
+    TileCode,
+    LevelChances,
+    LevelChance,
+    MonsterChances,
+    MonsterChance,
+    LevelTemplates,
+    LevelTemplate,
+    Chunk,
+    RoomGrid,
+]
+
+DEFAULT_WORKERS = max((os.cpu_count() or 1) - 2, 1)
+
+
+def _attributes(cls) -> List[str]:
+    if is_dataclass(cls):
+        return [field.name for field in fields(cls)]
+    if hasattr(cls, "__slots__"):
+        return list(cls.__slots__)
+    return sorted(vars(cls()))
+
+
+def cache_schema() -> str:
+    """ A hash of the attributes of every cached class."""
+    shapes = [
+        f"{cls.__module__}.{cls.__qualname__}({','.join(_attributes(cls))})"
+        for cls in CACHED_CLASSES
+    ]
+    return hashlib.sha1("\n".join(shapes).encode()).hexdigest()
+
+
+def stat_key(path: Path) -> Tuple[int, int]:
+    stat = os.stat(path)
+    return (stat.st_size, stat.st_mtime_ns)
+
+
+def _parse_level(path: Path) -> LevelFile:
+    """ Process pool entry point."""
+    return LevelFile.from_path(path)
+
+
+class LevelSet:
+    """All of the level files in a directory, such as `Data/Levels`.
+
+    Level files are keyed by their path relative to the directory using `/`
+    as the separator, e.g. `Arena/dm1-1.lvl`.
+
+    With a `chunk_store`, identical rooms are shared between the level files,
+    so their chunks must not be edited in place.
+    """
+
+    def __init__(self, root: Path, chunk_store: Optional[ChunkStore] = None):
+        self.root = root
+        self.chunk_store = chunk_store
+        self._levels: Dict[str, LevelFile] = {}
+        self._stats: Dict[str, Tuple[int, int]] = {}
+        self.errors: Dict[str, Exception] = {}
+
+    @staticmethod
+    def cache_path(root: Path, cache_dir: Path = LEVEL_CACHE_DIR) -> Path:
+        name = hashlib.sha1(str(root.resolve()).encode()).hexdigest()
+        return cache_dir / f"{name}.pickle"
+
+    @classmethod
+    def load_dir(
+        cls,
+        root: Path,
+        workers: int = DEFAULT_WORKERS,
+        cache_dir: Optional[Path] = LEVEL_CACHE_DIR,
+        dedupe: bool = True,
+    ) -> "LevelSet":
+        """Load every `.lvl` file below `root`.
+
+        Files whose size and mtime match the cache in `cache_dir` aren't parsed
+        again, the rest are parsed with a pool of `workers` processes. Pass
+        `cache_dir=None` to skip the cache. When `dedupe` is set, identical
+        rooms share one `Chunk`, which also keeps the cache small.
+        """
+        root = Path(root)
+        level_set = cls(root, ChunkStore() if dedupe else None)
+
+        cached = {}
+        if cache_dir is not None:
+            cached = level_set._read_cache(cls.cache_path(root, cache_dir))
+
+        to_parse = {}
+        for path in sorted(root.rglob("*.lvl")):
+            name = path.relative_to(root).as_posix()
+            stat = stat_key(path)
+            entry = cached.get(name)
+            if entry is not None and entry[0] == stat:
+                level_set._stats[name] = stat
+                level_set._levels[name] = entry[1]
+            else:
+                to_parse[name] = (path, stat)
+
+        if to_parse:
+            logger.info("Parsing %s level files in %s", len(to_parse), root)
+            level_set._parse_all(to_parse, workers)
+
+        # Keep the same order as the directory listing
+        level_set._levels = dict(sorted(level_set._levels.items()))
+        level_set._dedupe(level_set._levels)
+
+        if to_parse and cache_dir is not None:
+            level_set._write_cache(cls.cache_path(root, cache_dir))
+        return level_set
+
+    def _dedupe(self, names):
+        if self.chunk_store is None:
+            return
+        for name in names:
+            level_file = self._levels.get(name)
+            if level_file is not None:
+                self.chunk_store.dedupe_level_file(name, level_file)
+
+    def _parse_all(self, to_parse, workers):
+        if workers > 1 and len(to_parse) > 1:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                futures = {
+                    name: pool.submit(_parse_level, path)
+                    for name, (path, _) in to_parse.items()
+                }
+                results = {}
+                for name, future in futures.items():
+                    try:
+                        results[name] = future.result()
+                    except Exception as err:  # pylint: disable=broad-except
+                        results[name] = err
+        else:
+            results = {}
+            for name, (path, _) in to_parse.items():
+                try:
+                    results[name] = _parse_level(path)
+                except Exception as err:  # pylint: disable=broad-except
+                    results[name] = err
+
+        for name, result in results.items():
+            if isinstance(result, Exception):
+                logger.warning("Failed to parse %s: %s", name, result)
+                self.errors[name] = result
+                continue
+            self._levels[name] = result
+            self._stats[name] = to_parse[name][1]
+
+    def _read_cache(self, cache_path: Path):
+        if not cache_path.exists():
+            return {}
+
+        try:
+            with cache_path.open("rb") as cache_file:
+                version, levels = pickle.load(cache_file)
+        except Exception:  # pylint: disable=broad-except
+            logger.warning("Ignoring unreadable level cache %s", cache_path)
+            return {}
+
+        if version != (LEVEL_CACHE_VERSION, cache_schema()):
+            return {}
+        return levels
+
+    def _write_cache(self, cache_path: Path):
+        levels = {
+            name: (self._stats[name], level_file)
+            for name, level_file in self._levels.items()
+        }
+        try:
+            with atomic_write(cache_path, "wb") as cache_file:
+                pickle.dump(
+                    ((LEVEL_CACHE_VERSION, cache_schema()), levels),
+                    cache_file,
+                    protocol=pickle.HIGHEST_PROTOCOL,
+                )
+        except OSError:
+            logger.warning("Failed to cache levels to %s", cache_path)
+
+    def names(self):
+        return list(self._levels.keys())
+
+    def all(self):
+        return list(self._levels.values())
+
+    def get(self, name: str) -> Optional[LevelFile]:
+        """Get a level file by name, parsing it again if it changed on disk.
+
+        Returns None if the file doesn't exist.
+        """
+        path = self.root / name
+        try:
+            stat = stat_key(path)
+        except OSError:
+            return None
+
+        if self._stats.get(name) != stat:
+            self._levels[name] = LevelFile.from_path(path)
+            self._stats[name] = stat
+            self._dedupe([name])
+            self.errors.pop(name, None)
+        return self._levels[name]
+
+    def __contains__(self, name):
+        return name in self._levels
+
+    def __len__(self):
+        return len(self._levels)
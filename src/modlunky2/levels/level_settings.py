@@ -45,9 +45,10 @@ class LevelSettings:
         LevelSetting.validate_name(name)
         return self._inner.get(name)
 
-    def set_obj(self, obj: "LevelSetting"):
+    def set_obj(self, obj: "LevelSetting", validate: bool = True):
         obj.clean()
-        obj.validate()
+        if validate:
+            obj.validate()
         self._inner[obj.name] = obj
 
     def write(self, handle: TextIO):
@@ -66,7 +67,7 @@ class LevelSetting(Generic[T]):
     comment: Optional[str]
 
     @classmethod
-    def parse(cls, line: str) -> "LevelSetting":
+    def parse(cls, line: str, validate: bool = True) -> "LevelSetting":
         rest, comment = split_comment(line)
         directive, value = rest.split(None, 1)
         name = directive[2:]
@@ -76,7 +77,8 @@ class LevelSetting(Generic[T]):
 
         level_setting = cls(name, value, comment)
         level_setting.clean()
-        level_setting.validate()
+        if validate:
+            level_setting.validate()
 
         return level_setting
 
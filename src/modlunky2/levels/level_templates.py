@@ -1,12 +1,14 @@
+import hashlib
 import re
 from dataclasses import dataclass
 from enum import Enum
 from collections import OrderedDict
 from itertools import zip_longest
-from typing import ClassVar, List, Optional, TextIO, Tuple
+from typing import Callable, ClassVar, List, Optional, TextIO, Tuple
 
 from modlunky2.levels.utils import split_comment
 
+from .room_grid import ENCODING, RoomGrid
 from .utils import DirectivePrefixes
 
 VALID_LEVEL_TEMPLATES = set(
@@ -151,25 +153,49 @@ VALID_TEMPLATE_SETTINGS = set(rf"\!{setting.value}" for setting in TemplateSetti
 class LevelTemplates:
     def __init__(self):
         self._inner = OrderedDict()
+        # Templates that are only parsed once they're needed, see `set_unparsed`
+        self._unparsed = {}
         self.comment = None
 
+    def _parse(self, name):
+        parse = self._unparsed.pop(name, None)
+        if parse is not None:
+            self._inner[name] = parse()
+        return self._inner.get(name)
+
+    def names(self):
+        return list(self._inner.keys())
+
     def all(self):
+        for name in list(self._unparsed):
+            self._parse(name)
         return list(self._inner.values())
 
     def get(self, name):
         LevelTemplate.validate_name(name)
-        return self._inner.get(name)
+        return self._parse(name)
 
-    def set_obj(self, obj: "LevelTemplate"):
-        obj.validate()
+    def set_obj(self, obj: "LevelTemplate", validate: bool = True):
+        if validate:
+            obj.validate()
+        self._unparsed.pop(obj.name, None)
         self._inner[obj.name] = obj
 
+    def set_unparsed(self, name: str, parse: Callable[[], "LevelTemplate"]):
+        """Add a template without parsing its chunks.
+
+        `parse` is called to build the template the first time it's accessed.
+        """
+        self._inner[name] = None
+        self._unparsed[name] = parse
+
     def write(self, handle: TextIO):
         if self.comment:
             handle.write(f"{self.comment}\n")
-        for idx, template in enumerate(self._inner.values()):
+        templates = self.all()
+        for idx, template in enumerate(templates):
             template.write(handle)
-            if idx < len(self._inner) - 1:
+            if idx < len(templates) - 1:
                 handle.write("\n")
 
 
@@ -177,14 +203,36 @@ class LevelTemplates:
 class Chunk:
     comment: Optional[str]
     settings: List[TemplateSetting]
-    foreground: List[List[str]]
-    background: List[List[str]]
+    # Lists of rows are accepted and converted to a RoomGrid
+    foreground: RoomGrid
+    background: RoomGrid
+
+    def __post_init__(self):
+        if not isinstance(self.foreground, RoomGrid):
+            self.foreground = RoomGrid(self.foreground)
+        if not isinstance(self.background, RoomGrid):
+            self.background = RoomGrid(self.background)
 
     @staticmethod
     def partition_line(line: str) -> Tuple[str, str]:
         foreground, _, background = line.partition(" ")
         return foreground.strip(), background.strip()
 
+    def content_hash(self) -> str:
+        """A hash of the settings and tiles, the comment isn't included.
+
+        Stable across runs so it can be stored, and the same for chunks that
+        play the same even when they come from different files.
+        """
+        content = hashlib.sha1()
+        for setting in self.settings:
+            content.update(f"{setting.value}\n".encode())
+        for layer in (self.foreground, self.background):
+            # Separates the layers and keeps settings from looking like tiles
+            content.update(b"\0")
+            content.update("\n".join(layer.rows()).encode(ENCODING))
+        return content.hexdigest()
+
     @classmethod
     def parse(cls, file_handle: TextIO) -> "Chunk":
         chunk = cls(comment="", settings=[], foreground=[], background=[])
@@ -210,8 +258,8 @@ class Chunk:
                 started_chunk = True
                 foreground, background = cls.partition_line(line)
                 if background:
-                    chunk.background.append(list(background))
-                chunk.foreground.append(list(foreground))
+                    chunk.background.append(background)
+                chunk.foreground.append(foreground)
 
         return chunk
 
@@ -222,10 +270,12 @@ class Chunk:
         for setting in self.settings:
             handle.write(setting.to_line())
 
-        for fg_line, bg_line in zip_longest(self.foreground, self.background):
-            line = "".join(fg_line)
+        for fg_line, bg_line in zip_longest(
+            self.foreground.rows(), self.background.rows()
+        ):
+            line = fg_line or ""
             if bg_line:
-                line = f"{line} {''.join(bg_line)}"
+                line = f"{line} {bg_line}"
             handle.write(f"{line}\n")
 
 
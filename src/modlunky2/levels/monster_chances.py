@@ -75,9 +75,10 @@ class MonsterChances:
         MonsterChance.validate_name(name)
         return self._inner.get(name)
 
-    def set_obj(self, obj: "MonsterChance"):
+    def set_obj(self, obj: "MonsterChance", validate: bool = True):
         obj.clean()
-        obj.validate()
+        if validate:
+            obj.validate()
         self._inner[obj.name] = obj
 
     def write(self, handle: TextIO):
@@ -96,7 +97,7 @@ class MonsterChance:
     comment: Optional[str]
 
     @classmethod
-    def parse(cls, line: str) -> "MonsterChance":
+    def parse(cls, line: str, validate: bool = True) -> "MonsterChance":
         rest, comment = split_comment(line)
         directive, value = rest.split(None, 1)
         name = directive[2:]
@@ -106,7 +107,8 @@ class MonsterChance:
 
         obj = cls(name, value, comment)
         obj.clean()
-        obj.validate()
+        if validate:
+            obj.validate()
 
         return obj
 
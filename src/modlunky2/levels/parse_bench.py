@@ -0,0 +1,68 @@
+"""
+
+Compares the level file parsers over a directory of levels, e.g.
+
+    python -m modlunky2.levels.parse_bench Mods/Extracted/Data/Levels
+"""
+
+import argparse
+import time
+from io import StringIO
+from pathlib import Path
+
+from .compiled import compile_level_file, decompile_level_file
+from .level_file import LevelFile
+
+
+def bench(texts, parse, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for text in texts:
+            parse(StringIO(text))
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark level file parsing.")
+    parser.add_argument("levels_dir", type=Path, help="Directory of .lvl files.")
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        default=5,
+        help="Times to parse every level. Default: %(default)s",
+    )
+    args = parser.parse_args()
+
+    texts = [
+        path.read_text(encoding="cp1252")
+        for path in sorted(args.levels_dir.rglob("*.lvl"))
+    ]
+    print(f"Parsing {len(texts)} level files {args.repeat} times")
+
+    legacy = bench(texts, LevelFile.from_handle_legacy, args.repeat)
+    fast = bench(texts, LevelFile.from_handle, args.repeat)
+    unvalidated = bench(
+        texts, lambda handle: LevelFile.from_handle(handle, False), args.repeat
+    )
+    lazy = bench(
+        texts, lambda handle: LevelFile.from_handle(handle, lazy=True), args.repeat
+    )
+
+    compiled = [
+        compile_level_file(LevelFile.from_handle(StringIO(text))) for text in texts
+    ]
+    start = time.perf_counter()
+    for _ in range(args.repeat):
+        for data in compiled:
+            decompile_level_file(data)
+    binary = time.perf_counter() - start
+
+    print(f"legacy:               {legacy:8.3f}s")
+    print(f"fast:                 {fast:8.3f}s ({legacy / fast:.1f}x)")
+    print(f"fast, no validation:  {unvalidated:8.3f}s ({legacy / unvalidated:.1f}x)")
+    print(f"lazy, index only:     {lazy:8.3f}s ({legacy / lazy:.1f}x)")
+    print(f"compiled:             {binary:8.3f}s ({legacy / binary:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,218 @@
+from array import array
+from itertools import accumulate
+from typing import Iterable, List, Sequence, Union
+
+ENCODING = "cp1252"
+
+Row = Union[str, Iterable[str]]
+
+
+def encode_row(row: Row) -> bytes:
+    if not isinstance(row, str):
+        row = "".join(row)
+    return row.encode(ENCODING)
+
+
+class RoomRow:  # pylint: disable=protected-access
+    """A view of a single row in a `RoomGrid`.
+
+    Behaves like the list of single character strings rows used to be, writes
+    go straight to the grid.
+    """
+
+    __slots__ = ("_grid", "_index")
+
+    def __init__(self, grid: "RoomGrid", index: int):
+        self._grid = grid
+        self._index = index
+
+    def _bounds(self):
+        return self._grid._starts[self._index], self._grid._starts[self._index + 1]
+
+    def __len__(self):
+        start, end = self._bounds()
+        return end - start
+
+    def __iter__(self):
+        return iter(str(self))
+
+    def __str__(self):
+        start, end = self._bounds()
+        return self._grid._data[start:end].decode(ENCODING)
+
+    def __getitem__(self, col):
+        if isinstance(col, slice):
+            return list(str(self)[col])
+        return str(self)[col]
+
+    def __setitem__(self, col, value):
+        if isinstance(col, slice):
+            row = list(self)
+            row[col] = value
+            self._grid[self._index] = row
+            return
+
+        start, end = self._bounds()
+        if col < 0:
+            col += end - start
+        if not 0 <= col < end - start:
+            raise IndexError("row index out of range")
+
+        encoded = value.encode(ENCODING)
+        if len(encoded) != 1:
+            raise ValueError(f"Tile codes are a single character, got {value!r}")
+        self._grid._data[start + col] = encoded[0]
+
+    def __eq__(self, other):
+        if isinstance(other, RoomRow):
+            return str(self) == str(other)
+        if isinstance(other, str):
+            return str(self) == other
+        if isinstance(other, list):
+            return list(self) == other
+        return NotImplemented
+
+    def __repr__(self):
+        return f"RoomRow({str(self)!r})"
+
+
+class RoomGrid:
+    """The tiles of one layer of a room packed into a single bytearray.
+
+    Tiles are stored as their cp1252 byte with the start of each row kept in
+    an offset table, so a room costs a couple of objects rather than one
+    string per tile. Indexing with an int gives a `RoomRow` view so existing
+    `grid[row][col]` code keeps working, `grid[row, col]` gives a single tile
+    and `grid[rows, cols]` with slices gives a new sub-grid.
+    """
+
+    __slots__ = ("_data", "_starts")
+
+    def __init__(self, rows: Iterable[Row] = ()):
+        self._data = bytearray()
+        self._starts = array("I", [0])
+        for row in rows:
+            self.append(row)
+
+    @classmethod
+    def from_strs(cls, rows: List[str]) -> "RoomGrid":
+        """ Build a grid from row strings, encoding them all at once."""
+        grid = cls()
+        # cp1252 is a single byte encoding so offsets match string lengths
+        grid._data = bytearray("".join(rows).encode(ENCODING))
+        grid._starts.extend(accumulate(map(len, rows)))
+        return grid
+
+    @classmethod
+    def from_bytes(cls, data: bytes, width: int) -> "RoomGrid":
+        """ Build a grid from rows of `width` tiles laid out back to back."""
+        if width <= 0 or len(data) % width:
+            raise ValueError("Data isn't a whole number of rows")
+
+        grid = cls()
+        grid._data = bytearray(data)
+        grid._starts = array("I", range(0, len(data) + 1, width))
+        return grid
+
+    @classmethod
+    def from_packed(cls, data: bytes, row_lengths: Iterable[int]) -> "RoomGrid":
+        """ The inverse of `tobytes` and `row_lengths`."""
+        grid = cls()
+        grid._data = bytearray(data)
+        grid._starts.extend(accumulate(row_lengths))
+        if grid._starts[-1] != len(grid._data):
+            raise ValueError("Row lengths don't add up to the size of the data")
+        return grid
+
+    @property
+    def height(self) -> int:
+        return len(self._starts) - 1
+
+    @property
+    def width(self) -> int:
+        """ The length of the widest row."""
+        return max(
+            (end - start for start, end in zip(self._starts, self._starts[1:])),
+            default=0,
+        )
+
+    def append(self, row: Row):
+        self._data += encode_row(row)
+        self._starts.append(len(self._data))
+
+    def row(self, index: int) -> str:
+        return str(RoomRow(self, range(self.height)[index]))
+
+    def rows(self) -> List[str]:
+        data = self._data.decode(ENCODING)
+        return [data[start:end] for start, end in zip(self._starts, self._starts[1:])]
+
+    def column(self, index: int) -> str:
+        return "".join(row[index] for row in self.rows())
+
+    def columns(self) -> List[str]:
+        return [self.column(index) for index in range(self.width)]
+
+    def tile(self, row: int, col: int) -> str:
+        return RoomRow(self, range(self.height)[row])[col]
+
+    def to_lists(self) -> List[List[str]]:
+        """ A copy in the old list of lists form."""
+        return [list(row) for row in self.rows()]
+
+    def tobytes(self) -> bytes:
+        return bytes(self._data)
+
+    def row_lengths(self) -> List[int]:
+        return [end - start for start, end in zip(self._starts, self._starts[1:])]
+
+    def to_ids(self, table: Sequence[int]) -> array:
+        """Tile IDs of every tile, row after row.
+
+        `table` maps each byte to an ID, see `tile_codes.tile_id_table`.
+        """
+        return array("H", map(table.__getitem__, self._data))
+
+    def __len__(self):
+        return self.height
+
+    def __iter__(self):
+        return (RoomRow(self, index) for index in range(self.height))
+
+    def __getitem__(self, key):
+        if isinstance(key, tuple):
+            rows, cols = key
+            if isinstance(rows, slice):
+                return RoomGrid(row[cols] for row in self.rows()[rows])
+            return self.tile(rows, cols)
+
+        if isinstance(key, slice):
+            return RoomGrid(self.rows()[key])
+
+        return RoomRow(self, range(self.height)[key])
+
+    def __setitem__(self, key, value):
+        if isinstance(key, tuple):
+            row, col = key
+            self[row][col] = value
+            return
+
+        index = range(self.height)[key]
+        start, end = self._starts[index], self._starts[index + 1]
+        encoded = encode_row(value)
+        self._data[start:end] = encoded
+
+        shift = len(encoded) - (end - start)
+        if shift:
+            for after in range(index + 1, len(self._starts)):
+                self._starts[after] += shift
+
+    def __eq__(self, other):
+        if isinstance(other, RoomGrid):
+            return self._data == other._data and self._starts == other._starts
+        if isinstance(other, list):
+            return self.to_lists() == [list(row) for row in other]
+        return NotImplemented
+
+    def __repr__(self):
+        return f"RoomGrid({self.rows()!r})"
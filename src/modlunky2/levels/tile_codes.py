@@ -1,7 +1,9 @@
 import re
+from array import array
 from dataclasses import dataclass
 from collections import OrderedDict
-from typing import ClassVar, Optional, TextIO
+from threading import Lock
+from typing import ClassVar, Dict, List, Optional, TextIO
 
 from .utils import DirectivePrefixes, split_comment, to_line
 
@@ -247,6 +249,69 @@ VALID_TILE_CODES = set(
 NAME_PADDING = max(map(len, VALID_TILE_CODES)) + 4
 PERCENT_DELIM = re.compile(r"%\d{1,2}%?")
 
+# ID 0 is reserved for tiles without a tile code.
+NO_TILE_ID = 0
+
+
+class TileCodeRegistry:
+    """Interns tile code names as small integer IDs.
+
+    Names include variants such as `foo%50%bar`, each distinct name gets its
+    own ID. IDs are only stable for the life of the process. Validation
+    results are cached per name as well.
+    """
+
+    def __init__(self):
+        self._ids: Dict[str, int] = {}
+        self._names: List[str] = [""]
+        self._valid: Dict[str, bool] = {}
+        self._lock = Lock()
+
+    def intern(self, name: str) -> int:
+        tile_id = self._ids.get(name)
+        if tile_id is not None:
+            return tile_id
+
+        with self._lock:
+            tile_id = self._ids.get(name)
+            if tile_id is None:
+                tile_id = self._ids[name] = len(self._names)
+                self._names.append(name)
+            return tile_id
+
+    def name(self, tile_id: int) -> str:
+        return self._names[tile_id]
+
+    def is_valid(self, name: str) -> bool:
+        valid = self._valid.get(name)
+        if valid is None:
+            # names can have foo%50 where an empty rightside is valid.
+            valid = self._valid[name] = all(
+                not part or part in VALID_TILE_CODES
+                for part in PERCENT_DELIM.split(name)
+            )
+        return valid
+
+    def __len__(self):
+        return len(self._names) - 1
+
+
+TILE_CODE_REGISTRY = TileCodeRegistry()
+
+
+def tile_id_table(tile_codes: "TileCodes", registry=TILE_CODE_REGISTRY) -> array:
+    """Map every cp1252 byte to the ID of the tile code using it as a value.
+
+    Bytes without a tile code map to `NO_TILE_ID`. Used with
+    `RoomGrid.to_ids` to turn rooms into arrays of tile IDs.
+    """
+    table = array("H", [NO_TILE_ID] * 256)
+    for tile_code in tile_codes.all():
+        encoded = tile_code.value.encode("cp1252")
+        if len(encoded) == 1:
+            table[encoded[0]] = registry.intern(tile_code.name)
+    return table
+
 
 class TileCodes:
     def __init__(self):
@@ -260,8 +325,9 @@ class TileCodes:
         TileCode.validate_name(name)
         return self._inner.get(name)
 
-    def set_obj(self, obj: "TileCode"):
-        obj.validate()
+    def set_obj(self, obj: "TileCode", validate: bool = True):
+        if validate:
+            obj.validate()
         self._inner[obj.name] = obj
 
     def write(self, handle: TextIO):
@@ -280,7 +346,7 @@ class TileCode:
     comment: Optional[str]
 
     @classmethod
-    def parse(cls, line: str) -> "TileCode":
+    def parse(cls, line: str, validate: bool = True) -> "TileCode":
         rest, comment = split_comment(line)
         directive, value = rest.split(None, 1)
         name = directive[2:]
@@ -289,19 +355,19 @@ class TileCode:
             raise ValueError("Directive missing name.")
 
         obj = cls(name, value, comment)
-        obj.validate()
+        if validate:
+            obj.validate()
 
         return obj
 
     @staticmethod
     def validate_name(name: str):
-        for part in PERCENT_DELIM.split(name):
-            # names can have foo%50 where an empty rightside is valid.
-            if not part:
-                continue
+        if not TILE_CODE_REGISTRY.is_valid(name):
+            raise ValueError(f"Name {name!r} isn't a valid tile code.")
 
-            if part not in VALID_TILE_CODES:
-                raise ValueError(f"Name {name!r} isn't a valid tile code.")
+    @property
+    def tile_id(self) -> int:
+        return TILE_CODE_REGISTRY.intern(self.name)
 
     def validate_value(self):
         if len(self.value) != 1:
@@ -0,0 +1,255 @@
+from functools import partial
+from typing import List, Optional, Tuple
+
+from .level_chances import LevelChance
+from .level_settings import LevelSetting
+from .level_templates import Chunk, LevelTemplate, TemplateSetting
+from .monster_chances import MonsterChance
+from .room_grid import RoomGrid
+from .tile_codes import TileCode
+from .utils import DirectivePrefixes, split_comment
+
+SECTION_COMMENT = "// ------------------------------"
+
+TEMPLATE_PREFIX = DirectivePrefixes.TEMPLATE.value
+
+# Lines are classified by their first two characters.
+DIRECTIVE_SECTIONS = {
+    DirectivePrefixes.LEVEL_SETTING.value: ("level_settings", LevelSetting),
+    DirectivePrefixes.TILE_CODE.value: ("tile_codes", TileCode),
+    DirectivePrefixes.LEVEL_CHANCE.value: ("level_chances", LevelChance),
+    DirectivePrefixes.MONSTER_CHANCE.value: ("monster_chances", MonsterChance),
+}
+
+TEMPLATE_SETTING_LINES = {
+    f"{DirectivePrefixes.TEMPLATE_SETTING.value}{setting.value}": setting
+    for setting in TemplateSetting
+}
+
+
+class TokenListener:
+    """Told what's on each line while a level file is tokenized.
+
+    Line numbers start at 1. With a listener, lines that don't parse are
+    passed to `syntax_error` and skipped rather than raising. The methods
+    do nothing unless overridden, see `validation` for a listener.
+    """
+
+    def directive(self, line_no: int, prefix: str, directive):
+        pass
+
+    def template(self, line_no: int, name: str):
+        pass
+
+    def chunk(self, template: str, rows: List[Tuple[int, str, str]]):
+        """ `rows` holds the line number, foreground and background of each row."""
+
+    def unknown_line(self, line_no: int, line: str):
+        pass
+
+    def syntax_error(self, line_no: int, line: str, err: ValueError):
+        pass
+
+
+def tokenize_level_file(
+    level_file,
+    lines: List[str],
+    lazy: bool = False,
+    listener: Optional[TokenListener] = None,
+):
+    """Parse `lines` into the empty `level_file` in a single pass.
+
+    Produces the same result as the original `Peekable` based parser but walks
+    the lines by index, so templates are consumed in bulk without peeking.
+    Nothing is validated, see `LevelFile.validate`.
+
+    When `lazy` is set, templates are only indexed by the lines they span and
+    their chunks are parsed the first time they're accessed. Templates are
+    always parsed right away when there's a `listener`.
+    """
+
+    last_section_comment = None
+    last_seen_directive = None
+    idx = 0
+    num_lines = len(lines)
+
+    while idx < num_lines:
+        line = lines[idx].strip()
+        idx += 1
+        if not line:
+            continue
+
+        line_no = idx
+        prefix = line[:2]
+        section = DIRECTIVE_SECTIONS.get(prefix)
+        if section is not None:
+            attr, directive_cls = section
+            container = getattr(level_file, attr)
+            try:
+                directive = directive_cls.parse(line, validate=False)
+            except ValueError as err:
+                if listener is None:
+                    raise
+                listener.syntax_error(line_no, line, err)
+                continue
+            container.set_obj(directive, validate=False)
+            if listener is not None:
+                listener.directive(line_no, prefix, directive)
+        elif prefix == TEMPLATE_PREFIX:
+            container = level_file.level_templates
+            if lazy and listener is None:
+                name, end = scan_template(line, lines, idx)
+                container.set_unparsed(
+                    name, partial(parse_template_at, line, lines, idx)
+                )
+                idx = end
+            else:
+                try:
+                    template, idx = tokenize_template(line, lines, idx, listener)
+                except ValueError as err:
+                    if listener is None:
+                        raise
+                    listener.syntax_error(line_no, line, err)
+                    idx = template_end(lines, idx)
+                    continue
+                container.set_obj(template, validate=False)
+        elif line == SECTION_COMMENT:
+            last_section_comment = f"{line}\n"
+            while idx < num_lines and lines[idx].startswith("//"):
+                last_section_comment += lines[idx]
+                idx += 1
+            if not level_file.comment and not last_seen_directive:
+                level_file.comment = last_section_comment
+                last_section_comment = None
+            continue
+        else:
+            if listener is not None:
+                listener.unknown_line(line_no, line)
+            continue
+
+        if last_seen_directive != prefix:
+            if last_section_comment:
+                container.comment = last_section_comment
+                last_section_comment = None
+            last_seen_directive = prefix
+
+
+def is_blank(line: str) -> bool:
+    """ Whether a line has neither content nor a comment."""
+    if not line:
+        return True
+    if line.startswith("//"):
+        return not split_comment(line)[1]
+    return False
+
+
+def template_name(line: str) -> str:
+    directive, _ = split_comment(line)
+    name = directive[2:]
+
+    if not name:
+        raise ValueError("Directive missing name.")
+    return name
+
+
+def template_end(lines: List[str], idx: int) -> int:
+    """ The index of the next template line from `idx` on."""
+    num_lines = len(lines)
+    while idx < num_lines and not lines[idx].lstrip().startswith(TEMPLATE_PREFIX):
+        idx += 1
+    return idx
+
+
+def scan_template(line: str, lines: List[str], idx: int) -> Tuple[str, int]:
+    """ Find where a template ends without parsing its chunks."""
+    return template_name(line), template_end(lines, idx)
+
+
+def parse_template_at(line: str, lines: List[str], idx: int) -> LevelTemplate:
+    template, _ = tokenize_template(line, lines, idx)
+    return template
+
+
+def tokenize_template(
+    line: str, lines: List[str], idx: int, listener: Optional[TokenListener] = None
+) -> Tuple[LevelTemplate, int]:
+    name = template_name(line)
+    _, comment = split_comment(line)
+    if listener is not None:
+        listener.template(idx, name)
+
+    chunks = []
+    num_lines = len(lines)
+    while idx < num_lines:
+        next_line = lines[idx].strip()
+
+        # We've reached the next Template
+        if next_line.startswith(TEMPLATE_PREFIX):
+            break
+
+        if is_blank(next_line):
+            idx += 1
+            continue
+
+        if listener is None:
+            chunk, idx = tokenize_chunk(lines, idx)
+        else:
+            rows = []
+            chunk, idx = tokenize_chunk(lines, idx, rows)
+            listener.chunk(name, rows)
+        chunks.append(chunk)
+
+    return LevelTemplate(name, comment, chunks), idx
+
+
+def tokenize_chunk(
+    lines: List[str], idx: int, rows: Optional[List[Tuple[int, str, str]]] = None
+) -> Tuple[Chunk, int]:
+    """Parse the chunk starting at `idx`.
+
+    The line number, foreground and background of each row are added to
+    `rows` when it's passed.
+    """
+    comment = ""
+    settings = []
+    foreground = []
+    background = []
+
+    num_lines = len(lines)
+    while idx < num_lines:
+        line = lines[idx].strip()
+        idx += 1
+
+        if not line:
+            break
+
+        if line.startswith("//"):
+            # A trailing comment ends the chunk
+            if settings or foreground:
+                break
+            comment += line
+            continue
+
+        setting = TEMPLATE_SETTING_LINES.get(line)
+        if setting is not None:
+            settings.append(setting)
+            continue
+
+        fg_line, _, bg_line = line.partition(" ")
+        fg_line = fg_line.strip()
+        foreground.append(fg_line)
+        bg_line = bg_line.strip()
+        if bg_line:
+            background.append(bg_line)
+        if rows is not None:
+            rows.append((idx, fg_line, bg_line))
+
+    return (
+        Chunk(
+            comment,
+            settings,
+            RoomGrid.from_strs(foreground),
+            RoomGrid.from_strs(background),
+        ),
+        idx,
+    )
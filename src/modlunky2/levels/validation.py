@@ -0,0 +1,332 @@
+"""
+
+Checks every level file in a directory and reports all of the problems found,
+with line numbers, rather than stopping at the first one. e.g.
+
+    python -m modlunky2.levels.validation Mods/Packs/MyMod/Data/Levels
+"""
+
+import argparse
+import json
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass
+from pathlib import Path, PurePosixPath
+from typing import Dict, List, Optional
+
+from .level_file import LevelFile
+from .level_index import FALLBACK_LEVEL
+from .level_set import DEFAULT_WORKERS
+from .level_templates import LevelTemplate
+from .tile_codes import TileCode
+from .tokenizer import TokenListener, tokenize_level_file
+from .utils import split_comment
+
+ERROR = "error"
+WARNING = "warning"
+
+
+@dataclass(frozen=True)
+class Diagnostic:
+    file: str
+    line: int
+    severity: str
+    code: str
+    message: str
+
+    def to_text(self) -> str:
+        return f"{self.file}:{self.line}: {self.severity}: {self.message} [{self.code}]"
+
+
+def _check_chunk(template: str, rows, tile_chars, report):
+    if not rows:
+        return
+
+    width = len(rows[0][1])
+    has_background = any(bg for _, _, bg in rows)
+    for line_no, foreground, background in rows:
+        if len(foreground) != width:
+            report(
+                line_no,
+                ERROR,
+                "room-width",
+                f"Row in template {template!r} is {len(foreground)} tiles wide,"
+                f" expected {width}",
+            )
+        if has_background and len(background) != len(foreground):
+            report(
+                line_no,
+                ERROR,
+                "background-size",
+                f"Background row in template {template!r} is {len(background)}"
+                f" tiles wide, foreground is {len(foreground)}",
+            )
+
+        for char in sorted(set(foreground + background)):
+            if char not in tile_chars:
+                report(
+                    line_no,
+                    ERROR,
+                    "undefined-tile",
+                    f"Tile {char!r} in template {template!r} has no tile code",
+                )
+
+
+class _Checker(TokenListener):
+    """ Checks each line as the tokenizer reaches it."""
+
+    def __init__(self, report, fallback_chars: Optional[Dict[str, str]]):
+        self.report = report
+        self.tile_chars = dict(fallback_chars or {})
+        self.own_tile_chars = {}
+        self.seen_names = {}
+        self.seen_templates = {}
+        self.chunks = []
+
+    def directive(self, line_no: int, prefix: str, directive):
+        try:
+            directive.validate()
+        except ValueError as err:
+            self.report(line_no, ERROR, "invalid-directive", str(err))
+
+        key = (prefix, directive.name)
+        if key in self.seen_names:
+            self.report(
+                line_no,
+                WARNING,
+                "duplicate-directive",
+                f"{prefix}{directive.name} was already set on line"
+                f" {self.seen_names[key]}, this one wins",
+            )
+        self.seen_names[key] = line_no
+
+        if isinstance(directive, TileCode):
+            other = self.own_tile_chars.get(directive.value)
+            if other is not None and other != directive.name:
+                self.report(
+                    line_no,
+                    WARNING,
+                    "duplicate-tile-value",
+                    f"Tile codes {other!r} and {directive.name!r} both use"
+                    f" {directive.value!r}",
+                )
+            self.own_tile_chars[directive.value] = directive.name
+            self.tile_chars[directive.value] = directive.name
+
+    def template(self, line_no: int, name: str):
+        try:
+            LevelTemplate.validate_name(name)
+        except ValueError as err:
+            self.report(line_no, ERROR, "invalid-template", str(err))
+        if name in self.seen_templates:
+            self.report(
+                line_no,
+                WARNING,
+                "duplicate-template",
+                f"Template {name!r} was already defined on line"
+                f" {self.seen_templates[name]}, this one wins",
+            )
+        self.seen_templates[name] = line_no
+
+    def chunk(self, template: str, rows):
+        self.chunks.append((template, rows))
+
+    def unknown_line(self, line_no: int, line: str):
+        if not line.startswith("//") and split_comment(line)[0]:
+            self.report(line_no, WARNING, "unknown-line", f"Ignoring line `{line}`")
+
+    def syntax_error(self, line_no: int, line: str, err: ValueError):
+        self.report(line_no, ERROR, "syntax", f"Couldn't parse `{line}`: {err}")
+
+
+def validate_lines(
+    file: str, lines: List[str], fallback_chars: Optional[Dict[str, str]] = None
+) -> List[Diagnostic]:
+    """Every problem in the lines of one level file.
+
+    `fallback_chars` maps tile characters defined elsewhere, in the shared
+    files the level depends on, to their tile code names.
+    """
+    diagnostics = []
+
+    def report(line_no, severity, code, message):
+        diagnostics.append(Diagnostic(file, line_no, severity, code, message))
+
+    checker = _Checker(report, fallback_chars)
+    tokenize_level_file(LevelFile.empty(), lines, listener=checker)
+
+    # Tile codes can be defined after the rooms using them
+    for template, rows in checker.chunks:
+        _check_chunk(template, rows, checker.tile_chars, report)
+
+    diagnostics.sort(key=lambda diagnostic: diagnostic.line)
+    return diagnostics
+
+
+def read_lines(path: Path) -> List[str]:
+    with path.open("r", encoding="cp1252") as level_handle:
+        return level_handle.readlines()
+
+
+# Shared files whose tile codes levels can use, by level name prefix. These
+# follow what the level editor loads alongside a level, the first match wins
+# and every level but basecamp's also gets `generic.lvl`. Levels with other
+# dependencies only get `generic.lvl` and may report undefined tiles.
+SHARED_LEVELS = [
+    (("base",), "basecamp.lvl"),
+    (("cave",), "dwellingarea.lvl"),
+    (("blackmark", "beehive", "challenge_moon"), "junglearea.lvl"),
+    (("vlads",), "volcanoarea.lvl"),
+    (("lake", "challenge_star"), "tidepoolarea.lvl"),
+    (("hallofush", "babylonarea_1", "palace"), "babylonarea.lvl"),
+    (("challenge_sun",), "sunkencityarea.lvl"),
+    (("end",), "ending.lvl"),
+]
+
+
+def shared_levels(file: str) -> List[str]:
+    """ The shared files `file` can take tile codes from."""
+    name = PurePosixPath(file).name
+    shared = [] if name.startswith("base") else [FALLBACK_LEVEL]
+    for prefixes, shared_level in SHARED_LEVELS:
+        if name.startswith(prefixes):
+            shared.append(shared_level)
+            break
+    return shared
+
+
+def tile_chars(path: Path) -> Dict[str, str]:
+    """ Tile characters defined by the level file at `path`, if there is one."""
+    if not path.exists():
+        return {}
+
+    chars = {}
+    for line in read_lines(path):
+        line = line.strip()
+        if line[:2] != TileCode.prefix:
+            continue
+        try:
+            tile_code = TileCode.parse(line, validate=False)
+        except ValueError:
+            continue
+        chars[tile_code.value] = tile_code.name
+    return chars
+
+
+def fallback_tile_chars(
+    root: Path, file: str, cache: Optional[Dict[str, Dict[str, str]]] = None
+) -> Dict[str, str]:
+    """Tile characters `file` can use from the shared files in `root`.
+
+    Shared files are read once per `cache`.
+    """
+    if cache is None:
+        cache = {}
+    chars = {}
+    for shared_level in shared_levels(file):
+        if shared_level not in cache:
+            cache[shared_level] = tile_chars(root / shared_level)
+        chars.update(cache[shared_level])
+    return chars
+
+
+def validate_path(
+    path: Path, file: str, fallback_chars: Optional[Dict[str, str]] = None
+) -> List[Diagnostic]:
+    try:
+        lines = read_lines(path)
+    except (OSError, UnicodeDecodeError) as err:
+        return [Diagnostic(file, 0, ERROR, "unreadable", str(err))]
+    return validate_lines(file, lines, fallback_chars)
+
+
+@dataclass
+class ValidationReport:
+    files: List[str]
+    diagnostics: List[Diagnostic]
+
+    @property
+    def errors(self) -> List[Diagnostic]:
+        return [
+            diagnostic
+            for diagnostic in self.diagnostics
+            if diagnostic.severity == ERROR
+        ]
+
+    def to_dict(self):
+        return {
+            "files": len(self.files),
+            "errors": len(self.errors),
+            "warnings": len(self.diagnostics) - len(self.errors),
+            "diagnostics": [asdict(diagnostic) for diagnostic in self.diagnostics],
+        }
+
+    def to_json(self) -> str:
+        return json.dumps(self.to_dict(), indent=2)
+
+    def to_text(self) -> str:
+        lines = [diagnostic.to_text() for diagnostic in self.diagnostics]
+        summary = self.to_dict()
+        lines.append(
+            f"{summary['files']} files, {summary['errors']} errors,"
+            f" {summary['warnings']} warnings"
+        )
+        return "\n".join(lines)
+
+
+def validate_dir(root: Path, workers: int = DEFAULT_WORKERS) -> ValidationReport:
+    """Validate every `.lvl` file below `root`.
+
+    Files are checked in a pool of `workers` processes, with the tile codes
+    of the shared files they depend on, see `SHARED_LEVELS`. Files are named
+    by their path relative to `root` in the report.
+    """
+    root = Path(root)
+    paths = {
+        path.relative_to(root).as_posix(): path for path in sorted(root.rglob("*.lvl"))
+    }
+    cache = {}
+    jobs = [
+        (path, file, fallback_tile_chars(root, file, cache))
+        for file, path in paths.items()
+    ]
+
+    if workers > 1 and len(paths) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(validate_path, *job) for job in jobs]
+            results = [future.result() for future in futures]
+    else:
+        results = [validate_path(*job) for job in jobs]
+
+    diagnostics = [diagnostic for result in results for diagnostic in result]
+    return ValidationReport(list(paths), diagnostics)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Validate level files.")
+    parser.add_argument("levels_dir", type=Path, help="Directory of .lvl files.")
+    parser.add_argument(
+        "--format",
+        choices=["text", "json"],
+        default="text",
+        help="Report format. Default: %(default)s",
+    )
+    parser.add_argument(
+        "--max-workers",
+        type=int,
+        default=DEFAULT_WORKERS,
+        help="Processes used to validate files. Default: %(default)s",
+    )
+    args = parser.parse_args()
+
+    report = validate_dir(args.levels_dir, args.max_workers)
+    if args.format == "json":
+        print(report.to_json())
+    else:
+        print(report.to_text())
+
+    sys.exit(1 if report.errors else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,6 @@
 from .base_sprite_loader import BaseSpriteLoader
 from .base_json_sprite_loader import BaseJsonSpriteLoader
+from .loader_index import LoaderIndex
 from .base_sprite_merger import BaseSpriteMerger
 from .base_json_sprite_merger import BaseJsonSpriteMerger
 from .base_deco_sheet import AbstractDecoSheet
@@ -10,6 +11,7 @@ from .base_floorstyled_sheet import AbstractFloorStyledSheet
 __all__ = [
     "BaseSpriteLoader",
     "BaseJsonSpriteLoader",
+    "LoaderIndex",
     "BaseSpriteMerger",
     "BaseJsonSpriteMerger",
     "AbstractDecoSheet",
@@ -1,6 +1,6 @@
 from abc import ABC, abstractmethod
 from pathlib import Path
-from typing import Dict, Optional, Type
+from typing import Callable, Dict, Optional, Type
 
 from PIL import Image
 
@@ -48,6 +48,13 @@ class AbstractBiome(ABC):
 
     @property
     def bg(self) -> Image.Image:
+        if self._bg is None:
+            try:
+                self._bg = Image.open(
+                    self.base_path / f"Data/Textures/bg_{self.floor_name}.png"
+                )
+            except Exception:
+                self._bg = Image.open(self.base_path / f"Data/Textures/bg_cave.png")
         return self._bg
 
     def __init__(self, base_path: Path = DEFAULT_BASE_PATH):
@@ -55,10 +62,8 @@ class AbstractBiome(ABC):
         self._floor_sheet = self._floor_sheet_class(base_path)
         self._floorstyled_sheet = self._floorstyled_sheet_class(base_path)
         self._deco_sheet = self._deco_sheet_class(base_path)
-        try:
-            self._bg = Image.open(base_path / f"Data/Textures/bg_{self.floor_name}.png")
-        except Exception:
-            self._bg = Image.open(base_path / f"Data/Textures/bg_cave.png")
+        # Opened the first time it's used
+        self._bg = None
         self._image_cache = {}
         self._sheet_map = self._make_sheet_map()
 
@@ -87,6 +92,9 @@ class AbstractBiome(ABC):
             sheet_map[k] = self._floorstyled_sheet.get
         return sheet_map
 
+    def key_map(self) -> Dict[str, Callable]:
+        return dict(self._sheet_map)
+
     def get(self, name: str) -> Optional[Image.Image]:
         # shortcut to check if we actually have this key available to us and bail out
         # early if we don't
@@ -1,13 +1,10 @@
 from abc import abstractmethod
 from pathlib import Path
 
-from PIL import Image
-
 from .base_sprite_loader import BaseSpriteLoader
 
 
 class AbstractDecoSheet(BaseSpriteLoader):
-    _sprite_sheet: Image.Image
     _base_path: Path
 
     @property
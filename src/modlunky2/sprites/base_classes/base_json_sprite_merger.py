@@ -17,6 +17,12 @@ class BaseJsonSpriteMerger(BaseSpriteMerger):
 
     def __init__(self, entities_json: dict, textures_json: dict, *args, **kwargs):
         # Extend _origin_map first because BaseSpriteMerger.__init__ needs that information ready
+        # Work on a copy so instantiating a merger more than once doesn't keep extending
+        # the lists on the class attribute.
+        self._origin_map = {
+            loader_type: list(chunk_maps) if isinstance(chunk_maps, list) else chunk_maps
+            for loader_type, chunk_maps in self._origin_map.items()
+        }
         for loader_type, entity_names in self._entity_origins.items():
             chunk_size = loader_type._chunk_size
             if loader_type not in self._origin_map:
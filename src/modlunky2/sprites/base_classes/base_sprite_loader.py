@@ -1,39 +1,21 @@
 from abc import ABC, abstractmethod
-from functools import wraps
+from logging import getLogger
 from pathlib import Path
-from typing import Callable, Dict, Optional, Union
 from threading import Lock
+from typing import Callable, Dict, Optional, Union
 
 from PIL import Image
 
+from .crop_cache import DEFAULT_MAX_BYTES, CropCache
+from .image_pool import IMAGE_POOL, ImagePool, PoolKey
 from .types import chunk_map_type
 
+logger = getLogger("modlunky2")
+
 _DEFAULT_BASE_PATH = Path(
     r"C:\Program Files (x86)\Steam\steamapps\common\Spelunky 2\Mods\Extracted"
 )
 
-_CACHED_NONE_SENTINEL = object()
-_CACHE_LOCK = Lock()
-
-
-def _cache_img_not_class(f):
-    """using this because functools.lrucache will keep the class object from getting
-    GCed if you are using it on a method"""
-
-    # noinspection PyProtectedMember
-    @wraps(f)
-    def cache_img(slf, name: str):
-        with _CACHE_LOCK:
-            img = slf._cache_dict.get(name)
-            if not img:
-                img = f(slf, name) or _CACHED_NONE_SENTINEL
-                slf._cache_dict[name] = img
-            if img is _CACHED_NONE_SENTINEL:
-                return None
-            return img
-
-    return cache_img
-
 
 class BaseSpriteLoader(ABC):
     @property
@@ -63,12 +45,38 @@ class BaseSpriteLoader(ABC):
         """
         pass
 
-    def __init__(self, base_path: Path = _DEFAULT_BASE_PATH):
+    def __init__(
+        self,
+        base_path: Path = _DEFAULT_BASE_PATH,
+        image_pool: ImagePool = IMAGE_POOL,
+        cache_max_bytes: int = DEFAULT_MAX_BYTES,
+    ):
         self.base_path = base_path
-        self._sprite_sheet = Image.open(self.base_path / self._sprite_sheet_path)
-        # This is to support the caching decorator and let it use storage on this class
-        # otherwise we get doofy global dicts for caching
-        self._cache_dict = {}
+        # The sheet is only decoded once something is cropped from it, and is
+        # shared with any other loader reading the same file.
+        self._image_pool = image_pool
+        # Where the sheet is in the pool, or why it couldn't be opened. Checked
+        # when the sheet is first needed, edits after that aren't picked up.
+        self._pool_key: Optional[PoolKey] = None
+        self._open_error: Optional[OSError] = None
+        self._open_lock = Lock()
+        self.crop_cache = CropCache(cache_max_bytes)
+
+    def _sheet_key(self) -> PoolKey:
+        with self._open_lock:
+            if self._pool_key is None and self._open_error is None:
+                try:
+                    self._pool_key = self._image_pool.key(self.sprite_sheet_path)
+                except OSError as err:
+                    logger.error(
+                        "Failed to open sprite sheet %s: %s",
+                        self.sprite_sheet_path,
+                        err,
+                    )
+                    self._open_error = err
+        if self._open_error is not None:
+            raise self._open_error.with_traceback(None)
+        return self._pool_key
 
     def _get_block(
         self,
@@ -79,13 +87,22 @@ class BaseSpriteLoader(ABC):
     ) -> Image.Image:
         """Used to get chunks of the sprite sheet."""
         bbox = tuple(map(lambda x: x * self._chunk_size, (left, upper, right, lower)))
-        return self._sprite_sheet.crop(bbox)
+        key = self._sheet_key()
+        with self._image_pool.borrow(self.sprite_sheet_path, key) as sprite_sheet:
+            return sprite_sheet.crop(bbox)
 
-    @_cache_img_not_class
-    def get(self, name: str) -> Optional[Image.Image]:
+    @property
+    def sprite_sheet_path(self) -> Path:
+        return self.base_path / self._sprite_sheet_path
+
+    def _crop(self, name: str) -> Optional[Image.Image]:
         coords = self._chunk_map.get(name)
         if coords:
             return self._get_block(*coords)
+        return None
+
+    def get(self, name: str) -> Optional[Image.Image]:
+        return self.crop_cache.get(name, self._crop)
 
     def key_map(self) -> Dict[str, Callable]:
         return {k: self.get for k in self._chunk_map}
@@ -1,11 +1,12 @@
 from abc import ABC, abstractmethod
 from pathlib import Path
-from typing import Dict, List, Type, Tuple
+from typing import Dict, List, Type, Tuple, Union
 from logging import getLogger
 from PIL import Image, ImageDraw, ImageFont
 
 from .types import image_crop_tuple_whole_number, chunk_map_type
 from .base_sprite_loader import BaseSpriteLoader
+from .loader_index import LoaderIndex
 
 _DEFAULT_BASE_PATH = Path(
     r"C:\Program Files (x86)\Steam\steamapps\common\Spelunky 2\Mods\Extracted"
@@ -50,6 +51,8 @@ class BaseSpriteMerger(ABC):
         self._separate_grid_file = separate_grid_file
         self._grid_colors = [(255, 0, 0, 255), (0, 0, 255, 255)]
         self._origin_sizes = {}
+        # Copy so normalizing the chunk maps below doesn't touch the class attribute
+        self._origin_map = dict(self._origin_map)
 
         max_image_width = 0
         total_image_height = 0
@@ -77,7 +80,14 @@ class BaseSpriteMerger(ABC):
             self._origin_sizes[sprite_loader_type] = image_sizes
             self._origin_map[sprite_loader_type] = chunk_maps
 
-        image_size = (int(max_image_width), int(total_image_height))
+        self._image_size = (int(max_image_width), int(total_image_height))
+        # The images are only allocated once merging starts
+        self._sprite_sheet = None
+        self._grid_image = None
+        self._grid_image_draw = None
+
+    def _create_images(self):
+        image_size = self._image_size
         self._sprite_sheet = Image.new(mode="RGBA", size=image_size, color=(0, 0, 0, 0))
 
         if self._separate_grid_file:
@@ -176,16 +186,24 @@ class BaseSpriteMerger(ABC):
         bbox = (left, upper, right, lower)
         self._sprite_sheet.paste(image, bbox)
 
-    def do_merge(self, sprite_loaders: List[BaseSpriteLoader]) -> Image:
+    @property
+    def source_types(self) -> List[Type[BaseSpriteLoader]]:
+        """ The sprite loaders this sheet is merged from."""
+        return list(self._origin_map)
+
+    def do_merge(
+        self, sprite_loaders: Union[List[BaseSpriteLoader], LoaderIndex]
+    ) -> Image:
         logger.info("Merging sprites for sheet %s", self.stem)
+        self._create_images()
+
+        if not isinstance(sprite_loaders, LoaderIndex):
+            sprite_loaders = LoaderIndex(sprite_loaders)
 
         height_offset = 0
         for sprite_loader_type, chunk_maps in self._origin_map.items():
-            matching_sprite_loaders = [
-                x for x in sprite_loaders if isinstance(x, sprite_loader_type)
-            ]
-            if matching_sprite_loaders:
-                sprite_loader = matching_sprite_loaders[0]
+            sprite_loader = sprite_loaders.find(sprite_loader_type)
+            if sprite_loader is not None:
                 chunk_size = sprite_loader_type._chunk_size
                 image_sizes = self._origin_sizes[sprite_loader_type]
                 for chunk_map, image_size in zip(chunk_maps, image_sizes):
@@ -217,12 +235,47 @@ class BaseSpriteMerger(ABC):
                 )
         return self._sprite_sheet
 
+    @property
+    def _grid_file_path(self) -> Path:
+        return self._full_path.with_name(
+            f"{self._full_path.stem}_grid{self._full_path.suffix}"
+        )
+
+    @property
+    def output_paths(self) -> List[Path]:
+        """ The files written by `save`."""
+        if self._separate_grid_file:
+            return [self._full_path, self._grid_file_path]
+        return [self._full_path]
+
+    def layout(self) -> Dict:
+        """Everything about this sheet that decides where sprites end up.
+
+        Together with the contents of the source sheets this is all a merged
+        sheet depends on.
+        """
+        return {
+            "separate_grid_file": self._separate_grid_file,
+            "grid_hint_size": self._grid_hint_size,
+            "origin_map": [
+                [
+                    f"{loader_type.__module__}.{loader_type.__qualname__}",
+                    loader_type._chunk_size,
+                    [sorted(chunk_map.items()) for chunk_map in chunk_maps],
+                ]
+                for loader_type, chunk_maps in self._origin_map.items()
+            ],
+        }
+
     def save(self):
         if not self._full_path.parent.exists():
             self._full_path.parent.mkdir(parents=True, exist_ok=True)
         self._sprite_sheet.save(self._full_path)
         if self._separate_grid_file:
-            grid_file_path = (
-                f"{self._full_path.with_suffix('')}_grid{self._full_path.suffix}"
-            )
-            self._grid_image.save(grid_file_path)
+            self._grid_image.save(self._grid_file_path)
+
+    def release_images(self):
+        """ Free the merged images, e.g. once they've been saved."""
+        self._sprite_sheet = None
+        self._grid_image = None
+        self._grid_image_draw = None
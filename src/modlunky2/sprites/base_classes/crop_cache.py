@@ -0,0 +1,99 @@
+from collections import OrderedDict
+from threading import Lock
+from typing import Callable, Dict, Optional
+
+from PIL import Image
+
+from .image_pool import image_size_in_bytes
+
+# Per loader, most sheets crop to a few MiB of sprites in total
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+NUM_STRIPES = 16
+
+# Stored for names the loader has nothing for, so they aren't looked up again
+_NO_IMAGE = object()
+
+
+class CropCache:
+    """Sprites already cropped out of a sheet, by name.
+
+    Cropping happens under one of `NUM_STRIPES` locks picked by name, so
+    threads asking for the same sprite crop it once while threads asking for
+    other sprites carry on. The lock guarding the entries themselves is only
+    held for dict updates. Once the cached sprites take more than `max_bytes`
+    the least recently used ones are dropped.
+    """
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = Lock()
+        self._stripes = [Lock() for _ in range(NUM_STRIPES)]
+        self._entries: Dict[str, object] = OrderedDict()
+        self._sizes: Dict[str, int] = {}
+        self._bytes = 0
+
+    def _lookup(self, name: str):
+        with self._lock:
+            image = self._entries.get(name)
+            if image is not None:
+                self._entries.move_to_end(name)
+                self.hits += 1
+            return image
+
+    def get(
+        self, name: str, crop: Callable[[str], Optional[Image.Image]]
+    ) -> Optional[Image.Image]:
+        """ The cached sprite for `name`, calling `crop(name)` on a miss."""
+        image = self._lookup(name)
+        if image is None:
+            with self._stripes[hash(name) % NUM_STRIPES]:
+                # Another thread may have cropped it while we waited
+                image = self._lookup(name)
+                if image is None:
+                    image = crop(name)
+                    if image is None:
+                        image = _NO_IMAGE
+                    self._put(name, image)
+
+        if image is _NO_IMAGE:
+            return None
+        return image
+
+    def _put(self, name: str, image):
+        size = 0 if image is _NO_IMAGE else image_size_in_bytes(image)
+        with self._lock:
+            self.misses += 1
+            self._entries[name] = image
+            self._sizes[name] = size
+            self._bytes += size
+            while self._bytes > self.max_bytes and len(self._entries) > 1:
+                oldest, _ = self._entries.popitem(last=False)
+                self._bytes -= self._sizes.pop(oldest)
+
+    @property
+    def num_bytes(self) -> int:
+        return self._bytes
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+            }
+
+    def __contains__(self, name: str):
+        with self._lock:
+            return name in self._entries
+
+    def __len__(self):
+        return len(self._entries)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._sizes.clear()
+            self._bytes = 0
@@ -0,0 +1,141 @@
+import os
+from collections import OrderedDict
+from contextlib import contextmanager
+from pathlib import Path
+from threading import Lock
+from typing import Dict, Optional, Tuple
+
+from PIL import Image
+
+# Enough to keep the sheets used by a level editor session decoded
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+PoolKey = Tuple[str, int]
+
+
+def image_size_in_bytes(image: Image.Image) -> int:
+    width, height = image.size
+    return width * height * len(image.getbands())
+
+
+class _PoolEntry:
+    __slots__ = ("image", "size", "refs")
+
+    def __init__(self, image: Image.Image):
+        self.image = image
+        self.size = image_size_in_bytes(image)
+        self.refs = 0
+
+
+class ImagePool:
+    """Decoded sprite sheets shared by every loader in the process.
+
+    Sheets are keyed by absolute path and mtime, so several loaders reading
+    the same PNG decode it once and an edited file is decoded again. Sheets
+    that aren't borrowed are dropped, least recently used first, once the
+    pool holds more than `max_bytes` of pixels.
+    """
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._lock = Lock()
+        self._entries: Dict[PoolKey, _PoolEntry] = OrderedDict()
+        self._bytes = 0
+
+    @staticmethod
+    def key(path: Path) -> PoolKey:
+        path = os.path.abspath(path)
+        return path, os.stat(path).st_mtime_ns
+
+    def acquire(
+        self, path: Path, key: Optional[PoolKey] = None
+    ) -> Tuple[PoolKey, Image.Image]:
+        """Borrow the decoded sheet at `path`.
+
+        The returned key has to be passed to `release` once done with the
+        image. The image is shared, so it must not be modified. Passing a
+        `key` from an earlier call skips checking the file again.
+        """
+        if key is None:
+            key = self.key(path)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry.refs += 1
+                self._entries.move_to_end(key)
+                return key, entry.image
+
+        # Decoding a large sheet takes a while, don't hold up other sheets
+        with Image.open(key[0]) as image:
+            image.load()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = _PoolEntry(image)
+                self._drop_stale(key[0])
+                self._entries[key] = entry
+                self._bytes += entry.size
+            entry.refs += 1
+            self._entries.move_to_end(key)
+            self._evict()
+            return key, entry.image
+
+    def release(self, key: PoolKey):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return
+            entry.refs -= 1
+            self._evict()
+
+    @contextmanager
+    def borrow(self, path: Path, key: Optional[PoolKey] = None):
+        key, image = self.acquire(path, key)
+        try:
+            yield image
+        finally:
+            self.release(key)
+
+    def _drop_stale(self, path: str):
+        """ Forget versions of a sheet from before it was last modified."""
+        for key in [key for key in self._entries if key[0] == path]:
+            if self._entries[key].refs == 0:
+                self._bytes -= self._entries.pop(key).size
+
+    def _evict(self):
+        if self._bytes <= self.max_bytes:
+            return
+        for key in list(self._entries):
+            entry = self._entries[key]
+            if entry.refs > 0:
+                continue
+            del self._entries[key]
+            self._bytes -= entry.size
+            if self._bytes <= self.max_bytes:
+                return
+
+    @property
+    def num_bytes(self) -> int:
+        return self._bytes
+
+    def __contains__(self, path: Path):
+        try:
+            key = self.key(path)
+        except OSError:
+            return False
+        with self._lock:
+            return key in self._entries
+
+    def __len__(self):
+        return len(self._entries)
+
+    def clear(self):
+        """ Drop every sheet that isn't borrowed."""
+        with self._lock:
+            for key in list(self._entries):
+                if self._entries[key].refs == 0:
+                    self._bytes -= self._entries.pop(key).size
+
+
+IMAGE_POOL = ImagePool()
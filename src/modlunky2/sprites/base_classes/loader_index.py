@@ -0,0 +1,34 @@
+from typing import Dict, Iterable, Optional, Type
+
+from .base_sprite_loader import BaseSpriteLoader
+
+
+class LoaderIndex:
+    """Sprite loaders by type.
+
+    Looking a type up gives the first loader that's an instance of it, the
+    same one scanning the list with `isinstance` would find, but the scan
+    only happens once per type.
+    """
+
+    def __init__(self, sprite_loaders: Iterable[BaseSpriteLoader]):
+        self._loaders = list(sprite_loaders)
+        self._by_type: Dict[Type[BaseSpriteLoader], Optional[BaseSpriteLoader]] = {}
+
+    def find(self, loader_type: Type[BaseSpriteLoader]) -> Optional[BaseSpriteLoader]:
+        if loader_type not in self._by_type:
+            self._by_type[loader_type] = next(
+                (
+                    sprite_loader
+                    for sprite_loader in self._loaders
+                    if isinstance(sprite_loader, loader_type)
+                ),
+                None,
+            )
+        return self._by_type[loader_type]
+
+    def __iter__(self):
+        return iter(self._loaders)
+
+    def __len__(self):
+        return len(self._loaders)
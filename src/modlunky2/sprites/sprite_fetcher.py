@@ -1,6 +1,10 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import Callable, Dict, List, Optional, Tuple
 from modlunky2.constants import BASE_DIR
+from modlunky2.levels import LevelFile
 
 from PIL import Image
 
@@ -11,6 +15,11 @@ from .base_classes import (
     DEFAULT_BASE_PATH,
 )
 
+logger = logging.getLogger("modlunky2")
+
+# Decoding sheets and cropping mostly happen in Pillow without the GIL
+WARM_UP_THREADS = 4
+
 
 class SpelunkySpriteFetcher:
     def __init__(self, base_path: Path = DEFAULT_BASE_PATH):
@@ -19,7 +28,7 @@ class SpelunkySpriteFetcher:
         self._non_biome_sheets, self._non_biome_map = self._make_non_biome_map()
         # Now biome specific pieces
         self._biome_dict = self._init_biomes()
-        self._biome_map = {k: v.get for k, v in self._biome_dict.items()}
+        self._biome_fallback, self._resolved = self._make_resolution_table()
 
     def _init_biomes(self) -> Dict[str, AbstractBiome]:
         from . import biomes
@@ -71,18 +80,84 @@ class SpelunkySpriteFetcher:
                 key_map[k] = sheet.get
         return sheets, key_map
 
-    # noinspection PyNoneFunctionAssignment
+    def _make_resolution_table(
+        self,
+    ) -> Tuple[Dict[str, Callable], Dict[Tuple[str, str], Optional[Callable]]]:
+        """Which `get` to call for every name in every biome.
+
+        Mirrors the old lookup order: sheets shared by all biomes, then the
+        requested biome, then the first other biome that has the name.
+        """
+        biome_key_maps = {
+            biome_name: biome.key_map()
+            for biome_name, biome in self._biome_dict.items()
+        }
+        fallback = {}
+        for key_map in biome_key_maps.values():
+            for name, get in key_map.items():
+                fallback.setdefault(name, get)
+
+        resolved = {}
+        for biome_name, key_map in biome_key_maps.items():
+            for name in fallback:
+                resolved[(name, biome_name)] = key_map.get(name, fallback[name])
+            for name, get in self._non_biome_map.items():
+                resolved[(name, biome_name)] = get
+        return fallback, resolved
+
+    def resolve(self, name: str, biome: str = "cave") -> Optional[Callable]:
+        """The `get` of the sheet that has `name`, None if no sheet does."""
+        get = self._resolved.get((name, biome))
+        if get is not None:
+            return get
+
+        # Biomes we don't know about, and names nothing has, aren't in the
+        # table. They're cheap to work out and remembering them would let the
+        # table grow with every name asked for.
+        return self._non_biome_map.get(name) or self._biome_fallback.get(name)
+
     def get(self, name: str, biome: str = "cave") -> Optional[Image.Image]:
-        # we are getting the right sprite sheet with the first `(name)` then getting the
-        # image with the second `(name)` maybe using partials here would be more
-        # pleasing?
-        img = self._non_biome_map.get(name, lambda x: None)(name)
-        if not img:
-            img = self._biome_map.get(biome, lambda x: None)(name)
-        if not img:
-            for bname, b_class in self._biome_dict.items():
-                if bname != biome:
-                    img = b_class.get(name)
-                if img:
-                    break
-        return img
+        get = self.resolve(name, biome)
+        if get is None:
+            return None
+        return get(name)
+
+    def warm_up(self, level_file: LevelFile, biome: str = "cave") -> int:
+        """Crop every sprite the tile codes of `level_file` can show.
+
+        Tile codes with a `%` are split into the tiles they choose between,
+        the same way the level editor does. Sprites are cropped on a few
+        threads, the crop caches let them work on different sheets at once.
+        Returns how many sprites were found.
+        """
+        names = {"unknown", "empty"}
+        for tile_code in level_file.tile_codes.all():
+            names.add(tile_code.name)
+            parts = tile_code.name.split("%", 2)
+            names.add(parts[0])
+            if len(parts) > 2:
+                names.add(parts[2])
+
+        with ThreadPoolExecutor(max_workers=WARM_UP_THREADS) as pool:
+            images = pool.map(lambda name: self.get(name, biome), names)
+            return sum(1 for image in images if image is not None)
+
+    def warm_up_in_background(
+        self, level_files: List[LevelFile], biome: str = "cave"
+    ) -> threading.Thread:
+        """Run `warm_up` for each of `level_files` on a daemon thread.
+
+        Sprites asked for in the meantime are cropped as usual, the crop
+        caches make sure each one is only cropped once either way.
+        """
+
+        def warm_up_all():
+            for level_file in level_files:
+                try:
+                    self.warm_up(level_file, biome)
+                except Exception as err:  # pylint: disable=broad-except
+                    logger.warning("Failed to crop sprites ahead of time: %s", err)
+
+        thread = threading.Thread(target=warm_up_all, daemon=True)
+        thread.start()
+        return thread
@@ -68,16 +68,19 @@ def extract_assets(
         )
 
     with exe_filename.open("rb") as exe:
-        asset_store = AssetStore.load_from_file(exe)
-        unextracted = asset_store.extract(
-            mods_dir / EXTRACTED_DIR,
-            mods_dir / ".compressed" / EXTRACTED_DIR,
-            recompress=recompress,
-            generate_string_hashes=generate_string_hashes,
-            create_entity_sheets=create_entity_sheets,
-            extract_sound_extensions=extract_sound_extensions,
-            reuse_extracted=reuse_extracted,
-        )
+        asset_store = AssetStore.load_from_mmap(exe)
+        try:
+            unextracted = asset_store.extract(
+                mods_dir / EXTRACTED_DIR,
+                mods_dir / ".compressed" / EXTRACTED_DIR,
+                recompress=recompress,
+                generate_string_hashes=generate_string_hashes,
+                create_entity_sheets=create_entity_sheets,
+                extract_sound_extensions=extract_sound_extensions,
+                reuse_extracted=reuse_extracted,
+            )
+        finally:
+            asset_store.close()
 
     for asset in unextracted:
         logger.warning("Un-extracted Asset %s", asset.asset_block)
@@ -14,7 +14,7 @@ import pyperclip
 from PIL import Image, ImageDraw, ImageEnhance, ImageTk
 
 from modlunky2.constants import BASE_DIR
-from modlunky2.levels import LevelFile
+from modlunky2.levels import LevelFile, LevelSet
 from modlunky2.levels.level_chances import LevelChance, LevelChances
 from modlunky2.levels.level_settings import LevelSetting, LevelSettings
 from modlunky2.levels.level_templates import (
@@ -103,6 +103,7 @@ class LevelsTab(Tab):
         self.lvl_biome = None
         self.node = None
         self.sister_locations = None
+        self.extracts_levels = None
 
         def select_lvl_folder():
             initial_dir = self.modlunky_config.install_dir / "Mods/Packs"
@@ -1332,8 +1333,8 @@ class LevelsTab(Tab):
                             self.tree_files.item(self.last_selected_file, option="text")
                         )
                     )
-                with Path(path).open("w", encoding="cp1252") as handle:
-                    level_file.write(handle)
+                if not level_file.write_path(Path(path)):
+                    logger.debug("Level unchanged, skipped writing %s", path)
                 self.save_needed = False
                 self.button_save["state"] = tk.DISABLED
                 logger.debug("Saved")
@@ -1542,14 +1543,21 @@ class LevelsTab(Tab):
                             / "Overrides"
                             / str(level[1][2].split(" ")[0])
                         )
-                    with Path(path).open("w", encoding="cp1252") as handle:
-                        level[0].write(handle)
-                        logger.debug("Fixed conflicts in %s", level[1][2].split(" ")[0])
+                    level[0].write_path(Path(path))
+                    logger.debug("Fixed conflicts in %s", level[1][2].split(" ")[0])
             except Exception:  # pylint: disable=broad-except
                 logger.critical("Error: %s", tb_info())
         self.tree_filesitemclick(self)
         self.check_dependencies()
 
+    def get_extracted_level(self, name):
+        # Parsing every extracted level is cached on disk so this is only slow
+        # the first time. LevelSet.get re-parses any file that changed since.
+        # This runs on the Tk thread, so no process pool.
+        if self.extracts_levels is None:
+            self.extracts_levels = LevelSet.load_dir(self.extracts_path, workers=1)
+        return self.extracts_levels.get(name)
+
     def check_dependencies(self):
         self.depend_order_label["text"] = ""
         for i in self.tree_depend.get_children():  # clears tree
@@ -1574,7 +1582,7 @@ class LevelsTab(Tab):
                     levels.append(
                         [
                             item + " extracts",
-                            LevelFile.from_path(Path(self.extracts_path) / item),
+                            self.get_extracted_level(item),
                         ]
                     )
             else:
@@ -1589,7 +1597,7 @@ class LevelsTab(Tab):
                     levels.append(
                         [
                             item + " extracts",
-                            LevelFile.from_path(Path(self.extracts_path) / item),
+                            self.get_extracted_level(item),
                         ]
                     )
 
@@ -3114,6 +3122,10 @@ class LevelsTab(Tab):
                     )
         levels.append(LevelFile.from_path(Path(lvl_path)))
 
+        # Crop the sprites of every tile code off the Tk thread so most are
+        # ready by the time the palette and rooms are drawn
+        self._sprite_fetcher.warm_up_in_background(levels, self.lvl_biome)
+
         level = None
         for level in levels:
             logger.debug("%s loaded.", level.comment)
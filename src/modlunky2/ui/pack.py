@@ -10,6 +10,7 @@ from PIL import Image, ImageTk
 from modlunky2.assets.assets import AssetStore
 from modlunky2.assets.exc import MissingAsset
 from modlunky2.assets.hashing import md5sum_path
+from modlunky2.assets.manifest import PackManifest
 from modlunky2.assets.patcher import Patcher
 from modlunky2.constants import BASE_DIR
 from modlunky2.ui.widgets import ScrollableLabelFrame, Tab, ToolTip
@@ -51,7 +52,14 @@ def pack_assets(_call, install_dir, packs):
             )
             return
 
-    shutil.copy2(source_exe, dest_exe)
+    manifest = PackManifest.from_compressed_dir(mods_dir / ".compressed")
+    # The previous pack is only reused if nothing else touched either exe
+    reuse_dest = manifest.matches_exes(source_exe, dest_exe)
+    if reuse_dest:
+        logger.info("Reusing previously packed %s", dest_exe)
+    else:
+        manifest = PackManifest(manifest.path)
+        shutil.copy2(source_exe, dest_exe)
 
     with dest_exe.open("rb+") as dest_file:
         asset_store = AssetStore.load_from_file(dest_file)
@@ -60,6 +68,7 @@ def pack_assets(_call, install_dir, packs):
                 packs,
                 extract_dir,
                 mods_dir / ".compressed",
+                manifest=manifest,
             )
         except MissingAsset as err:
             logger.error(
@@ -67,10 +76,13 @@ def pack_assets(_call, install_dir, packs):
             )
             return
 
-        patcher = Patcher(dest_file)
-        patcher.patch_checksum()
-        patcher.patch_release()
-        logger.info("Repacking complete!")
+        if not reuse_dest:
+            patcher = Patcher(dest_file)
+            patcher.patch_checksum()
+            patcher.patch_release()
+
+    manifest.save(source_exe, dest_exe)
+    logger.info("Repacking complete!")
 
 
 class WarningFrame(ttk.Frame):
@@ -51,3 +51,22 @@ def temp_chdir(new_dir):
         yield
     finally:
         os.chdir(old_dir)
+
+
+@contextlib.contextmanager
+def atomic_write(path, mode="w", **kwargs):
+    """Open a temporary file that replaces `path` once it's closed.
+
+    Readers see either the old file or the whole new one, never a partially
+    written file. Creates the parent directory if needed.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f"{path.name}.tmp")
+    try:
+        with tmp_path.open(mode, **kwargs) as tmp_file:
+            yield tmp_file
+        os.replace(tmp_path, path)
+    except BaseException:
+        if tmp_path.exists():
+            tmp_path.unlink()
+        raise
@@ -0,0 +1,256 @@
+import shutil
+import threading
+
+import pytest
+
+from modlunky2.assets import assets, filepath_hashes, staleness
+from modlunky2.assets.assets import AssetStore, DiskBundle
+from modlunky2.assets.executors import ExecutorType
+from modlunky2.assets.filepath_hashes import FilepathHashes
+from modlunky2.assets.manifest import PackManifest
+
+
+def test_load_populates_filepaths(tmp_path, exe_path, exe_assets):
+    hashes = FilepathHashes(tmp_path / "hashes.json")
+    with exe_path.open("rb") as exe:
+        asset_store = AssetStore.load_from_file(exe, hashes)
+
+    assert [asset.filepath for asset in asset_store.assets] == [
+        filepath for filepath, _, _ in exe_assets
+    ]
+    assert asset_store.find_asset("Data/Levels/abzu.lvl") is asset_store.assets[0]
+    assert asset_store.find_asset("Data/Levels/olmec.lvl") is None
+
+
+def test_cached_filepath_hashes(tmp_path, exe_path, exe_assets, monkeypatch):
+    hashes_path = tmp_path / "hashes.json"
+    with exe_path.open("rb") as exe:
+        AssetStore.load_from_file(exe, FilepathHashes(hashes_path))
+    assert hashes_path.exists()
+
+    def fail(*_args):
+        raise AssertionError("Filepath hashed despite cache")
+
+    monkeypatch.setattr(filepath_hashes, "hash_filepath", fail)
+    with exe_path.open("rb") as exe:
+        asset_store = AssetStore.load_from_file(
+            exe, FilepathHashes.from_path(hashes_path)
+        )
+
+    assert [asset.filepath for asset in asset_store.assets] == [
+        filepath for filepath, _, _ in exe_assets
+    ]
+
+
+@pytest.mark.parametrize("executor_type", list(ExecutorType))
+def test_extract(tmp_path, exe_path, exe_assets, executor_type):
+    extract_dir = tmp_path / "Extracted"
+    compressed_dir = tmp_path / ".compressed" / "Extracted"
+    for dir_ in [extract_dir, compressed_dir]:
+        (dir_ / "Data/Levels").mkdir(parents=True)
+
+    with exe_path.open("rb") as exe:
+        asset_store = AssetStore.load_from_file(exe, FilepathHashes())
+        unextracted = asset_store.extract(
+            extract_dir,
+            compressed_dir,
+            max_workers=2,
+            create_entity_sheets=False,
+            max_pending_bytes=1,
+            executor_type=executor_type,
+        )
+
+    assert unextracted == []
+    assert all(asset.data is None for asset in asset_store.assets)
+    for filepath, data, _ in exe_assets:
+        assert (extract_dir / filepath).read_bytes() == data
+    assert (compressed_dir / "Data/Levels/abzu.lvl.zst").exists()
+    assert (extract_dir / "strings00_hashed.str").exists()
+
+
+def test_load_from_mmap(tmp_path, exe_path, exe_assets):
+    with exe_path.open("rb") as exe:
+        file_store = AssetStore.load_from_file(exe, FilepathHashes())
+        mmap_store = AssetStore.load_from_mmap(exe, FilepathHashes())
+
+        assert mmap_store.key == file_store.key
+        assert mmap_store.total_size == file_store.total_size
+        assert [asset.asset_block for asset in mmap_store.assets] == [
+            asset.asset_block for asset in file_store.assets
+        ]
+
+        asset = mmap_store.assets[2]
+        mmap_store.load_asset_data(asset)
+        assert isinstance(asset.data, memoryview)
+        assert asset.data == exe_assets[2][1]
+
+        extract_dir = tmp_path / "Extracted"
+        compressed_dir = tmp_path / ".compressed" / "Extracted"
+        for dir_ in [extract_dir, compressed_dir]:
+            (dir_ / "Data/Levels").mkdir(parents=True)
+        mmap_store.extract(extract_dir, compressed_dir, create_entity_sheets=False)
+        mmap_store.close()
+
+    for filepath, data, _ in exe_assets:
+        assert (extract_dir / filepath).read_bytes() == data
+
+
+def test_close_with_data_still_viewed(exe_path, exe_assets):
+    with exe_path.open("rb") as exe:
+        mmap_store = AssetStore.load_from_mmap(exe, FilepathHashes())
+        asset = mmap_store.assets[2]
+        mmap_store.load_asset_data(asset)
+        # As a worker still extracting when close is called would
+        data = asset.data
+        mmap_store.close()
+
+    assert data == exe_assets[2][1]
+    data.release()
+
+
+def _repackage(dest_path, extract_dir, manifest):
+    with dest_path.open("rb+") as dest:
+        asset_store = AssetStore.load_from_file(dest, FilepathHashes())
+        asset_store.repackage(
+            [],
+            extract_dir,
+            extract_dir.parent / ".compressed",
+            executor_type=ExecutorType.INLINE,
+            manifest=manifest,
+        )
+
+
+def test_repackage_only_changed_assets(tmp_path, exe_path, monkeypatch):
+    extract_dir = tmp_path / "Extracted"
+    (extract_dir / "Data/Levels").mkdir(parents=True)
+    (tmp_path / ".compressed/Extracted/Data/Levels").mkdir(parents=True)
+    with exe_path.open("rb") as exe:
+        AssetStore.load_from_file(exe, FilepathHashes()).extract(
+            extract_dir,
+            tmp_path / ".compressed/Extracted",
+            create_entity_sheets=False,
+        )
+
+    dest_path = tmp_path / "Spel2-modded.exe"
+    shutil.copy2(exe_path, dest_path)
+    manifest = PackManifest.from_compressed_dir(tmp_path / ".compressed")
+    _repackage(dest_path, extract_dir, manifest)
+    manifest.save(exe_path, dest_path)
+
+    manifest = PackManifest.from_compressed_dir(tmp_path / ".compressed")
+    assert manifest.matches_exes(exe_path, dest_path)
+    assert set(manifest.assets) == {
+        "Data/Levels/abzu.lvl",
+        "strings00.str",
+        "shaders.hlsl",
+        "soundbank.bank",
+    }
+
+    # Same size so nothing moves, only the shader block should be rewritten
+    (extract_dir / "shaders.hlsl").write_bytes(b"float4 main() {}\r")
+    written = []
+    write_asset = AssetStore._write_asset
+
+    def record_write(self, asset, *args):
+        written.append(asset.filepath)
+        write_asset(self, asset, *args)
+
+    monkeypatch.setattr(AssetStore, "_write_asset", record_write)
+    _repackage(dest_path, extract_dir, manifest)
+    assert written == ["shaders.hlsl"]
+
+    full_path = tmp_path / "Spel2-full.exe"
+    shutil.copy2(exe_path, full_path)
+    _repackage(full_path, extract_dir, None)
+    assert dest_path.read_bytes() == full_path.read_bytes()
+
+
+def test_repackage_keeps_bank_padding(tmp_path, exe_path, monkeypatch):
+    extract_dir = tmp_path / "Extracted"
+    (extract_dir / "Data/Levels").mkdir(parents=True)
+    (tmp_path / ".compressed/Extracted/Data/Levels").mkdir(parents=True)
+    with exe_path.open("rb") as exe:
+        AssetStore.load_from_file(exe, FilepathHashes()).extract(
+            extract_dir,
+            tmp_path / ".compressed/Extracted",
+            create_entity_sheets=False,
+        )
+
+    # Packing reuses the dest exe, so its bank name is already padded
+    dest_path = tmp_path / "Spel2-modded.exe"
+    shutil.copy2(exe_path, dest_path)
+    manifest = PackManifest.from_compressed_dir(tmp_path / ".compressed")
+    _repackage(dest_path, extract_dir, manifest)
+    manifest.save(exe_path, dest_path)
+    first = dest_path.read_bytes()
+
+    changed = []
+    pack_changed_assets = AssetStore.pack_changed_assets
+
+    def record_changed(self, *args):
+        changed.append(self.layout())
+        return pack_changed_assets(self, *args)
+
+    monkeypatch.setattr(AssetStore, "pack_changed_assets", record_changed)
+    manifest = PackManifest.from_compressed_dir(tmp_path / ".compressed")
+    _repackage(dest_path, extract_dir, manifest)
+
+    assert changed == [manifest.layout()]
+    assert dest_path.read_bytes() == first
+
+
+def test_repackage_reuses_encrypted_data(tmp_path, exe_path, monkeypatch):
+    extract_dir = tmp_path / "Extracted"
+    (extract_dir / "Data/Levels").mkdir(parents=True)
+    (tmp_path / ".compressed/Extracted/Data/Levels").mkdir(parents=True)
+    with exe_path.open("rb") as exe:
+        AssetStore.load_from_file(exe, FilepathHashes()).extract(
+            extract_dir,
+            tmp_path / ".compressed/Extracted",
+            create_entity_sheets=False,
+        )
+
+    first_path = tmp_path / "Spel2-first.exe"
+    shutil.copy2(exe_path, first_path)
+    _repackage(first_path, extract_dir, None)
+
+    def fail(*_args):
+        raise AssertionError("Asset encrypted despite cache")
+
+    monkeypatch.setattr(assets, "chacha", fail)
+    second_path = tmp_path / "Spel2-second.exe"
+    shutil.copy2(exe_path, second_path)
+    _repackage(second_path, extract_dir, None)
+
+    assert second_path.read_bytes() == first_path.read_bytes()
+
+
+def test_compress_hashes_new_assets_in_workers(tmp_path, exe_path, monkeypatch):
+    extract_dir = tmp_path / "Extracted"
+    compressed_dir = tmp_path / ".compressed/Extracted"
+    (extract_dir / "Data/Levels").mkdir(parents=True)
+    with exe_path.open("rb") as exe:
+        asset_store = AssetStore.load_from_file(exe, FilepathHashes())
+        asset_store.extract(
+            extract_dir, compressed_dir, recompress=False, create_entity_sheets=False
+        )
+
+    hashed_on = []
+    md5sum_path = staleness.md5sum_path
+
+    def record_md5sum(path):
+        hashed_on.append(threading.current_thread())
+        return md5sum_path(path)
+
+    monkeypatch.setattr(staleness, "md5sum_path", record_md5sum)
+    disk_bundle = DiskBundle.from_dirs(
+        asset_store.assets, [], extract_dir, tmp_path / ".compressed"
+    )
+    disk_bundle.compress_if_needed(max_workers=2)
+
+    # Only the encrypted assets are compressed, neither was hashed before
+    assert len(hashed_on) == 2
+    assert threading.main_thread() not in hashed_on
+    for filepath in ["Data/Levels/abzu.lvl", "strings00.str"]:
+        md5sum = (compressed_dir / f"{filepath}.md5sum").read_bytes()
+        assert md5sum == md5sum_path(extract_dir / filepath)
@@ -0,0 +1,36 @@
+import os
+
+import pytest
+
+from modlunky2.assets.chacha import (
+    chacha,
+    np,
+    quad_rounds,
+    xor_keystream_int,
+    xor_keystream_numpy,
+    xor_keystream_py,
+)
+
+KEY = quad_rounds(bytes(range(0x40)))
+
+SIZES = [0, 1, 0x3F, 0x40, 0x41, 0x80, 0x1000 + 7]
+
+
+@pytest.mark.parametrize("size", SIZES)
+def test_xor_keystream_int(size):
+    data = os.urandom(size)
+    assert xor_keystream_int(data, KEY) == xor_keystream_py(data, KEY)
+
+
+@pytest.mark.skipif(np is None, reason="numpy not installed")
+@pytest.mark.parametrize("size", SIZES)
+def test_xor_keystream_numpy(size):
+    data = os.urandom(size)
+    assert xor_keystream_numpy(data, KEY) == xor_keystream_py(data, KEY)
+
+
+def test_chacha_round_trip():
+    data = os.urandom(0x200 + 3)
+    encrypted = chacha(b"Data/Textures/items.DDS", data, 0x1234)
+    assert encrypted != data
+    assert chacha(b"Data/Textures/items.DDS", encrypted, 0x1234) == data
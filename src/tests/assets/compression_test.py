@@ -0,0 +1,28 @@
+import os
+import threading
+
+import zstandard as zstd
+
+from modlunky2.assets.compression import (
+    THREADED_MIN_SIZE,
+    compress_data,
+    get_compressor,
+)
+
+
+def test_compressor_reused_per_thread():
+    cctx = get_compressor(3)
+    assert get_compressor(3) is cctx
+    assert get_compressor(3, threads=2) is not cctx
+
+    other = []
+    thread = threading.Thread(target=lambda: other.append(get_compressor(3)))
+    thread.start()
+    thread.join()
+    assert other[0] is not cctx
+
+
+def test_threaded_compression_round_trips():
+    data = os.urandom(1024) * (THREADED_MIN_SIZE // 1024 + 1)
+    compressed = compress_data(data, 3, threads=2)
+    assert zstd.ZstdDecompressor().decompress(compressed) == data
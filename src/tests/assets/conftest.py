@@ -0,0 +1,57 @@
+from io import BytesIO
+from struct import pack
+
+import pytest
+import zstandard as zstd
+
+from modlunky2.assets.assets import AssetStore
+from modlunky2.assets.chacha import Key, chacha, hash_filepath
+from modlunky2.assets.constants import BANK_ALIGNMENT
+
+
+def build_exe(assets):
+    """Build a minimal exe containing a bundle of `(filepath, data, is_encrypted)`."""
+    payloads = []
+    for filepath, data, is_encrypted in assets:
+        if is_encrypted:
+            data = zstd.ZstdCompressor().compress(data)
+        payloads.append((filepath.encode(), data, is_encrypted))
+
+    key = Key()
+    for _, data, _ in payloads:
+        key.update(len(data) + 1)
+
+    out = BytesIO()
+    out.write(b"\x00" * AssetStore.BUNDLE_OFFSET)
+    for filepath, data, is_encrypted in payloads:
+        if is_encrypted:
+            data = chacha(filepath, data, key.key)
+        filepath_hash = hash_filepath(filepath, key.key)
+        if filepath.endswith(b".bank"):
+            # Like the game, pad the hash so the data is aligned
+            asset_offset = out.tell() + 8 + len(filepath_hash) + 1
+            padding = BANK_ALIGNMENT - asset_offset % BANK_ALIGNMENT
+            filepath_hash += b"\x00" * padding
+        out.write(pack("<II", len(data) + 1, len(filepath_hash)))
+        out.write(filepath_hash)
+        out.write(pack("<b", is_encrypted))
+        out.write(data)
+    out.write(pack("<II", 0, 0))
+    return out.getvalue()
+
+
+@pytest.fixture
+def exe_assets():
+    return [
+        ("Data/Levels/abzu.lvl", b"\\-size 4 4\n" * 40, True),
+        ("strings00.str", "hello\nworld\n".encode("utf-8"), True),
+        ("shaders.hlsl", b"float4 main() {}\n", False),
+        ("soundbank.bank", b"RIFF" + b"\x00" * 60, False),
+    ]
+
+
+@pytest.fixture
+def exe_path(tmp_path, exe_assets):
+    path = tmp_path / "Spel2.exe"
+    path.write_bytes(build_exe(exe_assets))
+    return path
@@ -0,0 +1,32 @@
+import random
+
+import pytest
+from PIL import Image
+
+from modlunky2.assets.converters import png_to_dds
+
+
+def png_to_dds_body_py(img):
+    """ The original per-byte implementation of the DDS pixel data."""
+    return bytes(
+        (byte if rgba[3] != 0 else 0)
+        for rgba in img.convert("RGBA").getdata()
+        for byte in rgba
+    )
+
+
+@pytest.mark.parametrize("mode", ["RGBA", "RGB", "LA", "P"])
+def test_png_to_dds_parity(mode):
+    rand = random.Random(1234)
+    size = (37, 19)
+    pixels = bytes(
+        # Plenty of fully transparent and fully opaque pixels
+        rand.choice([0, 255, rand.randrange(256)])
+        for _ in range(size[0] * size[1] * 4)
+    )
+    img = Image.frombytes("RGBA", size, pixels).convert(mode)
+
+    data = png_to_dds(img)
+
+    assert data[:4] == b"DDS "
+    assert data[128:] == png_to_dds_body_py(img)
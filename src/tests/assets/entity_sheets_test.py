@@ -0,0 +1,168 @@
+from pathlib import Path
+
+from modlunky2.assets import entity_sheets
+from modlunky2.assets.assets import AssetStore
+from modlunky2.assets.entity_sheets import (
+    EntitySheetManifest,
+    plan_workers,
+    stale_mergers,
+)
+from modlunky2.assets.executors import ExecutorType
+from modlunky2.assets.filepath_hashes import FilepathHashes
+from modlunky2.assets.staleness import StalenessIndex
+from modlunky2.sprites.base_classes import (
+    BaseSpriteLoader,
+    BaseSpriteMerger,
+    LoaderIndex,
+)
+
+
+class Sheet(BaseSpriteLoader):
+    _sprite_sheet_path = Path("Data/Textures/sheet.png")
+    _chunk_size = 128
+    _chunk_map = {}
+
+
+class SubSheet(Sheet):
+    pass
+
+
+class OtherSheet(Sheet):
+    pass
+
+
+class FakeMerger:
+    def __init__(self, origin_map):
+        self._origin_map = origin_map
+
+    @property
+    def source_types(self):
+        return list(self._origin_map)
+
+
+def test_loader_index_matches_isinstance_scan():
+    sub, other, sheet = SubSheet(), OtherSheet(), Sheet()
+    index = LoaderIndex([sub, other, sheet])
+
+    assert index.find(Sheet) is sub
+    assert index.find(OtherSheet) is other
+    assert index.find(BaseSpriteLoader) is sub
+    assert LoaderIndex([sheet]).find(SubSheet) is None
+
+
+def test_plan_keeps_shared_sources_together():
+    one = {"a": (0, 0, 1, 1)}
+    two = {"a": (0, 0, 1, 1), "b": (1, 0, 2, 1)}
+    mergers = [
+        FakeMerger({Sheet: [two], OtherSheet: [one]}),
+        FakeMerger({OtherSheet: [two]}),
+        FakeMerger({Sheet: [one, one]}),
+        FakeMerger({SubSheet: [one]}),
+    ]
+
+    plan = plan_workers(mergers, 4)
+    assert sorted(plan) == [[0, 2], [1], [3]]
+    assert plan_workers(mergers, 1) == [[0, 1, 2, 3]]
+
+
+class Merged(BaseSpriteMerger):
+    _target_sprite_sheet_path = Path("Data/Textures/Entities/merged.png")
+    _grid_hint_size = 8
+    _origin_map = {Sheet: {"a": (0, 0, 1, 1)}}
+
+
+def test_only_changed_sheets_are_stale(tmp_path):
+    source = tmp_path / "Data/Textures/sheet.png"
+    source.parent.mkdir(parents=True)
+    source.write_bytes(b"first")
+    sprite_loaders = [Sheet(tmp_path)]
+    sprite_mergers = [Merged(tmp_path)]
+    manifest = EntitySheetManifest(tmp_path / "manifest.json")
+    staleness_index = StalenessIndex()
+
+    def stale():
+        return stale_mergers(sprite_loaders, sprite_mergers, manifest, staleness_index)
+
+    indexes, inputs = stale()
+    assert indexes == [0]
+    assert list(inputs[0]["sources"]) == ["Data/Textures/sheet.png"]
+
+    for path in sprite_mergers[0].output_paths:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(b"merged")
+    manifest.record("Data/Textures/Entities/merged.png", inputs[0])
+    manifest.save()
+    manifest = EntitySheetManifest.from_path(manifest.path)
+    assert stale()[0] == []
+
+    sprite_mergers[0].output_paths[1].unlink()
+    assert stale()[0] == [0]
+    sprite_mergers[0].output_paths[1].write_bytes(b"merged")
+
+    source.write_bytes(b"second")
+    assert stale()[0] == [0]
+
+
+def test_asset_store_creates_entity_sheets(tmp_path, monkeypatch):
+    monkeypatch.setattr(entity_sheets, "ENTITY_SHEETS_CACHE_DIR", tmp_path / "cache")
+    extract_dir = tmp_path / "Extracted"
+    extract_dir.mkdir()
+
+    AssetStore.create_entity_sheets(
+        extract_dir, max_workers=2, executor_type=ExecutorType.THREAD
+    )
+    assert EntitySheetManifest.default_path(extract_dir).exists()
+
+
+class RecordingMerger(Merged):
+    def __init__(self, base_path, merged):
+        super().__init__(base_path)
+        self.merged = merged
+
+    def do_merge(self, sprite_loaders):
+        self.merged.append(self.stem)
+
+    def save(self):
+        for path in self.output_paths:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_bytes(b"merged")
+
+
+def test_extract_skips_unchanged_entity_sheets(tmp_path, exe_path, monkeypatch):
+    monkeypatch.setattr(entity_sheets, "ENTITY_SHEETS_CACHE_DIR", tmp_path / "cache")
+    extract_dir = tmp_path / "Extracted"
+    compressed_dir = tmp_path / ".compressed" / "Extracted"
+    for dir_ in [extract_dir, compressed_dir]:
+        (dir_ / "Data/Levels").mkdir(parents=True)
+    source = extract_dir / "Data/Textures/sheet.png"
+    source.parent.mkdir(parents=True)
+    source.write_bytes(b"sheet")
+
+    merged = []
+    sprite_loader = Sheet(extract_dir)
+    monkeypatch.setattr(
+        entity_sheets,
+        "load_entity_sheets",
+        lambda _: ([sprite_loader], [RecordingMerger(extract_dir, merged)]),
+    )
+
+    def extract(**kwargs):
+        with exe_path.open("rb") as exe:
+            AssetStore.load_from_file(exe, FilepathHashes()).extract(
+                extract_dir,
+                compressed_dir,
+                entity_sheets_executor_type=ExecutorType.THREAD,
+                **kwargs,
+            )
+
+    extract()
+    assert merged == ["merged"]
+    extract()
+    assert merged == ["merged"]
+    extract(force_entity_sheets=True)
+    assert merged == ["merged"] * 2
+
+    # Crop boxes come from the game data, not the extracted sheet
+    sprite_loader._chunk_map = {"a": (1, 0, 2, 1)}
+    extract()
+    assert merged == ["merged"] * 3
@@ -0,0 +1,29 @@
+from modlunky2.assets import staleness
+from modlunky2.assets.hashing import md5sum_path
+from modlunky2.assets.staleness import StalenessIndex
+
+
+def test_only_rehashes_changed_files(tmp_path, monkeypatch):
+    asset_path = tmp_path / "abzu.lvl"
+    asset_path.write_bytes(b"\\-size 4 4\n")
+    index_path = tmp_path / "index.json"
+
+    index = StalenessIndex(index_path)
+    md5sum = index.md5sum(asset_path)
+    assert md5sum == md5sum_path(asset_path)
+    index.save()
+
+    hashed = []
+
+    def record_md5sum(path):
+        hashed.append(path)
+        return md5sum_path(path)
+
+    monkeypatch.setattr(staleness, "md5sum_path", record_md5sum)
+    index = StalenessIndex.from_path(index_path)
+    assert index.md5sum(asset_path) == md5sum
+    assert hashed == []
+
+    asset_path.write_bytes(b"\\-size 4 3\n\\-size 4 4\n")
+    assert index.md5sum(asset_path) == md5sum_path(asset_path)
+    assert hashed == [asset_path]
@@ -0,0 +1,95 @@
+import os
+from io import StringIO
+
+from modlunky2.levels.chunk_store import ChunkLocation, ChunkStore
+from modlunky2.levels.level_file import LevelFile
+from modlunky2.levels.level_set import LevelSet
+from modlunky2.levels.level_templates import Chunk, TemplateSetting
+
+LEVEL = """\
+\\.setroom1-1
+1111
+0000
+
+\\!dual
+1111 0000
+0000 0000
+
+\\.setroom1-2
+1111
+0000
+"""
+
+
+def test_content_hash():
+    chunk = Chunk("", [], ["11", "00"], [])
+    assert (
+        chunk.content_hash() == Chunk("// other", [], ["11", "00"], []).content_hash()
+    )
+    assert chunk.content_hash() != Chunk("", [], ["11", "01"], []).content_hash()
+    assert chunk.content_hash() != Chunk("", [], ["11"], ["00"]).content_hash()
+    assert (
+        chunk.content_hash()
+        != Chunk("", [TemplateSetting.FLIP], ["11", "00"], []).content_hash()
+    )
+
+
+def test_dedupe_level_file():
+    level_file = LevelFile.from_handle(StringIO(LEVEL))
+    store = ChunkStore()
+    store.dedupe_level_file("dwelling.lvl", level_file)
+
+    first = level_file.level_templates.get("setroom1-1").chunks[0]
+    assert level_file.level_templates.get("setroom1-2").chunks[0] is first
+    assert len(store) == 2
+    assert list(store.duplicates().values()) == [
+        [
+            ChunkLocation("dwelling.lvl", "setroom1-1", 0),
+            ChunkLocation("dwelling.lvl", "setroom1-2", 0),
+        ]
+    ]
+    assert level_file.to_string() == LevelFile.from_handle(StringIO(LEVEL)).to_string()
+
+    # Doing it again replaces the file's locations rather than adding more
+    store.dedupe_level_file("dwelling.lvl", level_file)
+    assert store.num_seen() == 3
+
+
+def test_level_set_shares_chunks(tmp_path):
+    (tmp_path / "a.lvl").write_text(LEVEL, encoding="cp1252")
+    (tmp_path / "b.lvl").write_text(LEVEL, encoding="cp1252")
+
+    for _ in range(2):
+        levels = LevelSet.load_dir(tmp_path, workers=1, cache_dir=tmp_path / "cache")
+        chunks = [
+            level.level_templates.get("setroom1-1").chunks[1] for level in levels.all()
+        ]
+        assert chunks[0] is chunks[1]
+        assert len(levels.chunk_store) == 2
+
+
+def test_forgets_chunks_of_changed_files(tmp_path):
+    (tmp_path / "a.lvl").write_text(LEVEL, encoding="cp1252")
+    (tmp_path / "b.lvl").write_text(LEVEL, encoding="cp1252")
+    levels = LevelSet.load_dir(tmp_path, workers=1, cache_dir=None)
+    store = levels.chunk_store
+    assert store.num_seen() == 6
+
+    changed = tmp_path / "a.lvl"
+    changed.write_text(LEVEL.replace("1111 0000", "2222 0000"), encoding="cp1252")
+    stat = changed.stat()
+    os.utime(changed, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1))
+    levels.get("a.lvl")
+
+    assert store.num_seen() == 6
+    assert len(store) == 3
+    # Only b.lvl still uses the old room
+    old_room = levels.get("b.lvl").level_templates.get("setroom1-1").chunks[1]
+    assert store.duplicates().get(old_room.content_hash()) is None
+
+    changed.write_text("", encoding="cp1252")
+    os.utime(changed, ns=(stat.st_atime_ns, stat.st_mtime_ns + 2))
+    levels.get("a.lvl")
+
+    assert store.num_seen() == 3
+    assert len(store) == 2
@@ -0,0 +1,78 @@
+from io import StringIO
+
+import pytest
+
+from modlunky2.levels.compiled import (
+    compile_level_file,
+    decompile_level_file,
+    MappedLevelFile,
+    load_compiled,
+    write_compiled,
+)
+from modlunky2.levels.level_file import LevelFile
+
+from tests.levels.parser_test import EDGE_CASES, LEVEL_FILE
+
+SECTIONS = [
+    "level_settings",
+    "tile_codes",
+    "level_chances",
+    "monster_chances",
+    "level_templates",
+]
+
+
+def assert_same(level_file, other):
+    assert level_file.comment == other.comment
+    for section in SECTIONS:
+        assert getattr(level_file, section).comment == getattr(other, section).comment
+        assert getattr(level_file, section).all() == getattr(other, section).all()
+    assert level_file.to_string() == other.to_string()
+
+
+@pytest.mark.parametrize("text", [LEVEL_FILE, EDGE_CASES], ids=["level", "edge"])
+def test_round_trip(text):
+    level_file = LevelFile.from_handle(StringIO(text))
+    data = compile_level_file(level_file)
+
+    assert_same(decompile_level_file(data), level_file)
+    assert_same(decompile_level_file(data, lazy=True), level_file)
+
+
+def test_load_compiled(tmp_path):
+    level_file = LevelFile.from_handle(StringIO(LEVEL_FILE))
+    path = tmp_path / "dwelling.lvlc"
+    write_compiled(level_file, path)
+
+    assert_same(load_compiled(path), level_file)
+    with MappedLevelFile(path) as mapped:
+        lazy = mapped.level_file
+        air = lazy.level_templates.get("chunk_air")
+        assert air == level_file.level_templates.get("chunk_air")
+
+    # Read before closing so still there, the rest went with the mapping
+    assert lazy.level_templates.get("chunk_air") is air
+    with pytest.raises(ValueError):
+        lazy.level_templates.all()
+
+
+def test_rejects_other_data():
+    with pytest.raises(ValueError):
+        decompile_level_file(b"\0" * 64)
+
+
+def test_rejects_truncated_files(tmp_path):
+    data = compile_level_file(LevelFile.from_handle(StringIO(LEVEL_FILE)))
+    path = tmp_path / "dwelling.lvlc"
+    for size in [2, 20, len(data) // 2, len(data) - 1]:
+        path.write_bytes(data[:size])
+        with pytest.raises(ValueError):
+            load_compiled(path)
+        with pytest.raises(ValueError):
+            MappedLevelFile(path)
+
+
+def test_non_ascii_comments():
+    text = "\\?floor 1 // caf\xe9\n\\.entrance // \xbfqu\xe9?\n11\n"
+    level_file = LevelFile.from_handle(StringIO(text))
+    assert_same(decompile_level_file(compile_level_file(level_file)), level_file)
@@ -0,0 +1,76 @@
+import os
+
+from modlunky2.levels.level_index import LevelIndex, TileLocation
+
+GENERIC = """\
+\\?floor                  1
+\\?empty                  0
+"""
+
+LEVEL = """\
+\\-size                   4 2
+\\?spikes                 ^
+
+\\.setroom1-1
+1^11
+0000
+
+\\.entrance
+0001 0000
+1111 0000
+"""
+
+
+def write_levels(root):
+    root.mkdir()
+    (root / "generic.lvl").write_text(GENERIC, encoding="cp1252")
+    (root / "dwelling.lvl").write_text(LEVEL, encoding="cp1252")
+
+
+def touch(path, text):
+    stat = path.stat()
+    path.write_text(text, encoding="cp1252")
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1))
+
+
+def test_queries(tmp_path):
+    root = tmp_path / "Levels"
+    write_levels(root)
+    index = LevelIndex.load(root, tmp_path / "index.json")
+
+    assert index.files() == ["dwelling.lvl", "generic.lvl"]
+    assert index.tile_code_definitions("floor") == {"generic.lvl": "1"}
+    assert index.tile_uses("spikes") == [
+        TileLocation("dwelling.lvl", "setroom1-1", 0, "foreground", 0, 1)
+    ]
+    floors = index.tile_uses("floor")
+    assert len(floors) == 4 + 3 + 1
+    assert TileLocation("dwelling.lvl", "entrance", 0, "foreground", 0, 3) in floors
+    assert index.template_files("entrance") == {"dwelling.lvl": 1}
+    assert index.setting_values("size") == {"dwelling.lvl": "4 2"}
+
+
+def test_incremental_update(tmp_path):
+    root = tmp_path / "Levels"
+    path = tmp_path / "index.json"
+    write_levels(root)
+    LevelIndex.load(root, path)
+
+    index = LevelIndex.load(root, path)
+    assert index.update() == []
+
+    touch(root / "dwelling.lvl", LEVEL.replace("1^11", "^^11"))
+    assert index.update() == ["dwelling.lvl"]
+    assert len(index.tile_uses("spikes")) == 2
+
+    (root / "dwelling.lvl").unlink()
+    assert index.update() == ["dwelling.lvl"]
+    assert index.tile_uses("spikes") == []
+
+    # Tiles of every file depend on the generic tile codes
+    (root / "cave.lvl").write_text(LEVEL, encoding="cp1252")
+    index.update()
+    touch(root / "generic.lvl", GENERIC.replace("floor ", "floor_generic "))
+    assert sorted(index.update()) == ["cave.lvl", "generic.lvl"]
+    assert index.tile_uses("floor") == []
+    assert len(index.tile_uses("floor_generic")) == 8
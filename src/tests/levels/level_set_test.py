@@ -0,0 +1,76 @@
+import os
+
+from modlunky2.levels import level_set
+from modlunky2.levels.level_set import LevelSet
+
+LEVEL = """\
+\\?floor                  1
+\\.entrance
+1111
+0000
+"""
+
+
+def write_levels(root):
+    (root / "Arena").mkdir(parents=True)
+    (root / "abzu.lvl").write_text(LEVEL, encoding="cp1252")
+    (root / "Arena/dm1-1.lvl").write_text(LEVEL, encoding="cp1252")
+
+
+def test_load_dir(tmp_path):
+    root = tmp_path / "Levels"
+    write_levels(root)
+
+    levels = LevelSet.load_dir(root, workers=2, cache_dir=None)
+
+    assert levels.names() == ["Arena/dm1-1.lvl", "abzu.lvl"]
+    assert levels.get("abzu.lvl").tile_codes.get("floor").value == "1"
+    assert levels.get("missing.lvl") is None
+
+
+def test_load_dir_uses_cache(tmp_path, monkeypatch):
+    root = tmp_path / "Levels"
+    cache_dir = tmp_path / "cache"
+    write_levels(root)
+    LevelSet.load_dir(root, workers=1, cache_dir=cache_dir)
+
+    parsed = []
+
+    def record_parse(path):
+        parsed.append(path.name)
+        return level_set.LevelFile.from_path(path)
+
+    monkeypatch.setattr(level_set, "_parse_level", record_parse)
+    levels = LevelSet.load_dir(root, workers=1, cache_dir=cache_dir)
+    assert parsed == []
+    assert len(levels) == 2
+
+    abzu = root / "abzu.lvl"
+    abzu.write_text(LEVEL.replace("floor                  1", "floor 2"))
+    stat = abzu.stat()
+    os.utime(abzu, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1))
+
+    assert levels.get("abzu.lvl").tile_codes.get("floor").value == "2"
+    levels = LevelSet.load_dir(root, workers=1, cache_dir=cache_dir)
+    assert parsed == ["abzu.lvl"]
+    assert levels.get("abzu.lvl").tile_codes.get("floor").value == "2"
+
+
+def test_cache_ignored_when_classes_change(tmp_path, monkeypatch):
+    root = tmp_path / "Levels"
+    cache_dir = tmp_path / "cache"
+    write_levels(root)
+    LevelSet.load_dir(root, workers=1, cache_dir=cache_dir)
+
+    parsed = []
+
+    def record_parse(path):
+        parsed.append(path.name)
+        return level_set.LevelFile.from_path(path)
+
+    monkeypatch.setattr(level_set, "_parse_level", record_parse)
+    # As if a cached class had gained an attribute
+    monkeypatch.setattr(level_set, "cache_schema", lambda: "changed")
+    levels = LevelSet.load_dir(root, workers=1, cache_dir=cache_dir)
+    assert sorted(parsed) == ["abzu.lvl", "dm1-1.lvl"]
+    assert len(levels) == 2
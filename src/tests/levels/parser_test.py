@@ -2,6 +2,8 @@ from io import StringIO
 from textwrap import dedent
 from collections import OrderedDict
 
+import pytest
+
 from modlunky2.levels import (
     LevelFile,
     LevelSetting,
@@ -10,6 +12,7 @@ from modlunky2.levels import (
     MonsterChance,
     LevelTemplate,
 )
+from modlunky2.levels import tokenizer
 from modlunky2.levels.level_templates import TemplateSetting, Chunk
 
 
@@ -881,3 +884,117 @@ def test_parser():
     assert level_file.level_templates._inner.keys() == expected_level_templates.keys()
     for key, value in expected_level_templates.items():
         assert level_file.level_templates._inner[key] == value
+
+
+EDGE_CASES = r"""\
+// ------------------------------
+//  EDGE CASES
+// ------------------------------
+\?floor                          1
+// ------------------------------
+// TEMPLATES
+// ------------------------------
+
+\.entrance   // first room
+// A leading comment
+// that spans lines
+\!dual
+1111 0000
+0000 2222
+// trailing comment ends the chunk
+////
+1110
+
+\.exit
+\-size 2 2
+1111
+"""
+
+
+def test_fast_parser_matches_legacy():
+    for text in [LEVEL_FILE, EDGE_CASES]:
+        fast = LevelFile.from_handle(StringIO(text))
+        legacy = LevelFile.from_handle_legacy(StringIO(text))
+
+        assert fast.comment == legacy.comment
+        for section in [
+            "level_settings",
+            "tile_codes",
+            "level_chances",
+            "monster_chances",
+            "level_templates",
+        ]:
+            assert getattr(fast, section).comment == getattr(legacy, section).comment
+            assert getattr(fast, section)._inner == getattr(legacy, section)._inner
+
+
+def test_parser_deferred_validation():
+    text = "\\?not_a_tile_code 1\n"
+    level_file = LevelFile.from_handle(StringIO(text), validate=False)
+    assert level_file.tile_codes.all()[0].value == "1"
+
+    with pytest.raises(ValueError):
+        level_file.validate()
+    with pytest.raises(ValueError):
+        LevelFile.from_handle(StringIO(text))
+
+
+def test_lazy_parser(monkeypatch):
+    eager = LevelFile.from_handle(StringIO(LEVEL_FILE))
+    lazy = LevelFile.from_handle(StringIO(LEVEL_FILE), lazy=True)
+    assert lazy.level_settings._inner == eager.level_settings._inner
+    assert lazy.level_templates.names() == eager.level_templates.names()
+
+    parsed = []
+    tokenize_template = tokenizer.tokenize_template
+
+    def record_tokenize(line, *args):
+        parsed.append(line)
+        return tokenize_template(line, *args)
+
+    monkeypatch.setattr(tokenizer, "tokenize_template", record_tokenize)
+    assert lazy.level_templates.get("chunk_air") == eager.level_templates.get(
+        "chunk_air"
+    )
+    assert parsed == ["\\.chunk_air"]
+
+    assert lazy.level_templates.all() == eager.level_templates.all()
+
+
+def test_level_file_diff():
+    level_file = LevelFile.from_handle(StringIO(LEVEL_FILE))
+    other = LevelFile.from_handle(StringIO(LEVEL_FILE))
+    assert not level_file.diff(other)
+
+    other.tile_codes.set_obj(TileCode(name="floor", value="f", comment=""))
+    other.level_templates.get("chunk_air").chunks[0].foreground[0][0] = "1"
+
+    diff = level_file.diff(other)
+    assert diff.sections == ["tile_codes"]
+    assert diff.templates == ["chunk_air"]
+
+
+def test_write_path_skips_unchanged(tmp_path):
+    level_path = tmp_path / "sunkencityarea.lvl"
+    level_file = LevelFile.from_handle(StringIO(LEVEL_FILE))
+
+    assert level_file.write_path(level_path)
+    assert not level_file.write_path(level_path)
+    assert LevelFile.from_path(level_path).to_string() == level_file.to_string()
+
+    level_file.level_settings.get("mount_chance").value = 9
+    assert level_file.write_path(level_path)
+    assert list(tmp_path.iterdir()) == [level_path]
+
+
+def test_write_path_failure_leaves_no_tmp(tmp_path):
+    level_path = tmp_path / "sunkencityarea.lvl"
+    level_file = LevelFile.from_handle(StringIO(LEVEL_FILE))
+    level_file.write_path(level_path)
+
+    # Not encodable as cp1252, the write fails part way through
+    level_file.comment = "// ☃"
+    with pytest.raises(UnicodeEncodeError):
+        level_file.write_path(level_path)
+    assert list(tmp_path.iterdir()) == [level_path]
+    assert LevelFile.from_path(level_path).comment != level_file.comment
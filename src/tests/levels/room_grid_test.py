@@ -0,0 +1,46 @@
+import pytest
+
+from modlunky2.levels.level_templates import Chunk
+from modlunky2.levels.room_grid import RoomGrid
+
+
+def test_room_grid_accessors():
+    grid = RoomGrid(["1100", "0022", "ab&c"])
+
+    assert len(grid) == grid.height == 3
+    assert grid.width == 4
+    assert grid.row(1) == "0022"
+    assert grid.column(2) == "02&"
+    assert grid.tile(2, -1) == grid[2, 3] == grid[2][3] == "c"
+    assert grid[1:, 1:3] == RoomGrid(["02", "b&"])
+    assert grid[:2] == [["1", "1", "0", "0"], ["0", "0", "2", "2"]]
+    assert grid.to_lists()[2] == ["a", "b", "&", "c"]
+
+
+def test_room_grid_writes():
+    grid = RoomGrid([["1", "1"], ["0", "0"]])
+
+    grid[0][1] = "é"
+    grid[1, 0] = "x"
+    assert grid.rows() == ["1é", "x0"]
+
+    grid[0] = "123"
+    grid.append("45")
+    assert grid.rows() == ["123", "x0", "45"]
+
+    with pytest.raises(ValueError):
+        grid[0][0] = "ab"
+    with pytest.raises(IndexError):
+        grid[1][2] = "a"
+
+
+def test_chunk_converts_lists():
+    chunk = Chunk(
+        comment=None,
+        settings=[],
+        foreground=[["1", "0"], ["0", "1"]],
+        background=[],
+    )
+    assert isinstance(chunk.foreground, RoomGrid)
+    assert chunk.foreground == ["10", "01"]
+    assert chunk == Chunk(None, [], RoomGrid(["10", "01"]), RoomGrid())
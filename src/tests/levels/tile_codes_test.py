@@ -0,0 +1,44 @@
+import pytest
+
+from modlunky2.levels.room_grid import RoomGrid
+from modlunky2.levels.tile_codes import (
+    NO_TILE_ID,
+    TileCode,
+    TileCodeRegistry,
+    TileCodes,
+    tile_id_table,
+)
+
+
+def test_registry_interns_names():
+    registry = TileCodeRegistry()
+    floor = registry.intern("floor")
+
+    assert floor != NO_TILE_ID
+    assert registry.intern("floor") == floor
+    assert registry.intern("floor%50%spikes") not in (NO_TILE_ID, floor)
+    assert registry.name(floor) == "floor"
+    assert len(registry) == 2
+
+
+def test_registry_validation():
+    registry = TileCodeRegistry()
+    assert registry.is_valid("floor%50%spikes")
+    assert registry.is_valid("floor%50")
+    assert not registry.is_valid("floor%50%not_a_tile")
+
+    with pytest.raises(ValueError):
+        TileCode.validate_name("not_a_tile")
+
+
+def test_room_tile_ids():
+    tile_codes = TileCodes()
+    tile_codes.set_obj(TileCode("floor", "1", None))
+    tile_codes.set_obj(TileCode("empty", "0", None))
+    registry = TileCodeRegistry()
+
+    table = tile_id_table(tile_codes, registry)
+    ids = RoomGrid(["10", "0x"]).to_ids(table)
+
+    floor, empty = registry.intern("floor"), registry.intern("empty")
+    assert list(ids) == [floor, empty, empty, NO_TILE_ID]
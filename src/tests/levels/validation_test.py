@@ -0,0 +1,104 @@
+import json
+
+from modlunky2.levels.level_file import LevelFile
+from modlunky2.levels.tokenizer import tokenize_level_file
+from modlunky2.levels.validation import _Checker, validate_dir, validate_lines
+
+LEVEL = """\
+\\-size                   4
+\\-altar_room_chance      1
+\\-altar_room_chance      2
+\\?spikes                 ^
+\\?notatile               x
+\\?floor_extra            ^
+
+\\.setroom1-1
+1^11
+00z0
+
+\\.notatemplate
+11111 00000
+1111 000
+"""
+
+
+def test_collects_every_problem():
+    diagnostics = validate_lines(
+        "dwelling.lvl", LEVEL.splitlines(True), {"1": "floor", "0": "empty"}
+    )
+
+    assert [(diag.line, diag.code) for diag in diagnostics] == [
+        (1, "syntax"),
+        (3, "duplicate-directive"),
+        (5, "invalid-directive"),
+        (6, "invalid-directive"),
+        (6, "duplicate-tile-value"),
+        (10, "undefined-tile"),
+        (12, "invalid-template"),
+        (14, "room-width"),
+        (14, "background-size"),
+    ]
+    assert "'z'" in diagnostics[5].message
+
+
+def test_valid_level_has_no_diagnostics():
+    lines = ["\\?spikes ^\n", "\\.setroom1-1\n", "^^\n", "^^\n"]
+    assert validate_lines("dwelling.lvl", lines) == []
+
+
+def test_validate_dir(tmp_path):
+    (tmp_path / "generic.lvl").write_text("\\?floor 1\n", encoding="cp1252")
+    (tmp_path / "dwelling.lvl").write_text(
+        "\\.setroom1-1\n11\n12\n", encoding="cp1252"
+    )
+    (tmp_path / "abzu.lvl").write_text("\\.setroom1-1\n11\n", encoding="cp1252")
+
+    report = validate_dir(tmp_path, workers=2)
+
+    assert report.files == ["abzu.lvl", "dwelling.lvl", "generic.lvl"]
+    assert [diag.to_text() for diag in report.errors] == [
+        "dwelling.lvl:3: error: Tile '2' in template 'setroom1-1' has no tile code"
+        " [undefined-tile]"
+    ]
+    summary = json.loads(report.to_json())
+    assert summary["files"] == 3
+    assert summary["errors"] == 1
+
+
+def test_uses_tile_codes_of_shared_levels(tmp_path):
+    (tmp_path / "generic.lvl").write_text("\\?floor 1\n", encoding="cp1252")
+    (tmp_path / "junglearea.lvl").write_text("\\?bush_block 2\n", encoding="cp1252")
+    (tmp_path / "basecamp.lvl").write_text("\\?ladder 3\n", encoding="cp1252")
+    (tmp_path / "challenge_moon.lvl").write_text(
+        "\\.setroom1-1\n12\n", encoding="cp1252"
+    )
+    (tmp_path / "basecamp_tutorial.lvl").write_text(
+        "\\.setroom1-1\n13\n", encoding="cp1252"
+    )
+    (tmp_path / "dwelling.lvl").write_text("\\.setroom1-1\n12\n", encoding="cp1252")
+
+    report = validate_dir(tmp_path, workers=1)
+
+    assert [(diag.file, diag.message) for diag in report.errors] == [
+        ("basecamp_tutorial.lvl", "Tile '1' in template 'setroom1-1' has no tile code"),
+        ("dwelling.lvl", "Tile '2' in template 'setroom1-1' has no tile code"),
+    ]
+
+
+def test_rooms_match_tokenizer():
+    # Without the `size` line, which the tokenizer alone rejects
+    lines = LEVEL.splitlines(True)[1:]
+    level_file = LevelFile.empty()
+    tokenize_level_file(level_file, lines)
+
+    checker = _Checker(lambda *args: None, {})
+    tokenize_level_file(LevelFile.empty(), lines, listener=checker)
+
+    assert [
+        (template, [foreground for _, foreground, _ in rows])
+        for template, rows in checker.chunks
+    ] == [
+        (template.name, chunk.foreground.rows())
+        for template in level_file.level_templates.all()
+        for chunk in template.chunks
+    ]
@@ -0,0 +1,71 @@
+from concurrent.futures import ThreadPoolExecutor
+from threading import Event
+
+from PIL import Image
+
+from modlunky2.sprites.base_classes.crop_cache import NUM_STRIPES, CropCache
+
+
+def make_crop(crops):
+    def crop(name):
+        crops.append(name)
+        if name == "missing":
+            return None
+        return Image.new("RGBA", (2, 2))
+
+    return crop
+
+
+def test_caches_hits_and_misses():
+    crops = []
+    cache = CropCache()
+    crop = make_crop(crops)
+
+    first = cache.get("a", crop)
+    assert cache.get("a", crop) is first
+    assert cache.get("missing", crop) is None
+    assert cache.get("missing", crop) is None
+
+    assert crops == ["a", "missing"]
+    assert cache.stats() == {"hits": 2, "misses": 2, "entries": 2, "bytes": 16}
+
+
+def test_evicts_least_recently_used():
+    crops = []
+    cache = CropCache(max_bytes=2 * 16)
+    crop = make_crop(crops)
+
+    cache.get("a", crop)
+    cache.get("b", crop)
+    cache.get("a", crop)
+    cache.get("c", crop)
+
+    assert "a" in cache
+    assert "b" not in cache
+    assert cache.num_bytes == 32
+
+
+def test_crops_outside_other_names_lock():
+    cache = CropCache()
+    started = Event()
+    release = Event()
+
+    def slow_crop(name):
+        started.set()
+        release.wait(5)
+        return Image.new("RGBA", (1, 1))
+
+    # A name guarded by a different lock than "slow"
+    fast = next(
+        f"fast{idx}"
+        for idx in range(100)
+        if hash(f"fast{idx}") % NUM_STRIPES != hash("slow") % NUM_STRIPES
+    )
+
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        slow = pool.submit(cache.get, "slow", slow_crop)
+        started.wait(5)
+        # Finishes while "slow" is still being cropped
+        assert cache.get(fast, make_crop([])) is not None
+        release.set()
+        assert slow.result(5).size == (1, 1)
@@ -0,0 +1,116 @@
+import os
+from pathlib import Path
+
+import pytest
+from PIL import Image
+
+from modlunky2.sprites.base_classes import BaseSpriteLoader
+from modlunky2.sprites.base_classes import image_pool
+from modlunky2.sprites.base_classes.image_pool import ImagePool
+
+
+def write_sheet(path, color, size=(4, 4)):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    Image.new("RGBA", size, color).save(path)
+
+
+def count_opens(monkeypatch):
+    opened = []
+    image_open = Image.open
+
+    def record_open(path, *args, **kwargs):
+        opened.append(Path(path).name)
+        return image_open(path, *args, **kwargs)
+
+    monkeypatch.setattr(image_pool.Image, "open", record_open)
+    return opened
+
+
+class RedSheet(BaseSpriteLoader):
+    _sprite_sheet_path = Path("Data/Textures/red.png")
+    _chunk_size = 2
+    _chunk_map = {"top_left": (0, 0, 1, 1), "bottom_right": (1, 1, 2, 2)}
+
+
+class OtherRedSheet(RedSheet):
+    _chunk_map = {"top_right": (1, 0, 2, 1)}
+
+
+def test_loaders_share_sheets(tmp_path, monkeypatch):
+    write_sheet(tmp_path / "Data/Textures/red.png", (255, 0, 0, 255))
+    opened = count_opens(monkeypatch)
+    pool = ImagePool()
+
+    first = RedSheet(tmp_path, image_pool=pool)
+    second = OtherRedSheet(tmp_path, image_pool=pool)
+    assert opened == []
+
+    assert first.get("top_left").getpixel((0, 0)) == (255, 0, 0, 255)
+    assert second.get("top_right").size == (2, 2)
+    assert opened == ["red.png"]
+    assert pool.num_bytes == 4 * 4 * 4
+
+
+def test_reloads_modified_sheet(tmp_path):
+    path = tmp_path / "red.png"
+    write_sheet(path, (255, 0, 0, 255))
+    pool = ImagePool()
+
+    with pool.borrow(path) as sheet:
+        assert sheet.getpixel((0, 0)) == (255, 0, 0, 255)
+
+    write_sheet(path, (0, 0, 255, 255))
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+    with pool.borrow(path) as sheet:
+        assert sheet.getpixel((0, 0)) == (0, 0, 255, 255)
+    assert len(pool) == 1
+
+
+def test_evicts_unborrowed_sheets(tmp_path):
+    paths = [tmp_path / f"{idx}.png" for idx in range(3)]
+    for path in paths:
+        write_sheet(path, (0, 0, 0, 255))
+    # Room for two 4x4 RGBA sheets
+    pool = ImagePool(max_bytes=2 * 4 * 4 * 4)
+
+    key, _ = pool.acquire(paths[0])
+    for path in paths[1:]:
+        with pool.borrow(path):
+            pass
+
+    # The borrowed sheet stays, the least recently used one goes
+    assert paths[0] in pool
+    assert paths[1] not in pool
+    assert paths[2] in pool
+
+    pool.release(key)
+    pool.clear()
+    assert len(pool) == 0
+    assert pool.num_bytes == 0
+
+
+def test_checks_sheet_once(tmp_path, monkeypatch, caplog):
+    write_sheet(tmp_path / "Data/Textures/red.png", (255, 0, 0, 255))
+    pool = ImagePool()
+    sheet = RedSheet(tmp_path, image_pool=pool)
+
+    stats = []
+    stat = os.stat
+
+    def record_stat(path, *args, **kwargs):
+        stats.append(path)
+        return stat(path, *args, **kwargs)
+
+    monkeypatch.setattr(image_pool.os, "stat", record_stat)
+    sheet.get("top_left")
+    sheet.get("bottom_right")
+    assert len(stats) == 1
+
+    missing = RedSheet(tmp_path / "missing", image_pool=pool)
+    for name in ["top_left", "bottom_right"]:
+        with pytest.raises(FileNotFoundError):
+            missing.get(name)
+    assert len(stats) == 2
+    assert len(caplog.records) == 1
+    assert "red.png" in caplog.records[0].getMessage()
@@ -0,0 +1,84 @@
+from io import StringIO
+
+from modlunky2.levels import LevelFile
+from modlunky2.sprites import SpelunkySpriteFetcher
+
+
+def old_resolve(fetcher, name, biome):
+    """ The lookup order `get` used to follow, by membership instead of cropping."""
+    for key_map in [fetcher._non_biome_map, fetcher._biome_dict[biome].key_map()]:
+        if name in key_map:
+            return key_map[name]
+    for biome_obj in fetcher._biome_dict.values():
+        key_map = biome_obj.key_map()
+        if name in key_map:
+            return key_map[name]
+    return None
+
+
+def test_resolve_matches_old_lookup(tmp_path):
+    # Sheets are only opened when cropping so no textures are needed
+    fetcher = SpelunkySpriteFetcher(tmp_path)
+
+    names = set(fetcher._non_biome_map)
+    for biome in fetcher._biome_dict.values():
+        names.update(biome.key_map())
+    names.update(["floor%50", "not_a_tile"])
+
+    for biome in fetcher._biome_dict:
+        for name in names:
+            assert fetcher.resolve(name, biome) == old_resolve(fetcher, name, biome)
+
+    assert fetcher.resolve("floor", "not_a_biome") is not None
+    assert fetcher.resolve("not_a_tile", "not_a_biome") is None
+    assert fetcher.get("not_a_tile") is None
+
+
+def test_warm_up(tmp_path, monkeypatch):
+    fetcher = SpelunkySpriteFetcher(tmp_path)
+    requested = []
+    monkeypatch.setattr(
+        fetcher, "get", lambda name, biome: requested.append((name, biome)) or name
+    )
+
+    level_file = LevelFile.from_handle(
+        StringIO("\\?floor%50%spikes 1\n\\?push_block%50%ice%50 2\n"),
+        validate=False,
+    )
+    assert fetcher.warm_up(level_file, "jungle") == 8
+    # Split like the editor does, everything after the percent is one tile
+    assert sorted(requested) == [
+        ("empty", "jungle"),
+        ("floor", "jungle"),
+        ("floor%50%spikes", "jungle"),
+        ("ice%50", "jungle"),
+        ("push_block", "jungle"),
+        ("push_block%50%ice%50", "jungle"),
+        ("spikes", "jungle"),
+        ("unknown", "jungle"),
+    ]
+
+
+def test_warm_up_in_background(tmp_path, monkeypatch):
+    fetcher = SpelunkySpriteFetcher(tmp_path)
+    warmed = []
+
+    def warm_up(level_file, biome):
+        warmed.append((level_file, biome))
+        if len(warmed) == 1:
+            raise FileNotFoundError("missing sheet")
+
+    monkeypatch.setattr(fetcher, "warm_up", warm_up)
+    thread = fetcher.warm_up_in_background(["generic", "dwelling"], "jungle")
+    thread.join()
+    # A failure doesn't stop the other levels
+    assert warmed == [("generic", "jungle"), ("dwelling", "jungle")]
+
+
+def test_misses_are_not_remembered(tmp_path):
+    fetcher = SpelunkySpriteFetcher(tmp_path)
+    num_resolved = len(fetcher._resolved)
+    for idx in range(10):
+        assert fetcher.resolve(f"not_a_tile_{idx}", "not_a_biome") is None
+    assert fetcher.resolve("floor", "not_a_biome") is not None
+    assert len(fetcher._resolved) == num_resolved